@@ -1,9 +1,19 @@
-import os
+import asyncio
 import json
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from app.core.frames import frame_store
+from app.core.metrics import metrics
+from app.core.registry import registry
+from app.services.llm_router import LLMError
 from app.services.llm_service import llm_service
 from app.services.automation_service import AutomationService
+from app.services.batch_runner import BatchRunner, run_scenario_on_device
+from app.services.job_service import job_manager
+from app.services.package_resolver import package_resolver
+from app.services.scenario_service import scenario_repository
+from app.services.session_pool import session_pool
 
 router = APIRouter()
 
@@ -27,6 +37,13 @@ class ScenarioRunRequest(BaseModel):
     steps: list[str] = []
     provider: str = "ollama"
 
+class BatchRequest(BaseModel):
+    devices: list[str]
+    scenario_ids: list[str] = []  # vazio = todos os cenários
+    mode: str = "dynamic"
+    provider: str = "ollama"
+    retries: int = 1
+
 class ScenarioItauRequest(BaseModel):
     device: str
     agencia: str
@@ -34,22 +51,62 @@ class ScenarioItauRequest(BaseModel):
     senha: str
 
 
+# ---------- Helpers ----------
+
+async def _cancel_on_disconnect(http_request: Request, coro):
+    """
+    Executa `coro` e a cancela se o cliente HTTP desconectar no meio do caminho,
+    interrompendo chamadas à LLM e passos de automação que ninguém vai ler.
+    """
+    task = asyncio.ensure_future(coro)
+    while not task.done():
+        await asyncio.wait({task}, timeout=0.5)
+        if not task.done() and await http_request.is_disconnected():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            return Response(status_code=499)
+    return task.result()
+
+
+async def _complete(prompt: str, provider: str = "ollama") -> str:
+    """Chamada direta à LLM: se nenhum backend responder, a requisição falha com 503."""
+    try:
+        return await llm_service.get_completion(prompt, provider=provider)
+    except LLMError as e:
+        raise HTTPException(status_code=503, detail=f"LLM indisponível: {e}")
+
+
+async def _analyze(prompt: str, provider: str = "ollama") -> str:
+    """Análise final: a execução já aconteceu, então a falha da LLM não descarta o log."""
+    try:
+        return await llm_service.get_completion(prompt, provider=provider)
+    except LLMError as e:
+        return f"Análise indisponível: {e}"
+
+
 # ---------- Endpoints ----------
 
 @router.get("/scenarios", summary="Lista os cenários de teste salvos")
-async def list_scenarios():
-    scenarios_dir = os.path.join(os.getcwd(), "app", "scenarios")
-    all_scenarios = []
-    if os.path.exists(scenarios_dir):
-        for filename in os.listdir(scenarios_dir):
-            if filename.endswith(".json"):
-                with open(os.path.join(os.getcwd(), "app", "scenarios", filename), 'r') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        all_scenarios.extend(data)
-                    else:
-                        all_scenarios.append(data)
-    return all_scenarios
+async def list_scenarios(
+    package: str | None = None,
+    tag: str | None = None,
+    q: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=500),
+):
+    # A varredura (stat dos arquivos) roda fora do event loop; a consulta usa o índice em memória
+    await asyncio.to_thread(scenario_repository.refresh)
+    items, total = scenario_repository.query(package=package, tag=tag, search=q, offset=offset, limit=limit)
+    return {
+        "items": items,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "errors": scenario_repository.errors(),
+    }
 
 
 @router.get("/status", summary="Verifica o status da API")
@@ -61,35 +118,69 @@ async def get_status():
     }
 
 
+@router.get("/sessions", summary="Métricas do pool de sessões Appium")
+async def get_sessions():
+    return session_pool.metrics()
+
+
+@router.get("/devices/{device}/packages", summary="Pacotes instalados mais parecidos com o nome de um app")
+async def get_device_packages(device: str, name: str, refresh: bool = False):
+    stats = await package_resolver.refresh(device, force=refresh)
+    return {
+        "refresh": stats,
+        "candidates": [match.as_dict() for match in package_resolver.candidates(device, name)],
+    }
+
+
+@router.get("/components", summary="Componentes carregados sob demanda (SDKs) e o custo de carga")
+async def get_components():
+    return registry.status()
+
+
+@router.get("/llm/backends", summary="Backends de LLM: peso, carga, disjuntor e p95")
+async def get_llm_backends():
+    return llm_service.router.status()
+
+
+@router.get("/metrics", summary="Métricas no formato de texto do Prometheus")
+async def get_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @router.post("/ask-llm", summary="Faz uma pergunta direta à LLM")
-async def ask_llm(request: PromptRequest):
-    response = await llm_service.get_completion(request.prompt)
-    return {"response": response}
+async def ask_llm(request: PromptRequest, http_request: Request):
+    async def ask():
+        return {"response": await _complete(request.prompt)}
+
+    return await _cancel_on_disconnect(http_request, ask())
 
 
 @router.post("/run-dynamic", summary="Executa automação reativa via IA")
-async def run_dynamic(request: DynamicRequest):
+async def run_dynamic(request: DynamicRequest, http_request: Request):
+    return await _cancel_on_disconnect(http_request, _run_dynamic(request))
+
+
+async def _run_dynamic(request: DynamicRequest, on_event=None, run_id=None):
     app_id = request.package.strip()
     provider = request.provider.lower()
     
-    # Instancia um novo serviço para cada execução (evita conflitos de driver)
-    service = AutomationService()
+    # Um serviço por execução; a sessão Appium vem do pool compartilhado
+    service = AutomationService(on_event=on_event, run_id=run_id)
 
-    # 1. Descoberta Automática de Pacote
-    package_discovered = app_id
-    if "." not in app_id and app_id.lower() != "settings":
-        discovery_prompt = (
-            f"Qual é o ID do pacote Android (package name) mais provável para o aplicativo chamado '{app_id}'?\n"
-            "Responda APENAS o ID do pacote, sem aspas e sem explicações."
-        )
-        package_discovered = (await llm_service.get_completion(discovery_prompt, provider=provider)).strip().strip("\"'")
+    # 1. Descoberta Automática de Pacote: índice local do dispositivo, LLM só se não houver candidato confiável
+    resolution = await package_resolver.resolve(
+        request.device, app_id, llm_fn=lambda prompt: _complete(prompt, provider=provider)
+    )
+    package_discovered = resolution.package
+    if on_event:
+        on_event("package", **resolution.as_dict())
 
     # 2. Execução Reativa
     execution_log = await service.run_reactive_loop(
         device_name=request.device,
         app_package=package_discovered,
         goal=request.goal,
-        llm_fn=lambda p: llm_service.get_completion(p, provider=provider)
+        llm_fn=llm_service.decider(provider)
     )
 
     # 3. Análise Final
@@ -98,10 +189,13 @@ async def run_dynamic(request: DynamicRequest):
         f"O log de execução reativa foi:\n{execution_log}\n\n"
         "Com base nisso, dê uma conclusão final curta sobre o sucesso da tarefa."
     )
-    final_analysis = await llm_service.get_completion(analysis_prompt, provider=provider)
+    final_analysis = await _analyze(analysis_prompt, provider=provider)
+    if on_event:
+        on_event("analysis", analysis=final_analysis)
 
     return {
         "package_discovered": package_discovered,
+        "package_resolution": resolution.as_dict(),
         "plan": f"Orquestração Reativa ({provider.upper()})",
         "log": execution_log,
         "analysis": final_analysis,
@@ -109,9 +203,13 @@ async def run_dynamic(request: DynamicRequest):
 
 
 @router.post("/run-scenario", summary="Executa um cenário (Fixo ou Dinâmico)")
-async def run_scenario(request: ScenarioRunRequest):
+async def run_scenario(request: ScenarioRunRequest, http_request: Request):
+    return await _cancel_on_disconnect(http_request, _run_scenario(request))
+
+
+async def _run_scenario(request: ScenarioRunRequest, on_event=None, run_id=None):
     provider = request.provider.lower()
-    service = AutomationService()
+    service = AutomationService(on_event=on_event, run_id=run_id)
     
     if request.mode == "fixed" and request.steps:
         # Execução Determinística (Sem IA)
@@ -127,7 +225,7 @@ async def run_scenario(request: ScenarioRunRequest):
             device_name=request.device,
             app_package=request.package,
             goal=request.goal,
-            llm_fn=lambda p: llm_service.get_completion(p, provider=provider)
+            llm_fn=llm_service.decider(provider)
         )
         plan_desc = f"IA Reativa ({provider.upper()})"
 
@@ -137,7 +235,9 @@ async def run_scenario(request: ScenarioRunRequest):
         f"O log de execução foi:\n{execution_log}\n\n"
         "Com base nisso, dê uma conclusão final curta sobre o sucesso da tarefa."
     )
-    final_analysis = await llm_service.get_completion(analysis_prompt, provider=provider)
+    final_analysis = await _analyze(analysis_prompt, provider=provider)
+    if on_event:
+        on_event("analysis", analysis=final_analysis)
 
     return {
         "package": request.package,
@@ -149,20 +249,126 @@ async def run_scenario(request: ScenarioRunRequest):
 
 
 @router.post("/run-scenario/itau", summary="Cenário fixo antigo: Login no Itaú Investimentos")
-async def run_scenario_itau(request: ScenarioItauRequest):
+async def run_scenario_itau(request: ScenarioItauRequest, http_request: Request):
+    return await _cancel_on_disconnect(http_request, _run_scenario_itau(request))
+
+
+async def _run_scenario_itau(request: ScenarioItauRequest):
     service = AutomationService()
     log = await service.run_itau_login(
         device_name=request.device,
         agencia=request.agencia,
         conta=request.conta,
         senha=request.senha,
-        llm_fn=llm_service.get_completion,
+        llm_fn=llm_service.decider(),
     )
 
     # LLM analisa o resultado
-    analysis = await llm_service.get_completion(
+    analysis = await _analyze(
         f"O resultado do cenário de login no Itaú foi:\n{log}\n\n"
         "Dê uma conclusão curta em português sobre o que funcionou e o que falhou."
     )
 
     return {"log": log, "analysis": analysis}
+
+
+# ---------- Jobs (execução em segundo plano) ----------
+
+@router.post("/jobs", summary="Enfileira um cenário e devolve o id do job imediatamente")
+async def create_job(request: ScenarioRunRequest):
+    job = job_manager.submit(
+        kind=request.mode,
+        device_name=request.device,
+        params=request.model_dump(),
+        runner=lambda job: _run_scenario(request, on_event=job.emit, run_id=job.id),
+    )
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.post("/jobs/dynamic", summary="Enfileira uma automação reativa (com descoberta do pacote) como job")
+async def create_dynamic_job(request: DynamicRequest):
+    job = job_manager.submit(
+        kind="dynamic",
+        device_name=request.device,
+        params=request.model_dump(),
+        runner=lambda job: _run_dynamic(request, on_event=job.emit, run_id=job.id),
+    )
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}", summary="Status e resultado de um job")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/events", summary="Eventos do job em tempo real (Server-Sent Events)")
+async def stream_job_events(job_id: str, http_request: Request, since: int = 0):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    # Na reconexão o EventSource manda o id do último evento recebido: continua do seguinte
+    last_event_id = http_request.headers.get("last-event-id", "").strip()
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else since
+
+    async def event_source():
+        async for event in job.stream(start=start):
+            yield f"id: {event['seq']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/jobs/{job_id}", summary="Cancela um job em fila ou em execução")
+async def cancel_job(job_id: str):
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return {"cancelled": job_manager.cancel(job_id)}
+
+
+@router.post("/batch", summary="Executa vários cenários distribuídos entre dispositivos (job)")
+async def run_batch(request: BatchRequest):
+    await asyncio.to_thread(scenario_repository.refresh)
+    scenarios, _ = scenario_repository.query(ids=request.scenario_ids or None)
+    if not scenarios:
+        raise HTTPException(status_code=404, detail="Nenhum cenário encontrado")
+    if not request.devices:
+        raise HTTPException(status_code=422, detail="Informe ao menos um dispositivo")
+
+    provider = request.provider.lower()
+    llm_fn = llm_service.decider(provider)
+
+    def runner(job):
+        batch = BatchRunner(
+            devices=request.devices,
+            run_fn=lambda device, scenario: run_scenario_on_device(device, scenario, llm_fn, default_mode=request.mode),
+            max_retries=request.retries,
+            on_event=job.emit,
+        )
+        return batch.run(scenarios)
+
+    # Lotes concorrentes são serializados entre si (device_name "batch")
+    job = job_manager.submit(kind="batch", device_name="batch", params=request.model_dump(), runner=runner)
+    return {"job_id": job.id, "status": job.status, "scenarios": len(scenarios)}
+
+
+# ---------- Screenshots em memória ----------
+
+@router.get("/runs/{run_id}/frames", summary="Lista os screenshots guardados de uma execução")
+async def list_frames(run_id: str):
+    return frame_store.frames(run_id)
+
+
+@router.get("/runs/{run_id}/frames/{index}", summary="Screenshot de um passo (miniatura, ou PNG com full=true)")
+async def get_frame(run_id: str, index: int, full: bool = False):
+    frame = frame_store.get(run_id, index, full=full)
+    if frame is None:
+        raise HTTPException(status_code=404, detail="Frame não encontrado")
+    content, media_type = frame
+    return Response(content=content, media_type=media_type, headers={"Cache-Control": "max-age=3600"})
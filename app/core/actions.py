@@ -0,0 +1,214 @@
+import json
+import re
+
+# Prefixos de ação suportados
+CLICK_PREFIXES   = ["clique em", "click on", "toque em"]
+TYPE_PREFIXES    = ["digite", "escreva", "type", "insira"]
+SCROLL_DOWN      = ["role para baixo", "scroll down", "deslize para baixo", "rolar para baixo"]
+SCROLL_UP        = ["role para cima",  "scroll up",   "deslize para cima",  "rolar para cima"]
+WAIT_PREFIXES    = ["espere", "aguarde", "wait"]
+GOAL_REACHED     = "OBJETIVO_ALCANÇADO"
+
+ACTION_PREFIXES = tuple(CLICK_PREFIXES + TYPE_PREFIXES + SCROLL_DOWN + SCROLL_UP + WAIT_PREFIXES)
+# Tamanho máximo de um lote de ações numa só resposta da IA
+MAX_BATCH = 5
+# Sinônimos aceitos no campo "action" do JSON
+KIND_ALIASES = {"tap": "click", "clique": "click", "input": "type", "digite": "type", "swipe": "scroll", "role": "scroll"}
+
+_DECODER = json.JSONDecoder()
+
+
+class Action:
+    """Ação do motor: click, type, scroll, wait ou done (objetivo alcançado)."""
+
+    __slots__ = ("kind", "target", "value")
+
+    def __init__(self, kind: str, target: str | None = None, value=None):
+        self.kind = kind
+        self.target = target
+        self.value = value
+
+    @classmethod
+    def from_dict(cls, data) -> "Action | None":
+        """Ação no formato JSON do prompt; None se faltar algo obrigatório."""
+        if not isinstance(data, dict):
+            return None
+        kind = str(data.get("action", "")).strip().lower()
+        kind = KIND_ALIASES.get(kind, kind)
+        target = data.get("target")
+        target = str(target).strip() if target not in (None, "") else None
+        if kind == "click" and target:
+            return cls("click", target)
+        if kind == "type":
+            value = data.get("value", data.get("text"))
+            return cls("type", target, str(value)) if value not in (None, "") else None
+        if kind == "scroll":
+            return cls("scroll", value="up" if str(data.get("direction", "down")).lower() == "up" else "down")
+        if kind == "wait":
+            seconds = _digits(str(data.get("seconds", data.get("value", ""))))
+            return cls("wait", value=seconds) if seconds is not None else None
+        if kind == "done":
+            return cls("done")
+        return None
+
+    @classmethod
+    def from_line(cls, line: str) -> "Action | None":
+        """Ação em texto livre ("Clique em X", "Digite Y"...), o formato antigo das respostas e do cache."""
+        clean = line.strip().strip("\"'*` ")
+        if GOAL_REACHED in clean.upper():
+            return cls("done")
+        low = clean.lower()
+        for prefixes, kind in ((CLICK_PREFIXES, "click"), (TYPE_PREFIXES, "type")):
+            for p in prefixes:
+                if low.startswith(p):
+                    # Mantém maiúsculas do texto original (senhas, nomes)
+                    value = clean[len(p):].strip().strip("\"':-")
+                    value = re.sub(r'[\[\]]', '', value).split('/')[0].strip()
+                    if not value:
+                        return None
+                    return cls("click", value) if kind == "click" else cls("type", value=value)
+        if any(p in low for p in SCROLL_DOWN):
+            return cls("scroll", value="down")
+        if any(p in low for p in SCROLL_UP):
+            return cls("scroll", value="up")
+        if low.startswith(tuple(WAIT_PREFIXES)):
+            seconds = _digits(low)
+            return cls("wait", value=seconds) if seconds is not None else None
+        return None
+
+    def as_dict(self) -> dict:
+        data = {"action": self.kind}
+        if self.target:
+            data["target"] = self.target
+        if self.kind == "type":
+            data["value"] = self.value
+        elif self.kind == "scroll":
+            data["direction"] = self.value
+        elif self.kind == "wait":
+            data["seconds"] = self.value
+        return data
+
+    def to_text(self) -> str:
+        """Forma canônica guardada no cache e nos planos (texto quando dá, JSON quando há alvo de digitação)."""
+        if self.kind == "click":
+            return f"Clique em {self.target}"
+        if self.kind == "type" and not self.target:
+            return f"Digite {self.value}"
+        if self.kind == "scroll":
+            return "Role para cima" if self.value == "up" else "Role para baixo"
+        if self.kind == "wait":
+            return f"Espere {self.value}"
+        if self.kind == "done":
+            return GOAL_REACHED
+        return json.dumps(self.as_dict(), ensure_ascii=False)
+
+    def __repr__(self) -> str:
+        return f"Action({self.as_dict()!r})"
+
+
+def parse_actions(text: str, limit: int = MAX_BATCH) -> list[Action]:
+    """
+    Ações da resposta da IA: o lote JSON pedido no prompt ou, se não houver, a
+    primeira linha de ação em texto. Uma ação inválida encerra o lote ali.
+    """
+    data = _json_payload(text)
+    if data is not None:
+        if isinstance(data, dict):
+            # {"actions": [...]}, uma ação solta {"action": ...} ou {"done": true}
+            items = data.get("actions") or ([data] if "action" in data else [])
+            if not items and data.get("done"):
+                return [Action("done")]
+            if not isinstance(items, list):
+                items = []
+        else:
+            items = data
+        actions = []
+        for item in items[:limit]:
+            action = Action.from_dict(item)
+            if action is None:
+                break
+            if action.kind == "done":
+                # "Objetivo alcançado" só vale sozinho; depois de outras ações a IA ainda não sabe
+                if not actions:
+                    actions.append(action)
+                break
+            actions.append(action)
+        if actions:
+            return actions
+    for line in text.split("\n"):
+        action = Action.from_line(line)
+        if action is not None:
+            return [action]
+    return []
+
+
+def format_actions(actions: list[Action]) -> str:
+    """Texto de uma decisão: a própria ação se for uma só, senão o lote em JSON compacto."""
+    if len(actions) == 1:
+        return actions[0].to_text()
+    return json.dumps({"actions": [a.as_dict() for a in actions]}, ensure_ascii=False, separators=(",", ":"))
+
+
+def first_action(text: str, final: bool = False) -> str | None:
+    """
+    Resposta já utilizável durante o streaming: o lote JSON completo ou a primeira
+    linha completa que é uma ação (ou o sinal de objetivo alcançado). Em texto só
+    valem linhas terminadas em "\\n", porque o alvo ainda pode estar chegando;
+    com `final=True` a última linha também conta.
+    """
+    start = _json_start(text)
+    if start is not None:
+        try:
+            _, end = _DECODER.raw_decode(text, start)
+            return text[start:end]
+        except ValueError:
+            if not final:
+                return None
+    elif not final and not text.strip(" \n`"):
+        return None
+
+    if GOAL_REACHED in text:
+        # Nada depois do sinal muda a decisão
+        before = text[:text.index(GOAL_REACHED)]
+        if not any(_is_action(line) for line in before.split("\n")[:-1]):
+            return GOAL_REACHED
+    lines = text.split("\n")
+    if not final:
+        lines = lines[:-1]
+    for line in lines:
+        if _is_action(line):
+            return line.strip().strip("\"'*` ")
+    return None
+
+
+def _is_action(line: str) -> bool:
+    return line.strip().strip("\"'*` ").lower().startswith(ACTION_PREFIXES)
+
+
+def _digits(text: str) -> int | None:
+    match = re.search(r"\d+", text)
+    return int(match.group()) if match else None
+
+
+def _json_start(text: str) -> int | None:
+    """Posição do JSON quando a resposta começa por ele (aceita cerca ```json)."""
+    i = len(text) - len(text.lstrip())
+    if text.startswith("```", i):
+        newline = text.find("\n", i)
+        if newline < 0:
+            return None
+        i = newline + 1
+        i += len(text[i:]) - len(text[i:].lstrip())
+    return i if text[i:i + 1] in ("{", "[") else None
+
+
+def _json_payload(text: str):
+    """Primeiro objeto/lista JSON da resposta, onde quer que esteja; None se não houver."""
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            data, _ = _DECODER.raw_decode(text, match.start())
+        except ValueError:
+            continue
+        if isinstance(data, (dict, list)):
+            return data
+    return None
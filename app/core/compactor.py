@@ -0,0 +1,129 @@
+import bisect
+import json
+import math
+import os
+import re
+import unicodedata
+
+from app.core.elements import UIElement
+
+# Chaves curtas usadas no prompt (a legenda vai junto no texto do prompt)
+SHORT_KEYS = {
+    "type": "t",
+    "resource-id": "id",
+    "content-desc": "d",
+    "text": "x",
+    "checkable": "ck",
+    "scrollable": "sc",
+}
+PROMPT_LEGEND = "t=tipo, x=texto, d=descrição, id=resource-id, ck=marcável, sc=rolável, n=itens similares omitidos"
+
+# Tipos com que o robô pode interagir diretamente
+ACTIONABLE_TYPES = {"button", "input", "checkbox", "switch"}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]{3,}")
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Estimativa barata de tokens (sem tokenizer): ~4 caracteres por token."""
+    return math.ceil(len(text) / chars_per_token)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class PromptCompactor:
+    """Reduz a lista de elementos da tela ao que cabe no orçamento de tokens do prompt."""
+
+    def __init__(self, token_budget: int = 1200, max_repeats: int = 3, text_radius: int = 2):
+        self.token_budget = token_budget
+        # Quantas linhas "iguais" (mesmo tipo + resource-id) de uma lista são mantidas
+        self.max_repeats = max_repeats
+        # Distância máxima (em elementos) de um texto até o elemento acionável mais próximo
+        self.text_radius = text_radius
+
+    def compact(self, elements: list[UIElement], goal: str) -> tuple[str, dict]:
+        """Devolve (JSON compacto, estatísticas com tokens antes/depois)."""
+        original = json.dumps([el.as_dict() for el in elements], ensure_ascii=False, separators=(',', ':'))
+        goal_words = set(WORD_PATTERN.findall(_normalize(goal)))
+
+        scores = [self._score(el, goal_words) for el in elements]
+        actionable = [i for i, el in enumerate(elements) if self._is_actionable(el)]
+        actionable_set = set(actionable)
+
+        kept: list[tuple[int, UIElement]] = []
+        seen: set[tuple] = set()
+        repeats: dict[tuple, int] = {}
+        omitted: dict[tuple, int] = {}
+        for i, el in enumerate(elements):
+            relevant = scores[i] >= 10  # cita ao menos uma palavra do objetivo
+            signature = tuple(el.items())
+            if signature in seen:
+                continue
+            seen.add(signature)
+
+            # Linhas repetidas de lista: mantém as primeiras e as relevantes para o objetivo
+            row_key = (el.type, el.resource_id)
+            if el.resource_id:
+                repeats[row_key] = repeats.get(row_key, 0) + 1
+                if repeats[row_key] > self.max_repeats and not relevant:
+                    omitted[row_key] = omitted.get(row_key, 0) + 1
+                    continue
+
+            # Texto solto longe de qualquer elemento acionável raramente ajuda a decidir
+            # (sem nenhum acionável na tela, o texto é tudo o que o modelo tem)
+            if actionable and not relevant and i not in actionable_set and not self._near(i, actionable):
+                continue
+            kept.append((i, el))
+
+        selected = self._fit_budget(kept, scores)
+        compacted = [{SHORT_KEYS.get(k, k): v for k, v in el.items()} for _, el in selected]
+        # Indica no último item mantido de cada lista quantas linhas similares foram omitidas
+        last_of_row = {(el.type, el.resource_id): pos for pos, (_, el) in enumerate(selected)}
+        for row_key, count in omitted.items():
+            if row_key in last_of_row:
+                compacted[last_of_row[row_key]]["n"] = count
+        compact_json = json.dumps(compacted, ensure_ascii=False, separators=(',', ':'))
+
+        stats = {
+            "elements_before": len(elements),
+            "elements_after": len(compacted),
+            "tokens_before": estimate_tokens(original),
+            "tokens_after": estimate_tokens(compact_json),
+        }
+        return compact_json, stats
+
+    def _fit_budget(self, kept: list[tuple[int, UIElement]], scores: list[int]) -> list[tuple[int, UIElement]]:
+        # Escolhe pelos mais relevantes, mas devolve na ordem do documento (o layout importa)
+        ranked = sorted(kept, key=lambda item: (-scores[item[0]], item[0]))
+        chosen, used = [], 2  # colchetes do array
+        for i, el in ranked:
+            cost = estimate_tokens(json.dumps(el.as_dict(), ensure_ascii=False, separators=(',', ':'))) + 1
+            if used + cost > self.token_budget:
+                continue
+            chosen.append((i, el))
+            used += cost
+        return sorted(chosen, key=lambda item: item[0])
+
+    def _score(self, el: UIElement, goal_words: set[str]) -> int:
+        score = 5 if self._is_actionable(el) else 0
+        if goal_words:
+            label = _normalize(" ".join(v for v in (el.text, el.content_desc, el.short_id) if v))
+            score += 10 * len(goal_words & set(WORD_PATTERN.findall(label)))
+        return score
+
+    def _is_actionable(self, el: UIElement) -> bool:
+        return (
+            el.type in ACTIONABLE_TYPES or el.clickable
+            or el.checkable or el.scrollable or bool(el.content_desc)
+        )
+
+    def _near(self, index: int, actionable: list[int]) -> bool:
+        pos = bisect.bisect_left(actionable, index - self.text_radius)
+        return pos < len(actionable) and actionable[pos] <= index + self.text_radius
+
+
+# Instância global
+prompt_compactor = PromptCompactor(token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "1200")))
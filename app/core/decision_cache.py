@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.redaction import GOAL_KEY_PREFIX, goal_key, types_literal
+
+
+class DecisionCache:
+    """
+    Cache persistente (SQLite) de decisões por (pacote, objetivo, hash de tela), com TTL e LRU.
+    O objetivo é gravado como hash e decisões que digitam valores não são guardadas.
+    Chamadas bloqueantes: o motor as faz fora do event loop (`asyncio.to_thread`).
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        # Acertos ainda não gravados {(pacote, objetivo, hash): (acertos, último uso)}: a leitura
+        # não faz commit; eles vão para o disco junto com a próxima escrita ou no `flush`
+        self._hits: dict[tuple, tuple[int, float]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexão aberta sob demanda: importar o módulo não cria arquivos em disco
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS decisions ("
+                " package TEXT NOT NULL, goal TEXT NOT NULL, screen_hash TEXT NOT NULL,"
+                " decision TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (package, goal, screen_hash))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_lru ON decisions (last_used)")
+            # Bancos de versões anteriores guardavam o objetivo em texto (e o que foi digitado)
+            self._conn.execute("DELETE FROM decisions WHERE goal NOT LIKE ?", (GOAL_KEY_PREFIX + "%",))
+            self._conn.commit()
+        return self._conn
+
+    def get(self, package: str, goal: str, screen_hash: str) -> str | None:
+        """Devolve a decisão já validada para esta tela, ou None (expiradas contam como falta)."""
+        goal = goal_key(goal)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT decision, created_at FROM decisions WHERE package = ? AND goal = ? AND screen_hash = ?",
+                (package, goal, screen_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            decision, created_at = row
+            if now - created_at > self.ttl:
+                # A expirada sai na próxima limpeza (`put`)
+                return None
+            key = (package, goal, screen_hash)
+            self._hits[key] = (self._hits.get(key, (0, 0.0))[0] + 1, now)
+            return decision
+
+    def contains(self, package: str, goal: str, screen_hash: str) -> bool:
+        """Há decisão válida para a tela? Só consulta: não conta acerto nem mexe no LRU."""
+        goal = goal_key(goal)
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT created_at FROM decisions WHERE package = ? AND goal = ? AND screen_hash = ?",
+                (package, goal, screen_hash),
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def put(self, package: str, goal: str, screen_hash: str, decision: str):
+        """
+        Grava uma decisão que comprovadamente funcionou (levou a outra tela ou ao objetivo).
+        Decisões que digitam um valor ficam de fora: a IA decide de novo nessas telas.
+        """
+        if types_literal(decision):
+            return
+        goal = goal_key(goal)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO decisions (package, goal, screen_hash, decision, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (package, goal, screen_hash)"
+                " DO UPDATE SET decision = excluded.decision, created_at = excluded.created_at,"
+                " last_used = excluded.last_used",
+                (package, goal, screen_hash, decision, now, now),
+            )
+            self._flush_hits(conn)
+            self._evict(conn, now)
+            conn.commit()
+
+    def invalidate(self, package: str, goal: str, screen_hash: str):
+        goal = goal_key(goal)
+        with self._lock:
+            conn = self._connect()
+            self._hits.pop((package, goal, screen_hash), None)
+            conn.execute(
+                "DELETE FROM decisions WHERE package = ? AND goal = ? AND screen_hash = ?",
+                (package, goal, screen_hash),
+            )
+            conn.commit()
+
+    def flush(self):
+        """Grava os acertos acumulados pelas leituras (fim de execução)."""
+        with self._lock:
+            if self._hits:
+                conn = self._connect()
+                self._flush_hits(conn)
+                conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            self._hits.clear()
+            conn.execute("DELETE FROM decisions")
+            conn.commit()
+
+    def _flush_hits(self, conn: sqlite3.Connection):
+        if not self._hits:
+            return
+        conn.executemany(
+            "UPDATE decisions SET hits = hits + ?, last_used = MAX(last_used, ?)"
+            " WHERE package = ? AND goal = ? AND screen_hash = ?",
+            [(hits, last_used, *key) for key, (hits, last_used) in self._hits.items()],
+        )
+        self._hits.clear()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM decisions WHERE created_at < ?", (now - self.ttl,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM decisions").fetchone()
+        if count > self.max_entries:
+            # Remove as menos usadas recentemente até voltar ao limite
+            conn.execute(
+                "DELETE FROM decisions WHERE rowid IN (SELECT rowid FROM decisions ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+# Instância global
+decision_cache = DecisionCache(
+    path=os.getenv("DECISION_CACHE_PATH", os.path.join(".cache", "decisions.db")),
+    ttl=float(os.getenv("DECISION_CACHE_TTL", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("DECISION_CACHE_MAX_ENTRIES", "5000")),
+)
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class DeviceExecutor:
+    """Executa a I/O bloqueante do driver Appium fora do event loop, com um pool de threads por dispositivo."""
+
+    def __init__(self, workers_per_device: int = 1):
+        # O cliente Selenium/Appium não é thread-safe: por padrão cada dispositivo
+        # tem uma única thread, o que serializa os comandos daquele device sem
+        # impedir que N emuladores rodem em paralelo.
+        self.workers_per_device = max(1, workers_per_device)
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self, device_name: str) -> ThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(device_name)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.workers_per_device,
+                    thread_name_prefix=f"device-{device_name}",
+                )
+                self._executors[device_name] = executor
+            return executor
+
+    async def run(self, device_name: str, fn, *args, **kwargs):
+        """Agenda `fn(*args, **kwargs)` no pool do dispositivo e aguarda o resultado sem bloquear o loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(device_name), partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+
+# Instância global compartilhada por todas as execuções do processo
+device_executor = DeviceExecutor(int(os.getenv("DEVICE_WORKERS", "1")))
@@ -0,0 +1,133 @@
+import json
+
+# Ordem fixa dos atributos na visão em dict/JSON (a mesma do prompt e do hash)
+FIELDS = ("type", "resource-id", "content-desc", "text", "checkable", "scrollable")
+
+
+def parse_bounds(value: str | None) -> tuple[int, int, int, int] | None:
+    """Converte "[x1,y1][x2,y2]" em (x1, y1, x2, y2); None se ausente ou com área vazia."""
+    if not value:
+        return None
+    try:
+        x1, y1, x2, y2 = map(int, value[1:-1].replace("][", ",").split(","))
+    except ValueError:
+        return None
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+class UIElement:
+    """
+    Elemento relevante da tela em formato compacto: slots em vez de dict, strings
+    repetidas (classe, tipo, resource-id) internadas e bounds já em inteiros.
+    A visão em dict (a mesma do JSON do prompt) só é montada quando alguém pede, e
+    os bounds ficam como a string do XML até alguém ler `bounds`/`center` (na prática,
+    só o elemento em que o robô toca).
+    """
+
+    __slots__ = (
+        "type", "node_class", "resource_id", "content_desc", "text",
+        "checkable", "scrollable", "clickable", "enabled", "focused", "_bounds", "_dict",
+    )
+
+    def __init__(
+        self,
+        type: str,
+        node_class: str = "",
+        resource_id: str | None = None,
+        content_desc: str | None = None,
+        text: str | None = None,
+        checkable: bool = False,
+        scrollable: bool = False,
+        clickable: bool = False,
+        enabled: bool = True,
+        focused: bool = False,
+        bounds: tuple[int, int, int, int] | str | None = None,
+    ):
+        self.type = type
+        self.node_class = node_class
+        # resource-id completo (com o pacote); o prompt usa só a parte após a "/"
+        self.resource_id = resource_id
+        self.content_desc = content_desc
+        self.text = text
+        self.checkable = checkable
+        self.scrollable = scrollable
+        self.clickable = clickable
+        self.enabled = enabled
+        self.focused = focused
+        # Tupla já convertida ou o texto "[x1,y1][x2,y2]" do XML, convertido no primeiro acesso
+        self._bounds = bounds
+        self._dict = None
+
+    @property
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        if isinstance(self._bounds, str):
+            self._bounds = parse_bounds(self._bounds)
+        return self._bounds
+
+    @property
+    def short_id(self) -> str | None:
+        return self.resource_id.rsplit("/", 1)[-1] if self.resource_id else None
+
+    @property
+    def center(self) -> tuple[int, int] | None:
+        if not self.bounds:
+            return None
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def items(self):
+        """Pares (atributo, valor) presentes, na ordem de FIELDS, sem montar o dict."""
+        yield "type", self.type
+        if self.resource_id:
+            yield "resource-id", self.short_id
+        if self.content_desc:
+            yield "content-desc", self.content_desc
+        if self.text:
+            yield "text", self.text
+        if self.checkable:
+            yield "checkable", "true"
+        if self.scrollable:
+            yield "scrollable", "true"
+
+    def get(self, key: str, default=None):
+        return self.as_dict().get(key, default)
+
+    def as_dict(self) -> dict:
+        if self._dict is None:
+            self._dict = dict(self.items())
+        return self._dict
+
+    def __repr__(self) -> str:
+        return f"UIElement({self.as_dict()!r}, bounds={self.bounds})"
+
+
+class UIScreen:
+    """Resultado de um parse: elementos e o JSON compacto, serializado só quando usado."""
+
+    __slots__ = ("elements", "error", "_json")
+
+    def __init__(self, elements: list[UIElement], error: str | None = None):
+        self.elements = elements
+        self.error = error
+        self._json = None
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            if self.error is not None:
+                self._json = json.dumps({"error": f"Failed to parse XML: {self.error}"})
+            else:
+                self._json = json.dumps(
+                    [el.as_dict() for el in self.elements], ensure_ascii=False, separators=(',', ':')
+                )
+        return self._json
+
+    def focused_input(self) -> UIElement | None:
+        """Campo de texto com foco ou, na falta dele, o primeiro campo habilitado."""
+        inputs = [el for el in self.elements if el.type == "input" and el.enabled]
+        return next((el for el in inputs if el.focused), inputs[0] if inputs else None)
+
+    def __len__(self) -> int:
+        return len(self.elements)
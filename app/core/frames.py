@@ -0,0 +1,109 @@
+import io
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # Opcional: sem Pillow os frames são servidos no PNG original
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class Frame:
+    """Screenshot capturado em memória; a miniatura é gerada depois, fora do passo."""
+
+    __slots__ = ("index", "step", "png", "thumbnail")
+
+    def __init__(self, index: int, step: int, png: bytes):
+        self.index = index
+        self.step = step
+        self.png = png
+        self.thumbnail = None
+
+
+class FrameStore:
+    """Ring buffer de screenshots por execução, com codificação e persistência em segundo plano."""
+
+    def __init__(
+        self,
+        frames_per_run: int = 30,
+        max_runs: int = 50,
+        thumbnail_width: int = 360,
+        persist_dir: str | None = None,
+    ):
+        self.frames_per_run = frames_per_run
+        self.max_runs = max_runs
+        self.thumbnail_width = thumbnail_width
+        self.persist_dir = persist_dir
+        self._runs: OrderedDict[str, deque] = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Um único worker: codificar/gravar não compete com as threads dos dispositivos
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frames")
+
+    def add(self, run_id: str, step: int, png: bytes) -> int:
+        """Guarda o PNG no buffer da execução e agenda miniatura/persistência; devolve o índice do frame."""
+        with self._lock:
+            buffer = self._runs.get(run_id)
+            if buffer is None:
+                buffer = self._runs[run_id] = deque(maxlen=self.frames_per_run)
+                while len(self._runs) > self.max_runs:
+                    old_run, _ = self._runs.popitem(last=False)
+                    self._counters.pop(old_run, None)
+            index = self._counters.get(run_id, 0)
+            self._counters[run_id] = index + 1
+            frame = Frame(index, step, png)
+            buffer.append(frame)
+
+        if Image is not None:
+            self._worker.submit(self._encode, frame)
+        if self.persist_dir:
+            self._worker.submit(self._persist, run_id, frame)
+        return index
+
+    def get(self, run_id: str, index: int, full: bool = False) -> tuple[bytes, str] | None:
+        """(bytes, media type) do frame; a miniatura é usada quando já estiver pronta."""
+        with self._lock:
+            frame = next((f for f in self._runs.get(run_id, ()) if f.index == index), None)
+        if frame is None:
+            return None
+        if not full and frame.thumbnail is not None:
+            return frame.thumbnail, "image/webp"
+        return frame.png, "image/png"
+
+    def frames(self, run_id: str) -> list[dict]:
+        with self._lock:
+            return [{"index": f.index, "step": f.step} for f in self._runs.get(run_id, ())]
+
+    def shutdown(self):
+        self._worker.shutdown(wait=False)
+
+    def _encode(self, frame: Frame):
+        try:
+            with Image.open(io.BytesIO(frame.png)) as image:
+                ratio = self.thumbnail_width / image.width
+                if ratio < 1:
+                    image = image.resize((self.thumbnail_width, int(image.height * ratio)))
+                out = io.BytesIO()
+                image.save(out, format="WEBP", quality=70)
+            frame.thumbnail = out.getvalue()
+        except Exception:
+            pass
+
+    def _persist(self, run_id: str, frame: Frame):
+        try:
+            run_dir = os.path.join(self.persist_dir, run_id)
+            os.makedirs(run_dir, exist_ok=True)
+            with open(os.path.join(run_dir, f"{frame.index:04d}.png"), "wb") as f:
+                f.write(frame.png)
+        except OSError:
+            pass
+
+
+# Instância global
+frame_store = FrameStore(
+    frames_per_run=int(os.getenv("FRAMES_PER_RUN", "30")),
+    persist_dir=os.getenv("FRAMES_DIR") or None,
+)
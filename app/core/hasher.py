@@ -1,5 +1,30 @@
 import hashlib
 import json
+import re
+
+from app.core.elements import UIElement
+
+try:
+    # Hash não-criptográfico mais rápido, usado quando disponível
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Separadores que não aparecem em textos de UI
+FIELD_SEP = "\x1f"
+ELEMENT_SEP = "\x1e"
+# Entre a parte estrutural e os textos voláteis no conteúdo do hash
+VOLATILE_SEP = b"\x1d"
+
+# Trechos voláteis mascarados no modo estrutural (relógios, contadores, porcentagens)
+VOLATILE_PATTERN = re.compile(r"\d+")
+VOLATILE_ATTRS = ("text", "content-desc")
+
+
+def _hasher(data: bytes):
+    if xxhash:
+        return xxhash.xxh3_64(data)
+    return hashlib.blake2b(data, digest_size=8)
 
 class UIHasher:
     """Gera identificadores únicos (hashes) para estados de tela baseados na UI minificada."""
@@ -18,6 +43,58 @@ class UIHasher:
             # Fallback seguro caso o JSON falhe
             return hashlib.sha256(minified_ui_json.encode('utf-8')).hexdigest()
 
+    def fingerprint(self, elements, structural: bool = False) -> str:
+        """
+        Impressão digital rápida direto da lista de elementos do UIParser (sem JSON).
+        Aceita qualquer iterável, inclusive `ui_parser.iter_elements(...)`, sendo
+        calculada incrementalmente durante o parse.
+
+        No modo `structural`, dígitos em textos são mascarados: um relógio ou
+        contador mudando não conta como troca de tela.
+        """
+        return self.fingerprints(elements)[1 if structural else 0]
+
+    def fingerprints(self, elements) -> tuple[str, str]:
+        """
+        `(exato, estrutural)` numa única passada pelos elementos: os textos voláteis
+        vão para uma sequência à parte, mascarada de uma vez só para o digest estrutural.
+        """
+        parts, volatile = [], []
+        add, add_volatile = parts.append, volatile.append
+        sep = FIELD_SEP
+        for el in elements:
+            if type(el) is UIElement:
+                # Direto dos slots, sem montar o dict: o mesmo conteúdo de `el.items()`
+                rid = el.resource_id
+                add(f"type{sep}{el.type}{sep}resource-id{sep}{rid.rsplit('/', 1)[-1]}" if rid else f"type{sep}{el.type}")
+                if el.checkable:
+                    add(f"checkable{sep}true")
+                if el.scrollable:
+                    add(f"scrollable{sep}true")
+                if el.content_desc:
+                    add_volatile(f"content-desc{sep}{el.content_desc}")
+                if el.text:
+                    add_volatile(f"text{sep}{el.text}")
+                add(ELEMENT_SEP)
+                add_volatile(ELEMENT_SEP)
+                continue
+            # O parser emite as chaves sempre na mesma ordem, então não precisamos ordenar
+            for key, val in el.items():
+                if key in VOLATILE_ATTRS:
+                    add_volatile(key)
+                    add_volatile(val)
+                else:
+                    add(key)
+                    add(val)
+            add(ELEMENT_SEP)
+            add_volatile(ELEMENT_SEP)
+        texts = FIELD_SEP.join(volatile)
+        exact = _hasher(FIELD_SEP.join(parts).encode("utf-8") + VOLATILE_SEP)
+        structural = exact.copy()
+        exact.update(texts.encode("utf-8"))
+        structural.update(VOLATILE_PATTERN.sub("#", texts).encode("utf-8"))
+        return exact.hexdigest(), structural.hexdigest()
+
     def has_changed(self, old_hash: str, new_hash: str) -> bool:
         """Compara dois hashes de tela."""
         return old_hash != new_hash
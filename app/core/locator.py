@@ -0,0 +1,109 @@
+import re
+from difflib import SequenceMatcher
+
+from app.core.compactor import _normalize
+from app.core.elements import UIElement, UIScreen
+
+# Campos usados para casar o alvo pedido pela IA, na ordem de preferência
+MATCH_FIELDS = ("text", "content-desc", "resource-id")
+# Alvos genéricos que significam "o campo de texto da tela"
+INPUT_TARGETS = {"campo", "input"}
+
+SEPARATORS = re.compile(r"[_\-.:/]+")
+
+
+def clean_label(text: str) -> str:
+    """Rótulo comparável: minúsculo, sem acentos e com separadores de id virando espaço."""
+    return " ".join(SEPARATORS.sub(" ", _normalize(text)).split())
+
+
+def match_score(wanted: str, label: str) -> float:
+    """Semelhança entre o alvo pedido e um rótulo (ambos já limpos), de 0 a 1."""
+    if wanted == label:
+        return 1.0
+    if wanted in label:
+        # "bateria" em "bateria e economia": quanto mais do rótulo coberto, melhor
+        return 0.7 + 0.25 * len(wanted) / len(label)
+    if len(label) >= 3 and label in wanted:
+        return 0.6 + 0.2 * len(label) / len(wanted)
+    matcher = SequenceMatcher(None, wanted, label)
+    if matcher.quick_ratio() < 0.6:
+        return 0.0
+    return 0.9 * matcher.ratio()
+
+
+def similarity(wanted: str, label: str) -> float:
+    """Semelhança crua (`SequenceMatcher.ratio`) entre alvo e rótulo já limpos, de 0 a 1."""
+    return SequenceMatcher(None, wanted, label).ratio()
+
+
+class LocatorMatch:
+    """Elemento escolhido pelo índice e o campo que casou com o alvo."""
+
+    __slots__ = ("element", "field", "score")
+
+    def __init__(self, element: UIElement, field: str, score: float):
+        self.element = element
+        self.field = field
+        self.score = score
+
+    @property
+    def center(self) -> tuple[int, int] | None:
+        return self.element.center
+
+    @property
+    def label(self) -> str:
+        return str(self.element.get(self.field, ""))
+
+
+class ElementIndex:
+    """
+    Índice local da tela já interpretada: resolve o alvo de um clique por
+    correspondência aproximada, sem sondar o dispositivo seletor por seletor.
+    """
+
+    def __init__(self, screen: UIScreen, min_score: float = 0.6, fuzzy_min_ratio: float = 0.85):
+        self.screen = screen
+        self.min_score = min_score
+        # Rótulo que não contém o alvo precisa ser quase a mesma grafia ("wifi" x "Wi-Fi", 0.89);
+        # contido no alvo ou só parecido ("Bateria" para "Economia de bateria", 0.54) costuma ser
+        # outro elemento: abaixo disso o clique vai para a sondagem de seletores (ou falha)
+        self.fuzzy_min_ratio = fuzzy_min_ratio
+        self._entries = []
+        for element in screen.elements:
+            labels = {}
+            for field, value in zip(MATCH_FIELDS, (element.text, element.content_desc, element.short_id)):
+                if value:
+                    labels[field] = clean_label(value)
+            self._entries.append((element, labels))
+
+    def resolve(self, target: str) -> LocatorMatch | None:
+        """
+        Melhor elemento para o alvo: rótulo igual ou que contém o alvo acima do score
+        mínimo; os demais só com `similarity` acima de `fuzzy_min_ratio`. None se nada passar.
+        """
+        wanted = clean_label(target)
+        if not wanted:
+            return None
+        if wanted in INPUT_TARGETS:
+            element = self.screen.focused_input()
+            return LocatorMatch(element, "type", 1.0) if element else None
+
+        best, best_key = None, None
+        for position, (element, labels) in enumerate(self._entries):
+            for rank, field in enumerate(MATCH_FIELDS):
+                label = labels.get(field)
+                if not label:
+                    continue
+                score = match_score(wanted, label)
+                if score < self.min_score:
+                    continue
+                if wanted not in label and similarity(wanted, label) < self.fuzzy_min_ratio:
+                    continue
+                # Empate: prefere habilitado e clicável, depois o campo mais legível, depois o primeiro na tela
+                key = (score, element.enabled, element.clickable, -rank, -position)
+                if best_key is None or key > best_key:
+                    best, best_key = LocatorMatch(element, field, score), key
+                    if score == 1.0 and element.enabled and element.clickable:
+                        return best  # igual e clicável: nada adiante ganha
+        return best
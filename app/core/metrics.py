@@ -0,0 +1,195 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+
+def _labels_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, key: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Contador monotônico com rótulos; pode ser lido de uma função no momento da coleta."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        # collect() -> {tupla de rótulos: valor}, chamado a cada /metrics (para contadores que já existem em outro objeto)
+        self._collect = collect
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _labels_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels_key(self.labelnames, labels), 0.0)
+
+    def samples(self):
+        if self._collect is not None:
+            try:
+                values = self._collect()
+            except Exception:
+                values = {}
+            with self._lock:
+                self._values = {tuple(str(v) for v in key): value for key, value in values.items()}
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_labels_key(self.labelnames, labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus (buckets, _sum e _count)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # {rótulos: [contagem por bucket..., +Inf, soma]}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_labels_key(self.labelnames, labels))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, f'le="{le}"'), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), series[-1]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), cumulative
+
+
+class MetricsRegistry:
+    """Registro das métricas do processo, exportadas em texto no formato do Prometheus."""
+
+    def __init__(self, prefix: str = "qualityai"):
+        self.prefix = prefix
+        self._metrics: dict[str, object] = {}
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: tuple = (), collect=None) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help, labelnames, collect))
+
+    def gauge(self, name: str, help: str, labelnames: tuple = (), collect=None) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help, labelnames, collect))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value:g}" if isinstance(value, float) else f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class RunTrace:
+    """Trace JSONL de uma execução: um span (ou evento) por linha, gravado na hora."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: dict):
+        if self._file is not None:
+            self._file.write(json.dumps({"ts": round(time.time(), 3), **record}, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Instância global
+metrics = MetricsRegistry()
+
+# ── Métricas do motor e da LLM ────────────────────────────────────────
+
+STEP_SECONDS = metrics.histogram("step_seconds", "Duração de cada passo de automação", ("mode",))
+PHASE_SECONDS = metrics.histogram(
+    "phase_seconds", "Duração de cada etapa do passo (observe, parse, hash, llm, act, settle, screenshot)", ("phase",)
+)
+DRIVER_CALLS = metrics.counter("driver_calls_total", "Chamadas ao driver Appium", ("call",))
+DRIVER_SECONDS = metrics.histogram("driver_call_seconds", "Latência das chamadas ao driver Appium", ("call",))
+DECISIONS = metrics.counter("decisions_total", "Decisões por origem (plan, cache, llm)", ("source",))
+RUNS = metrics.counter("runs_total", "Execuções finalizadas", ("mode", "result"))
+LLM_SECONDS = metrics.histogram(
+    "llm_request_seconds", "Latência das chamadas à LLM por backend", ("provider", "backend", "status")
+)
+LLM_ATTEMPTS = metrics.counter(
+    "llm_attempts_total", "Tentativas por backend (first, retry após falha, hedge após o p95)", ("backend", "kind")
+)
+LLM_HEDGES = metrics.counter("llm_hedges_total", "Requisições duplicadas por passarem do p95", ("provider",))
+LLM_EARLY_STOPS = metrics.counter(
+    "llm_early_stops_total", "Respostas em streaming interrompidas ao reconhecer a ação", ("provider",)
+)
+LLM_QUEUE_SECONDS = metrics.histogram(
+    "llm_queue_seconds", "Espera pelo limite de concorrência do provedor antes da chamada", ("provider",)
+)
+LLM_TOKENS = metrics.histogram(
+    "llm_tokens", "Tokens por chamada à LLM (prompt, prompt_eval fora do cache do modelo, resposta)", ("provider", "kind"), buckets=TOKEN_BUCKETS
+)
+LLM_TOKENS_TOTAL = metrics.counter("llm_tokens_total", "Tokens consumidos na LLM", ("provider", "kind"))
+PACKAGE_RESOLUTIONS = metrics.counter(
+    "package_resolutions_total", "Nomes de app resolvidos para pacote, por origem (index, alias, llm)", ("source",)
+)
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class PackageIndex:
+    """
+    Pacotes instalados por dispositivo (SQLite): versão, rótulo e se o app abre pelo
+    launcher, mais os nomes já resolvidos pela LLM (nome pedido → pacote).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS packages ("
+                " device TEXT NOT NULL, package TEXT NOT NULL, version TEXT NOT NULL,"
+                " label TEXT, launchable INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (device, package))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS refreshes (device TEXT PRIMARY KEY, refreshed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                " name TEXT PRIMARY KEY, package TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def packages(self, device: str) -> dict[str, dict]:
+        """{pacote: {"version", "label", "launchable"}} do dispositivo."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT package, version, label, launchable FROM packages WHERE device = ?", (device,)
+            ).fetchall()
+        return {
+            package: {"version": version, "label": label, "launchable": bool(launchable)}
+            for package, version, label, launchable in rows
+        }
+
+    def refreshed_at(self, device: str) -> float | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT refreshed_at FROM refreshes WHERE device = ?", (device,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def apply(self, device: str, upserts: list[tuple], removed: list[str]):
+        """Grava uma atualização incremental: (pacote, versão, rótulo, launcher) novos/alterados e os removidos."""
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO packages (device, package, version, label, launchable) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (device, package) DO UPDATE SET version = excluded.version,"
+                " label = excluded.label, launchable = excluded.launchable",
+                [(device, package, version, label, int(launchable)) for package, version, label, launchable in upserts],
+            )
+            conn.executemany(
+                "DELETE FROM packages WHERE device = ? AND package = ?", [(device, package) for package in removed]
+            )
+            conn.execute(
+                "INSERT INTO refreshes (device, refreshed_at) VALUES (?, ?)"
+                " ON CONFLICT (device) DO UPDATE SET refreshed_at = excluded.refreshed_at",
+                (device, time.time()),
+            )
+            conn.commit()
+
+    def alias(self, name: str) -> str | None:
+        with self._lock:
+            row = self._connect().execute("SELECT package FROM aliases WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def learn(self, name: str, package: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO aliases (name, package, created_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET package = excluded.package, created_at = excluded.created_at",
+                (name, package, time.time()),
+            )
+            conn.commit()
+
+
+# Instância global
+package_index = PackageIndex(path=os.getenv("PACKAGE_INDEX_PATH", os.path.join(".cache", "packages.db")))
@@ -1,11 +1,23 @@
 import xml.etree.ElementTree as ET
-import json
 import re
+from sys import intern
+
+from app.core.elements import UIElement, UIScreen
+
+try:
+    # Aceleração opcional: usada automaticamente quando o lxml está instalado
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+# Tamanho dos blocos entregues ao parser incremental
+FEED_CHUNK_SIZE = 64 * 1024
 
 class UIParser:
     """Consome XML bruto do Appium e gera uma representação mínima e semântica."""
 
-    def __init__(self):
+    def __init__(self, use_lxml: bool | None = None):
+        self.use_lxml = (lxml_etree is not None) if use_lxml is None else (use_lxml and lxml_etree is not None)
         # Atributos que realmente importam para identificar elementos e interagir
         self.essential_attrs = ["resource-id", "content-desc", "text", "checkable", "scrollable"]
         # Classes comuns que queremos mapear para tipos amigáveis
@@ -21,51 +33,90 @@ class UIParser:
 
     def parse_to_json(self, xml_source: str) -> str:
         """Converte XML filtrado para JSON string compacta."""
+        return self.parse(xml_source).json
+
+    def parse_screen(self, xml_source: str) -> tuple[list[UIElement], str]:
+        """Faz o parse uma única vez e devolve (elementos, JSON compacto); em erro, ([], JSON de erro)."""
+        screen = self.parse(xml_source)
+        return screen.elements, screen.json
+
+    def parse(self, xml_source: str) -> UIScreen:
+        """Parse da tela; o JSON só é gerado se `screen.json` for lido."""
         try:
-            root = ET.fromstring(xml_source)
-            elements = self._extract_interactive_elements(root)
-            return json.dumps(elements, ensure_ascii=False, separators=(',', ':'))
+            return UIScreen(self.parse_elements(xml_source))
         except Exception as e:
-            return json.dumps({"error": f"Failed to parse XML: {str(e)}"})
+            return UIScreen([], error=str(e))
 
-    def _extract_interactive_elements(self, node):
-        interactive_elements = []
-        
-        # Atributos de interação
-        is_clickable = node.get("clickable") == "true"
-        is_long_clickable = node.get("long-clickable") == "true"
-        is_scrollable = node.get("scrollable") == "true"
-        has_text = bool(node.get("text"))
-        has_desc = bool(node.get("content-desc"))
-        
-        # Se o elemento for interativo ou contiver informação legível
-        if is_clickable or is_long_clickable or is_scrollable or has_text or has_desc:
-            el_data = {}
-            
-            # Mapeia tipo
-            node_class = node.get("class", "")
-            el_data["type"] = self.class_map.get(node_class, "element")
-            
-            # Adiciona apenas atributos existentes e não vazios
-            for attr in self.essential_attrs:
-                val = node.get(attr)
-                if val and val != "false":
-                    # Limpa resource-id para ficar mais curto (remove o pacote)
-                    if attr == "resource-id":
-                        val = val.split("/")[-1]
-                    el_data[attr] = val
-            
-            # Se não sobrou nada útil além do tipo, ignora se não for clicável
-            if len(el_data) <= 1 and not is_clickable:
-                pass
+    def parse_elements(self, xml_source: str) -> list[UIElement]:
+        """Lista de elementos relevantes da tela, na ordem do documento."""
+        return list(self.iter_elements(xml_source))
+
+    def iter_elements(self, xml_source: str):
+        """
+        Percorre o XML em uma única passada (parser incremental, sem montar a árvore
+        inteira nem recursão) e gera os elementos relevantes em pré-ordem.
+        """
+        for event, node in self._iterparse(xml_source):
+            if event == "start":
+                element = self._element(node)
+                if element is not None:
+                    yield element
             else:
-                interactive_elements.append(el_data)
+                # Nó já processado: libera atributos e filhos para manter a memória baixa
+                node.clear()
+
+    def _iterparse(self, xml_source: str):
+        if self.use_lxml:
+            data = xml_source.encode("utf-8") if isinstance(xml_source, str) else xml_source
+            parser = lxml_etree.XMLPullParser(events=("start", "end"), huge_tree=True)
+        else:
+            data = xml_source
+            parser = ET.XMLPullParser(events=("start", "end"))
+        for i in range(0, len(data), FEED_CHUNK_SIZE):
+            parser.feed(data[i:i + FEED_CHUNK_SIZE])
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+
+    def _element(self, node) -> UIElement | None:
+        get = node.get
+        # Atributos de interação
+        is_clickable = get("clickable") == "true"
+        text = get("text")
+        desc = get("content-desc")
+        is_scrollable = get("scrollable") == "true"
+
+        # Se o elemento não for interativo nem contiver informação legível, ignora
+        if not (is_clickable or text or desc or is_scrollable or get("long-clickable") == "true"):
+            return None
+
+        # Vazio ou "false" não conta como valor
+        text = text if text != "false" else None
+        desc = desc if desc != "false" else None
+        resource_id = get("resource-id")
+        resource_id = resource_id if resource_id and resource_id != "false" else None
+        is_checkable = get("checkable") == "true"
+        # Se não sobrou nada útil além do tipo, ignora se não for clicável
+        if not (is_clickable or resource_id or desc or text or is_checkable or is_scrollable):
+            return None
+
+        node_class = intern(get("class", ""))
+        return UIElement(
+            self.class_map.get(node_class, "element"),
+            node_class,
+            # resource-ids se repetem em toda linha de lista: uma única cópia em memória
+            intern(resource_id) if resource_id else None,
+            desc or None,
+            text or None,
+            is_checkable,
+            is_scrollable,
+            is_clickable,
+            get("enabled") != "false",
+            get("focused") == "true",
+            # Convertidos só se alguém ler: quase nenhum elemento da tela é tocado
+            get("bounds"),
+        )
 
-        # Recursão para filhos
-        for child in node:
-            interactive_elements.extend(self._extract_interactive_elements(child))
-            
-        return interactive_elements
 
 # Instância global sugerida para o core
 ui_parser = UIParser()
@@ -0,0 +1,100 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.actions import parse_actions
+from app.core.redaction import GOAL_KEY_PREFIX, fill_typing, goal_key, redact_typing
+
+
+def _is_typing(action_text: str) -> bool:
+    return any(action.kind == "type" for action in parse_actions(action_text))
+
+
+class PlanStore:
+    """
+    Planos compilados (SQLite): a trajetória de uma execução reativa bem-sucedida,
+    com o hash de tela esperado antes de cada ação, por (pacote, objetivo). O objetivo
+    é gravado como hash e o que foi digitado vira referência a um trecho do objetivo.
+    Chamadas bloqueantes: o motor as faz fora do event loop (`asyncio.to_thread`).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " package TEXT NOT NULL, goal TEXT NOT NULL, steps TEXT NOT NULL,"
+                " created_at REAL NOT NULL, replays INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (package, goal))"
+            )
+            # Bancos de versões anteriores guardavam o objetivo e os valores digitados em texto
+            self._conn.execute("DELETE FROM plans WHERE goal NOT LIKE ?", (GOAL_KEY_PREFIX + "%",))
+            self._conn.commit()
+        return self._conn
+
+    def get(self, package: str, goal: str) -> list[dict] | None:
+        """Passos do plano: [{"screen_hash": ..., "action": ...}, ...] ou None."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT steps FROM plans WHERE package = ? AND goal = ?", (package, goal_key(goal))
+            ).fetchone()
+        if not row:
+            return None
+        # Valores digitados saem do objetivo atual, não do disco
+        return [{**step, "action": fill_typing(step["action"], goal)} for step in json.loads(row[0])]
+
+    def save(self, package: str, goal: str, steps: list[dict]) -> bool:
+        """
+        Grava a trajetória. False (e nada gravado) se alguma ação digita um valor
+        que não está no objetivo, porque o replay não teria de onde tirá-lo.
+        """
+        # Navegação que não mudou a tela (o próximo passo espera o mesmo hash) não entra no plano.
+        # Digitação fica sempre (senha mascarada ou só dígitos não mudam o hash, mas o campo
+        # precisa do valor), e também o toque logo antes dela, que pode ser o que deu foco ao campo
+        typing = [_is_typing(step["action"]) for step in steps]
+        compiled = [
+            dict(step) for i, step in enumerate(steps)
+            if i + 1 >= len(steps) or steps[i + 1]["screen_hash"] != step["screen_hash"]
+            or typing[i] or typing[i + 1]
+        ]
+        for step in compiled:
+            step["action"] = redact_typing(step["action"], goal)
+            if step["action"] is None:
+                return False
+        goal = goal_key(goal)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO plans (package, goal, steps, created_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (package, goal) DO UPDATE SET steps = excluded.steps, created_at = excluded.created_at",
+                (package, goal, json.dumps(compiled, ensure_ascii=False), time.time()),
+            )
+            conn.commit()
+        return True
+
+    def mark_replayed(self, package: str, goal: str):
+        goal = goal_key(goal)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE plans SET replays = replays + 1 WHERE package = ? AND goal = ?", (package, goal))
+            conn.commit()
+
+    def invalidate(self, package: str, goal: str):
+        goal = goal_key(goal)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM plans WHERE package = ? AND goal = ?", (package, goal))
+            conn.commit()
+
+
+# Instância global
+plan_store = PlanStore(path=os.getenv("PLAN_STORE_PATH", os.path.join(".cache", "plans.db")))
@@ -0,0 +1,79 @@
+import hashlib
+import re
+
+from app.core.actions import format_actions, parse_actions
+
+# Chaves de objetivo gravadas em disco: o objetivo pode trazer credenciais ("... Senha X")
+GOAL_KEY_PREFIX = "sha256:"
+# Valor digitado guardado como referência a um trecho do objetivo: {{goal:início:fim}}
+GOAL_SLICE = re.compile(r"\{\{goal:(\d+):(\d+)\}\}")
+# Valor digitado nos traces em disco
+TYPED_MASK = "***"
+# Campos dos registros de trace que podem trazer uma decisão ou ação com valor digitado
+TRACE_ACTION_FIELDS = ("decision", "action")
+
+
+def goal_key(goal: str) -> str:
+    """Chave do objetivo para os caches em disco (hash, nunca o texto)."""
+    return GOAL_KEY_PREFIX + hashlib.sha256(goal.encode("utf-8")).hexdigest()
+
+
+def types_literal(decision: str) -> bool:
+    """A decisão digita um valor literal (usuário, senha, busca)? Essas não vão para o disco."""
+    return any(action.kind == "type" and action.value for action in parse_actions(decision))
+
+
+def redact_typing(action_text: str, goal: str) -> str | None:
+    """
+    Ação de um plano sem o valor digitado: o valor vira a posição dele no objetivo,
+    preenchida de novo no replay. None quando o valor não aparece no objetivo.
+    """
+    actions = parse_actions(action_text)
+    if len(actions) != 1 or actions[0].kind != "type":
+        return action_text
+    action = actions[0]
+    start = goal.find(action.value)
+    if start < 0:
+        return None
+    action.value = f"{{{{goal:{start}:{start + len(action.value)}}}}}"
+    return action.to_text()
+
+
+def fill_typing(action_text: str, goal: str) -> str:
+    """Ação de um plano com o valor digitado tirado do objetivo atual."""
+    actions = parse_actions(action_text)
+    if len(actions) != 1 or actions[0].kind != "type":
+        return action_text
+    action = actions[0]
+    match = GOAL_SLICE.fullmatch(action.value or "")
+    if match:
+        action.value = goal[int(match.group(1)):int(match.group(2))]
+    return action.to_text()
+
+
+def mask_typing(text: str) -> str:
+    """Decisão ou ação (texto ou lote JSON) com os valores digitados trocados por TYPED_MASK."""
+    actions = parse_actions(text)
+    if not any(action.kind == "type" for action in actions):
+        return text
+    for action in actions:
+        if action.kind == "type":
+            action.value = TYPED_MASK
+    return format_actions(actions)
+
+
+def redact_record(record: dict) -> dict:
+    """Registro de trace sem valores digitados nos campos de decisão/ação."""
+    redacted = None
+    for field in TRACE_ACTION_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            masked = mask_typing(value)
+        elif isinstance(value, dict) and "value" in value and value.get("action") == "type":
+            masked = {**value, "value": TYPED_MASK}
+        else:
+            continue
+        if masked is not value:
+            redacted = redacted or dict(record)
+            redacted[field] = masked
+    return redacted or record
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from app.core.metrics import metrics
+
+
+class LazyRegistry:
+    """
+    Componentes caros de importar ou criar (SDK do Gemini, cliente Appium) registrados
+    por nome e só construídos no primeiro `get`. Quem usa só o Ollama e roteiros fixos
+    não paga o import do SDK do Google; uma carga que falha (sem chave, sem pacote)
+    não fica guardada e é tentada de novo no próximo uso.
+    """
+
+    def __init__(self):
+        self._loaders: dict[str, callable] = {}
+        self._instances: dict[str, object] = {}
+        # Segundos gastos na carga de cada componente (0 quando veio pronto por `set`)
+        self.load_seconds: dict[str, float] = {}
+        # Último erro de carga de cada componente que falhou
+        self.errors: dict[str, str] = {}
+        # Reentrante: a carga de um componente pode pedir outro
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader):
+        """`loader()` devolve o componente; substitui o anterior e descarta o que já estava carregado."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._instances.pop(name, None)
+            self.load_seconds.pop(name, None)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        # Threads de dispositivos diferentes podem pedir o mesmo componente ao mesmo tempo
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            loader = self._loaders.get(name)
+            if loader is None:
+                raise KeyError(f"Componente não registrado: {name}")
+            started = time.perf_counter()
+            try:
+                instance = loader()
+            except Exception as e:
+                self.errors[name] = str(e)
+                raise
+            self.load_seconds[name] = time.perf_counter() - started
+            self.errors.pop(name, None)
+            self._instances[name] = instance
+            return instance
+
+    def set(self, name: str, instance):
+        """Usa um componente já pronto (ex.: dublês dos benchmarks) no lugar do loader."""
+        with self._lock:
+            self._instances[name] = instance
+            self.load_seconds[name] = 0.0
+
+    def loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def preload(self, names):
+        """Carrega agora os componentes pedidos; os que falharem ficam em `errors`."""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "loaded": name in self._instances,
+                    "load_ms": round(self.load_seconds.get(name, 0.0) * 1000, 1),
+                    "error": self.errors.get(name),
+                }
+                for name in self._loaders.keys() | self._instances.keys()
+            }
+
+
+# Instância global
+registry = LazyRegistry()
+
+# Custo de carga de cada componente já carregado, lido no momento da coleta
+metrics.gauge(
+    "component_load_seconds", "Tempo de carga de cada componente carregado sob demanda", ("component",),
+    collect=lambda: {(name,): seconds for name, seconds in registry.load_seconds.items()},
+)
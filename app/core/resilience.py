@@ -0,0 +1,108 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Limite de taxa: `rate` requisições por segundo, com rajadas de até `burst`."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Segundos até haver uma ficha (0 = disponível agora)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def try_acquire(self) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            wait = self.wait_time()
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    """
+    Disjuntor: depois de `threshold` falhas seguidas fica aberto por `cooldown`
+    segundos; em seguida deixa passar uma tentativa (meio-aberto) e fecha se ela der certo.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 3, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False  # tentativa do meio-aberto em andamento
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self.trial)
+
+    def begin(self):
+        if self.state == self.HALF_OPEN:
+            self.trial = True
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self):
+        self.failures += 1
+        if self.trial or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+    def release(self):
+        """Tentativa abandonada (cancelada) sem veredito."""
+        self.trial = False
+
+
+class LatencyWindow:
+    """Latências recentes de sucesso, para estimar percentis (p95 do hedge)."""
+
+    def __init__(self, size: int = 100, min_samples: int = 10):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
@@ -0,0 +1,59 @@
+import json
+
+NO_CHANGES = "Nenhuma mudança na tela."
+
+
+def _index(elements: list[dict]) -> dict:
+    """
+    Identidade de cada elemento entre duas leituras: o resource-id quando ele é único
+    na tela; senão (linhas de lista, elementos sem id) o rótulo, e a ordem desempata.
+    """
+    ids = {}
+    for el in elements:
+        if el.get("id"):
+            ids[(el.get("t"), el["id"])] = ids.get((el.get("t"), el["id"]), 0) + 1
+    keyed, seen = {}, {}
+    for el in elements:
+        key = (el.get("t"), el.get("id"))
+        if ids.get(key, 0) != 1:
+            key += (el.get("d"), el.get("x"))
+        seen[key] = seen.get(key, 0) + 1
+        keyed[key + (seen[key],)] = el
+    return keyed
+
+
+def diff_screens(before: list[dict], after: list[dict]) -> dict:
+    """
+    Diferença elemento a elemento entre duas telas compactadas (as mesmas do prompt):
+    {"added": [...], "removed": [...], "changed": [(antes, depois), ...], "kept": N}.
+    """
+    old, new = _index(before), _index(after)
+    changed = [(old[key], el) for key, el in new.items() if key in old and old[key] != el]
+    return {
+        "added": [el for key, el in new.items() if key not in old],
+        "removed": [el for key, el in old.items() if key not in new],
+        "changed": changed,
+        "kept": sum(1 for key in new if key in old) - len(changed),
+    }
+
+
+def format_diff(diff: dict) -> str:
+    """Texto da diferença para o prompt: uma linha por elemento (+ novo, - saiu, ~ mudou)."""
+    if not (diff["added"] or diff["removed"] or diff["changed"]):
+        return NO_CHANGES
+
+    def dump(el: dict) -> str:
+        return json.dumps(el, ensure_ascii=False, separators=(',', ':'))
+
+    # Do que saiu basta a identidade; do que mudou, a versão nova (a antiga o modelo já viu)
+    lines = [f"MUDANÇAS NA TELA ({diff['kept']} elementos iguais omitidos):"]
+    lines += [f"+ {dump(el)}" for el in diff["added"]]
+    lines += [f"- {dump(_identity(el))}" for el in diff["removed"]]
+    lines += [f"~ {dump(new)}" for _, new in diff["changed"]]
+    return "\n".join(lines)
+
+
+def _identity(el: dict) -> dict:
+    if el.get("id"):
+        return {"t": el.get("t"), "id": el["id"]}
+    return {k: el[k] for k in ("t", "d", "x") if k in el}
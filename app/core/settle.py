@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+
+async def wait_until_stable(
+    snapshot,
+    timeout: float = 5.0,
+    initial_delay: float = 0.2,
+    max_delay: float = 1.0,
+    backoff: float = 2.0,
+    changed=None,
+    change_timeout: float = 1.5,
+):
+    """
+    Espera a UI "assentar": chama `snapshot()` (corrotina que devolve
+    `(fingerprint, dados)`) com backoff exponencial e retorna assim que duas
+    leituras seguidas têm o mesmo fingerprint ou o tempo limite acaba.
+
+    Com `changed(dados)` (True quando a tela já não é a de antes da ação), a
+    janela de estabilidade só começa depois que a tela mudar; se ela não mudar
+    em `change_timeout` segundos (ações que não trocam de tela), a espera acaba
+    na tela de antes.
+
+    Retorna `(dados da última leitura, estabilizou?, mudou?, segundos esperados)`;
+    `mudou?` é None quando `changed` não foi passado.
+    """
+    start = time.monotonic()
+    delay = initial_delay
+    previous = None
+    left = None if changed is None else False
+    while True:
+        fingerprint, data = await snapshot()
+        elapsed = time.monotonic() - start
+        if left is False:
+            if changed(data):
+                # Primeira leitura da tela nova: conta como início da janela de estabilidade
+                left, previous = True, fingerprint
+                await asyncio.sleep(min(delay, max(0.0, timeout - elapsed)))
+                delay = min(delay * backoff, max_delay)
+                continue
+            if elapsed >= min(change_timeout, timeout):
+                return data, True, False, elapsed
+            # Sem backoff aqui: a troca de tela deve ser notada logo que acontece
+            await asyncio.sleep(min(initial_delay, max(0.0, min(change_timeout, timeout) - elapsed)))
+            continue
+        if previous is not None and fingerprint == previous:
+            return data, True, left, elapsed
+        if elapsed >= timeout:
+            return data, False, left, elapsed
+        previous = fingerprint
+        await asyncio.sleep(min(delay, max(0.0, timeout - elapsed)))
+        delay = min(delay * backoff, max_delay)
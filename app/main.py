@@ -1,7 +1,35 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 from app.api.routes import router
+from app.core.device_executor import device_executor
+from app.core.frames import frame_store
+from app.core.registry import registry
+from app.services.job_service import job_manager
+from app.services.llm_service import llm_service
+from app.services.session_pool import session_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await llm_service.startup()
+    session_pool.start()
+    # SDKs carregam no primeiro uso; PRELOAD_COMPONENTS (ex.: "gemini,appium") adianta a carga para antes do tráfego
+    preload = [name.strip() for name in os.getenv("PRELOAD_COMPONENTS", "").split(",") if name.strip()]
+    if preload:
+        # Falhas ficam em /api/components; o componente é tentado de novo no primeiro uso
+        await asyncio.to_thread(registry.preload, preload)
+    yield
+    await job_manager.shutdown()
+    await llm_service.shutdown()
+    # Encerra as sessões Appium abertas antes de derrubar as threads dos dispositivos
+    await session_pool.close()
+    device_executor.shutdown(wait=False)
+    frame_store.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -9,6 +37,7 @@ def create_app() -> FastAPI:
         title="Orquestrador AI",
         description="Automação Mobile inteligente com LLM local (Ollama) + Appium",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
     # Rotas da API
@@ -1,78 +1,205 @@
+import asyncio
+import json
+import os
 import re
 import time
-from appium import webdriver
-from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
-
-APPIUM_SERVER = "http://localhost:4723"
-
-# Prefixos de ação suportados
-CLICK_PREFIXES   = ["clique em", "click on", "toque em"]
-TYPE_PREFIXES    = ["digite", "escreva", "type", "insira"]
-SCROLL_DOWN      = ["role para baixo", "scroll down", "deslize para baixo", "rolar para baixo"]
-SCROLL_UP        = ["role para cima",  "scroll up",   "deslize para cima",  "rolar para cima"]
-WAIT_PREFIXES    = ["espere", "aguarde", "wait"]
-
-
+import uuid
+
+# Esperas fixas usadas antes da espera adaptativa (base para medir a economia)
+FIXED_LAUNCH_WAIT = 3.0
+FIXED_STEP_WAIT   = 2.0
+SETTLE_TIMEOUT    = float(os.getenv("SETTLE_TIMEOUT", "5"))
+# Quanto esperar a tela sair da de antes da ação (ações que não trocam de tela param aqui)
+SETTLE_CHANGE_TIMEOUT = float(os.getenv("SETTLE_CHANGE_TIMEOUT", "1.5"))
+# Captura um screenshot a cada N passos (0 desliga)
+SCREENSHOT_EVERY  = int(os.getenv("SCREENSHOT_EVERY", "1"))
+# Modo pipeline: consulta a IA sobre a nova tela enquanto ela ainda está assentando
+LLM_PREFETCH      = os.getenv("LLM_PREFETCH", "false").lower() in ("1", "true", "yes")
+# Etapas medidas em cada passo
+TIMING_KEYS       = ("observe", "parse", "hash", "llm", "act", "settle")
+READING_KEYS      = ("observe", "parse", "hash")
+# Diretório opcional para o trace JSONL de cada execução ({run_id}.jsonl)
+TRACE_DIR         = os.getenv("TRACE_DIR") or None
+
+
+from app.core.actions import GOAL_REACHED, MAX_BATCH, Action, format_actions, parse_actions
 from app.core.parser import ui_parser
 from app.core.hasher import ui_hasher
+from app.core.compactor import PROMPT_LEGEND, estimate_tokens, prompt_compactor
+from app.core.elements import UIScreen
+from app.core.locator import ElementIndex
+from app.core.metrics import DECISIONS, DRIVER_CALLS, DRIVER_SECONDS, PHASE_SECONDS, RUNS, STEP_SECONDS, RunTrace
+from app.core.settle import wait_until_stable
+from app.core.decision_cache import decision_cache as shared_decision_cache
+from app.core.device_executor import device_executor
+from app.core.frames import frame_store
+from app.core.plan_store import plan_store as shared_plan_store
+from app.core.redaction import redact_record
+from app.core.registry import registry
+from app.core.screen_diff import diff_screens, format_diff
+from app.services.llm_router import LLMError
+from app.services.session_pool import session_pool
 
 
 class AutomationService:
     """Serviço responsável por executar automações no emulador Android via Appium."""
 
-    def __init__(self):
+    def __init__(
+        self, executor=None, pool=None, cache=None, on_event=None, run_id=None, screenshot_every=None, plans=None,
+        prefetch=None, trace_dir=None,
+    ):
+        self.executor = executor or device_executor
+        self.pool = pool or session_pool
+        self.cache = cache or shared_decision_cache
+        self.plans = plans or shared_plan_store
+        # Callback opcional `on_event(tipo, **dados)` para acompanhar a execução passo a passo
+        self.on_event = on_event
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.screenshot_every = SCREENSHOT_EVERY if screenshot_every is None else screenshot_every
+        self.screenshot_times: list[float] = []
+        self.session = None
+        self.session_failed = False
+        self.device_name = None
         self.driver = None
         self.last_ui_hash = None
         self.stuck_counter = 0
-        self.decision_cache = {}  # {hash: last_decision}
-
-    def _build_options(self, device_name: str, app_package: str) -> UiAutomator2Options:
-        options = UiAutomator2Options()
-        options.platform_name = "Android"
-        options.automation_name = "UiAutomator2"
-        options.device_name = device_name
-        options.app_package = app_package
-        options.no_reset = True
-        options.adb_exec_timeout = 60000   # 60s
-        options.new_command_timeout = 120  # 2 min
-        return options
-
-    def _quit(self):
-        if self.driver:
-            try:
-                self.driver.quit()
-            except Exception:
-                pass
+        self.decision_cache = {}  # {hash: last_decision} (só desta execução, para o aviso de tela travada)
+        self.screen = UIScreen([])  # última tela lida (alimenta o localizador e o "Digite")
+        self.screen_index = None
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.plan_hits = 0
+        self.batched_actions = 0  # ações que vieram no lote de uma decisão anterior (sem IA própria)
+        self.succeeded = False
+        self.settle_time = 0.0
+        self.fixed_wait_time = 0.0
+        self.unchanged_waits = 0  # esperas em que a ação não trocou de tela (fora da conta da economia)
+        self.prefetch = LLM_PREFETCH if prefetch is None else prefetch
+        self.speculation = None  # {"hash", "task", "log"} da consulta antecipada em andamento
+        self.prefetch_used = 0
+        self.prefetch_cancelled = 0
+        self.prefetch_saved = 0.0
+        self.timing = dict.fromkeys(TIMING_KEYS, 0.0)  # passo atual
+        self.timing_totals = dict.fromkeys(TIMING_KEYS, 0.0)
+        self.step_started = time.perf_counter()
+        self.trace_dir = TRACE_DIR if trace_dir is None else trace_dir
+        self.trace = None
+        # Modo conversa (LLM_CONVERSATION): a conversa da execução, a última tela enviada
+        # e o resultado das ações executadas desde então
+        self.chat = None
+        self.chat_screen = None
+        self.chat_outcomes: list[str] = []
+        self.prompt_tokens = 0
+        self.prompt_eval_tokens = 0
+        self.prompt_tokens_estimated = False  # algum total de prompt veio da estimativa por caracteres
+
+    def _emit(self, event_type: str, **data):
+        self._trace({"event": event_type, **data})
+        if self.on_event:
+            self.on_event(event_type, **data)
+
+    def _trace(self, record: dict):
+        if self.trace is not None:
+            # O trace vai para o disco: valores digitados (senhas do objetivo) não entram
+            self.trace.write({"run_id": self.run_id, **redact_record(record)})
+
+    def _record(self, phase: str, seconds: float, **attrs):
+        """Registra a duração de uma etapa: breakdown do passo, histograma e trace da execução."""
+        if phase in self.timing:
+            self.timing[phase] += seconds
+        PHASE_SECONDS.observe(seconds, phase=phase)
+        self._trace({"span": phase, "duration_ms": round(seconds * 1000, 2), **attrs})
+
+    async def _call(self, fn, *args, **kwargs):
+        """Executa uma chamada bloqueante do driver na thread do dispositivo atual."""
+        name = getattr(fn, "__name__", "call").lstrip("_")
+        started = time.perf_counter()
+        try:
+            return await self.executor.run(self.device_name, fn, *args, **kwargs)
+        finally:
+            DRIVER_CALLS.inc(call=name)
+            DRIVER_SECONDS.observe(time.perf_counter() - started, call=name)
+
+    async def _open(self, device_name: str, app_package: str):
+        """Obtém uma sessão do pool (reaproveitada quando possível) com o app já ativado."""
+        self.device_name = device_name
+        self.session_failed = False
+        self.session = await self.pool.acquire(device_name, app_package)
+        self.driver = self.session.driver
+        self.settle_time = 0.0
+        self.fixed_wait_time = 0.0
+        self.unchanged_waits = 0
+        self.screenshot_times = []
+        self.succeeded = False
+        self.prefetch_used = self.prefetch_cancelled = 0
+        self.prefetch_saved = 0.0
+        self.timing = dict.fromkeys(TIMING_KEYS, 0.0)
+        self.timing_totals = dict.fromkeys(TIMING_KEYS, 0.0)
+        self.step_started = time.perf_counter()
+        if self.trace_dir and self.trace is None:
+            self.trace = RunTrace(os.path.join(self.trace_dir, f"{self.run_id}.jsonl"))
+            self._trace({"event": "run_started", "device": device_name, "package": app_package})
+
+    async def _finish(self, mode: str):
+        """Fecha a execução: contabiliza o resultado, devolve a sessão e fecha o trace."""
+        result = "error" if self.session_failed else ("passed" if self.succeeded else "failed")
+        RUNS.inc(mode=mode, result=result)
+        await self._quit()
+        await asyncio.to_thread(self.cache.flush)
+        if self.trace is not None:
+            self._trace({"event": "run_finished", "mode": mode, "result": result, "totals_ms": {
+                key: round(value * 1000) for key, value in self.timing_totals.items()
+            }})
+            self.trace.close()
+            self.trace = None
+
+    async def _quit(self):
+        """Devolve a sessão ao pool; ela só é encerrada se a execução falhou."""
+        self._cancel_speculation()
+        if self.session:
+            await self.pool.release(self.session, healthy=not self.session_failed)
+            self.session = None
             self.driver = None
             self.last_ui_hash = None
             self.stuck_counter = 0
             self.decision_cache = {}
+            self.screen, self.screen_index = UIScreen([]), None
 
     # ── Helpers de Ação ────────────────────────────────────────────────
 
-    def _extract(self, step: str, prefixes: list) -> str | None:
-        """Extrai o alvo de um comando, agora mais resiliente a textos extras."""
-        low = step.strip().lower()
-        # Se a IA respondeu com várias linhas, pega a primeira que contenha um prefixo conhecido
-        lines = low.split('\n')
-        for line in lines:
-            line = line.strip()
-            for p in prefixes:
-                if line.startswith(p):
-                    # Pega o texto original para não perder maiúsculas se necessário (ex: senhas)
-                    idx = line.find(p)
-                    value = line[idx + len(p):].strip().strip("\"':-")
-                    # Limpa colchetes ou lixo comum
-                    value = re.sub(r'[\[\]]', '', value).split('/')[0].strip()
-                    return value
-        return None
+    def _locate(self, target: str):
+        """Resolve o alvo no índice da última tela observada (sem ida ao dispositivo)."""
+        if self.screen_index is None:
+            self.screen_index = ElementIndex(self.screen)
+        return self.screen_index.resolve(target)
+
+    def _tap(self, point: tuple[int, int]) -> bool:
+        # Toque direto nas coordenadas: uma única chamada ao servidor Appium
+        self.driver.tap([point])
+        return True
+
+    def _click_match(self, match) -> bool:
+        """Sem bounds: usa o melhor seletor único para o elemento escolhido (busca + clique)."""
+        resource_id = match.element.resource_id
+        by = registry.get("appium").By
+        try:
+            if resource_id and match.field in ("resource-id", "type"):
+                el = self.driver.find_element(by.ID, resource_id)
+            elif match.field == "content-desc":
+                el = self.driver.find_element(by.ACCESSIBILITY_ID, match.label)
+            elif match.field == "type":
+                el = self.driver.find_element(by.CLASS_NAME, "android.widget.EditText")
+            else:
+                label = match.label.replace('"', '\\"')
+                el = self.driver.find_element(by.ANDROID_UIAUTOMATOR, f'new UiSelector().text("{label}")')
+            el.click()
+            return True
+        except Exception:
+            return False
 
     def _click_element(self, target: str) -> bool:
-        """Tenta click por texto ou content-desc."""
-        # Ignora lixo comum que a IA possa colocar como "Botão" ou "Ícone"
-        target = re.sub(r'(?i)^(botão|ícone|campo|seta)\s+', '', target)
-        
+        """Fallback: sonda por texto ou content-desc (sem espera implícita, cada erro custa uma ida e volta)."""
+        by = registry.get("appium").By
         for selector in [
             f'new UiSelector().textContains("{target}")',
             f'new UiSelector().descriptionContains("{target}")',
@@ -81,13 +208,38 @@ class AutomationService:
         ]:
             if not selector: continue
             try:
-                el = self.driver.find_element(AppiumBy.ANDROID_UIAUTOMATOR, selector)
+                el = self.driver.find_element(by.ANDROID_UIAUTOMATOR, selector)
                 el.click()
                 return True
             except Exception:
                 pass
         return False
 
+    async def _click(self, target: str, log_list: list) -> bool:
+        """Clique resolvido pelo índice local; só sonda o dispositivo se o índice não achar o alvo."""
+        # Ignora lixo comum que a IA possa colocar como "Botão" ou "Ícone"
+        target = re.sub(r'(?i)^(botão|ícone|campo|seta)\s+', '', target)
+
+        started = time.perf_counter()
+        match = self._locate(target)
+        resolve_ms = (time.perf_counter() - started) * 1000
+        if match is not None and match.center:
+            how = f"toque em {match.center}"
+            ok = await self._call(self._tap, match.center)
+        elif match is not None:
+            how = f"seletor por {match.field}"
+            ok = await self._call(self._click_match, match)
+        else:
+            how = "sondagem de seletores"
+            ok = await self._call(self._click_element, target)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        found = f"'{match.label}' ({match.field}, score {match.score:.2f})" if match else "sem correspondência no índice"
+        log_list.append(f"🎯 Localizador: {found} → {how} | resolução {resolve_ms:.1f}ms, ação {total_ms:.0f}ms")
+        self._emit("locate", target=target, field=match.field if match else None, method=how,
+                   resolve_ms=round(resolve_ms, 2), total_ms=round(total_ms))
+        return ok
+
     def _scroll(self, direction: str = "down"):
         size = self.driver.get_window_size()
         cx = size["width"] // 2
@@ -95,50 +247,149 @@ class AutomationService:
         end_y   = int(size["height"] * 0.3) if direction == "down" else int(size["height"] * 0.7)
         self.driver.swipe(cx, start_y, cx, end_y, duration=600)
 
+    def _type_text(self, value: str, field=None) -> bool:
+        try:
+            # Campo visto na última leitura da tela mas sem foco: toca nele antes de digitar
+            if field is not None and not field.focused and field.center:
+                self.driver.tap([field.center])
+            # Tenta enviar para o elemento que está com foco
+            el = self.driver.switch_to.active_element
+            el.send_keys(value)
+            return True
+        except Exception:
+            # Se falhar, tenta achar um EditText e clicar antes
+            try:
+                el = self.driver.find_element(registry.get("appium").By.CLASS_NAME, "android.widget.EditText")
+                el.click()
+                el.send_keys(value)
+                return True
+            except Exception:
+                return False
+
+    def _get_page_source(self) -> str:
+        return self.driver.page_source
+
+    async def _capture(self, step: int):
+        """Screenshot em memória (sem disco no caminho crítico), amostrado a cada N passos."""
+        if self.screenshot_every <= 0 or (step - 1) % self.screenshot_every:
+            return
+        started = time.perf_counter()
+        png = await self._call(self.driver.get_screenshot_as_png)
+        elapsed = time.perf_counter() - started
+        self.screenshot_times.append(elapsed)
+        index = frame_store.add(self.run_id, step, png)
+        self._record("screenshot", elapsed, frame=index)
+        self._emit(
+            "screenshot", step=step, url=f"/api/runs/{self.run_id}/frames/{index}",
+            capture_ms=round(elapsed * 1000),
+        )
+
+    def _screenshot_report(self) -> str:
+        if not self.screenshot_times:
+            return "📸 Screenshots: nenhuma captura"
+        avg_ms = 1000 * sum(self.screenshot_times) / len(self.screenshot_times)
+        return f"📸 Screenshots: {len(self.screenshot_times)} capturas, média de {avg_ms:.0f}ms cada"
+
+    async def _observe(self):
+        """
+        Lê e interpreta a tela atual. Devolve o hash estrutural (usado para esperar a
+        tela assentar) e a observação (tela interpretada, hash exato, hash estrutural).
+        """
+        started = time.perf_counter()
+        source = await self._call(self._get_page_source)
+        fetched = time.perf_counter()
+        screen = ui_parser.parse(source)
+        parsed = time.perf_counter()
+        # Guarda a tela para o localizador; o índice só é montado se houver um clique
+        self.screen, self.screen_index = screen, None
+        if screen.elements:
+            # Hash exato e estrutural (relógios e contadores mudando não contam como troca de tela)
+            current_hash, layout_hash = ui_hasher.fingerprints(screen.elements)
+        else:
+            current_hash = layout_hash = ui_hasher.calculate_hash(screen.json)
+        self._record("observe", fetched - started, bytes=len(source))
+        self._record("parse", parsed - fetched, elements=len(screen))
+        self._record("hash", time.perf_counter() - parsed)
+        return layout_hash, (screen, current_hash, layout_hash)
+
+    async def _settle(self, fixed_wait: float, on_observe=None, before: str | None = None):
+        """
+        Espera a tela estabilizar (no lugar de um sleep fixo) e devolve a última observação.
+        Com `before` (hash exato da tela em que a ação rodou), primeiro espera a tela
+        mudar, até SETTLE_CHANGE_TIMEOUT. `on_observe(observação)` é chamado a cada
+        leitura (usado pela consulta antecipada).
+        """
+        async def snapshot():
+            fingerprint, observation = await self._observe()
+            if on_observe:
+                on_observe(observation)
+            return fingerprint, observation
+
+        reading = sum(self.timing[key] for key in READING_KEYS)
+        changed = None if before is None else (lambda observation: observation[1] != before)
+        observation, stable, left, elapsed = await wait_until_stable(
+            snapshot, timeout=SETTLE_TIMEOUT, changed=changed, change_timeout=SETTLE_CHANGE_TIMEOUT
+        )
+        # Só o tempo parado esperando; as leituras entram em observe/parse/hash
+        waited = elapsed - (sum(self.timing[key] for key in READING_KEYS) - reading)
+        self._record("settle", max(0.0, waited), stable=stable, changed=left)
+        # A economia só vale para esperas que terminaram numa tela nova e estável
+        if stable and left is not False:
+            self.settle_time += elapsed
+            self.fixed_wait_time += fixed_wait
+        elif left is False:
+            self.unchanged_waits += 1
+        self._emit("settle", stable=stable, changed=left, elapsed_ms=round(elapsed * 1000))
+        return observation
+
+    def _settle_report(self) -> str:
+        saved = self.fixed_wait_time - self.settle_time
+        report = (
+            f"⏱️ Espera adaptativa: {self.settle_time:.1f}s "
+            f"(esperas fixas seriam {self.fixed_wait_time:.1f}s, economia de {saved:.1f}s)"
+        )
+        if self.unchanged_waits:
+            report += f"; {self.unchanged_waits} ação(ões) sem troca de tela"
+        return report
+
     async def _execute_step(self, step_text: str, log_list: list) -> bool:
-        """Executa um comando unitário vindo da IA."""
-        # Clique
-        target = self._extract(step_text, CLICK_PREFIXES)
-        if target:
-            if self._click_element(target):
-                log_list.append(f"✅ Executou: Clique em '{target}'")
+        """Executa um comando (texto ou JSON) vindo da IA, do cache ou do script fixo."""
+        actions = parse_actions(step_text)
+        if not actions:
+            return False
+        for action in actions:
+            if not await self._execute_action(action, log_list):
+                return False
+        return True
+
+    async def _execute_action(self, action: Action, log_list: list) -> bool:
+        if action.kind == "click":
+            if await self._click(action.target, log_list):
+                log_list.append(f"✅ Executou: Clique em '{action.target}'")
                 return True
             return False
 
-        # Digitar (no elemento ativo ou tenta focar)
-        value = self._extract(step_text, TYPE_PREFIXES)
-        if value:
-            try:
-                # Tenta enviar para o elemento que está com foco
-                el = self.driver.switch_to.active_element
-                el.send_keys(value)
-                log_list.append(f"✅ Executou: Digitou '{value}'")
+        if action.kind == "type":
+            # Campo nomeado pela IA; sem nome (ou se não for um campo), o que estiver com foco
+            field = None
+            if action.target:
+                match = self._locate(action.target)
+                if match is not None and match.element.type == "input":
+                    field = match.element
+            if await self._call(self._type_text, action.value, field or self.screen.focused_input()):
+                where = f" em '{action.target}'" if action.target else ""
+                log_list.append(f"✅ Executou: Digitou '{action.value}'{where}")
                 return True
-            except Exception:
-                # Se falhar, tenta achar um EditText e clicar antes
-                try:
-                    el = self.driver.find_element(AppiumBy.CLASS_NAME, "android.widget.EditText")
-                    el.click()
-                    el.send_keys(value)
-                    return True
-                except:
-                    return False
-
-        # Rolar
-        if any(p in step_text.lower() for p in SCROLL_DOWN):
-            self._scroll("down")
-            log_list.append("✅ Executou: Rolagem para baixo")
-            return True
-        if any(p in step_text.lower() for p in SCROLL_UP):
-            self._scroll("up")
-            log_list.append("✅ Executou: Rolagem para cima")
+            return False
+
+        if action.kind == "scroll":
+            await self._call(self._scroll, action.value)
+            log_list.append(f"✅ Executou: Rolagem para {'cima' if action.value == 'up' else 'baixo'}")
             return True
 
-        # Esperar
-        wait_val = self._extract(step_text, WAIT_PREFIXES)
-        if wait_val and wait_val.isdigit():
-            time.sleep(int(wait_val))
-            log_list.append(f"✅ Executou: Espera de {wait_val}s")
+        if action.kind == "wait":
+            await asyncio.sleep(action.value)
+            log_list.append(f"✅ Executou: Espera de {action.value}s")
             return True
 
         return False
@@ -157,25 +408,36 @@ class AutomationService:
         """
         MAX_STEPS = 15
         results = []
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.plan_hits = 0
+        self.batched_actions = 0
+        pending = None  # (hash, decisão) da ação anterior, aguardando confirmação
+        # O llm_fn pode abrir uma conversa (LLMDecider com LLM_CONVERSATION=1)
+        open_chat = getattr(llm_fn, "conversation", None)
+        self.chat = open_chat(self._instructions(goal)) if open_chat else None
+        self.chat_screen, self.chat_outcomes = None, []
+        self.prompt_tokens = self.prompt_eval_tokens = 0
+        self.prompt_tokens_estimated = False
+        trajectory = []  # [{"screen_hash", "action"}] executados nesta execução
+        plan = await asyncio.to_thread(self.plans.get, app_package, goal)
+        plan_pos = 0
 
         try:
-            options = self._build_options(device_name, app_package)
-            self.driver = webdriver.Remote(command_executor=APPIUM_SERVER, options=options)
-            self.driver.implicitly_wait(5)
-            self.driver.activate_app(app_package)
-            time.sleep(3)
+            await self._open(device_name, app_package)
+            screen, current_hash, layout_hash = await self._settle(FIXED_LAUNCH_WAIT)
+            if plan:
+                results.append(f"📘 Plano compilado encontrado ({len(plan)} passos).")
 
             for i in range(MAX_STEPS):
                 results.append(f"\n--- PASSO {i+1} ---")
+                self._emit("step", step=i + 1, screen_hash=current_hash)
                 
-                # 1. Observar
-                source = self.driver.page_source
-                self.driver.save_screenshot('app/static/screenshot.png')  # Captura em tempo real
-                minified_ui = ui_parser.parse_to_json(source)
-                current_hash = ui_hasher.calculate_hash(minified_ui)
+                # 1. Observar (a tela já foi lida ao fim da espera adaptativa)
+                await self._capture(i + 1)  # Captura em tempo real
                 
                 is_stuck = False
-                if current_hash == self.last_ui_hash:
+                if layout_hash == self.last_ui_hash:
                     self.stuck_counter += 1
                     if self.stuck_counter >= 2:
                         results.append("⚠️ Tela estática. Buscando alternativa...")
@@ -183,53 +445,353 @@ class AutomationService:
                 else:
                     self.stuck_counter = 0
                 
-                self.last_ui_hash = current_hash
-
-                # 2. Decidir (com Cache Otimizado)
-                first_line = ""
-                # Se não estamos travados e temos a tela em cache, podemos pular a IA (opcional)
-                # No momento, vamos usar o cache apenas para AJUDAR o prompt se estivermos travados.
-                
-                prompt = (
-                    "VOCÊ É UM ROBÔ DE AUTOMAÇÃO ANDROID.\n"
-                    f"OBJETIVO: '{goal}'\n\n"
-                    f"ESTRUTURA DA TELA (JSON):\n{minified_ui}\n\n"
-                    "REGRAS:\n"
-                    "1. Responda APENAS com a ação: Clique em [X], Digite [Y], Role para baixo, Espere [N].\n"
-                    "2. Se o objetivo foi alcançado: 'OBJETIVO_ALCANÇADO'.\n"
+                self.last_ui_hash = layout_hash
+
+                pending = await self._confirm(pending, current_hash, app_package, goal)
+
+                # 2. Decidir: plano compilado > cache de decisões > IA
+                started = time.perf_counter()
+                source = None
+                if plan:
+                    expected = plan[plan_pos]
+                    if expected["screen_hash"] == current_hash:
+                        source, first_line = "plan", expected["action"]
+                        self.plan_hits += 1
+                        plan_pos += 1
+                        results.append(f"📘 Plano: {first_line}")
+                    else:
+                        # A tela divergiu do plano: segue no modo reativo a partir daqui
+                        results.append(f"🔀 Tela divergiu do plano no passo {plan_pos + 1}. Voltando ao modo reativo.")
+                        plan = None
+                if source is None:
+                    cached = None if is_stuck else await asyncio.to_thread(self.cache.get, app_package, goal, current_hash)
+                    if cached:
+                        source, first_line = "cache", cached
+                        self.cache_hits += 1
+                        results.append(f"♻️ Cache: {first_line}")
+                    else:
+                        source = "llm"
+                        # Tela travada pede um prompt diferente: a consulta antecipada não serve
+                        spec = None if is_stuck else self._take_speculation(current_hash)
+                        try:
+                            first_line = await self._llm_decision(
+                                goal, screen, current_hash, is_stuck, llm_fn, results, spec
+                            )
+                        except LLMError as e:
+                            # O roteador já tentou os outros backends: sem IA não há como seguir
+                            results.append(f"❌ IA indisponível: {e}")
+                            self._emit("llm_error", step=i + 1, error=str(e))
+                            break
+                        results.append(f"🤖 IA Decidiu: {first_line}")
+                self._cancel_speculation()
+                DECISIONS.inc(source=source)
+                self._emit(
+                    "decision", step=i + 1, decision=first_line, source=source,
+                    elapsed_ms=round((time.perf_counter() - started) * 1000),
                 )
-                
-                if is_stuck:
-                    prev_decision = self.decision_cache.get(current_hash, "Nenhuma")
-                    prompt += f"\n⚠️ ATENÇÃO: Você está preso nesta tela. A última ação foi '{prev_decision}'. TENTE ALGO DIFERENTE."
 
-                decision = (await llm_fn(prompt)).strip().strip("\"'")
-                first_line = decision.split('\n')[0].strip()
-                results.append(f"🤖 IA Decidiu: {first_line}")
-                
-                # Salva no cache
+                # Salva no cache local (usado no aviso de tela travada)
                 self.decision_cache[current_hash] = first_line
 
-                if "OBJETIVO_ALCANÇADO" in first_line.upper():
+                actions = parse_actions(first_line)
+                if actions and actions[0].kind == "done":
+                    if source == "llm":
+                        await asyncio.to_thread(self.cache.put, app_package, goal, current_hash, GOAL_REACHED)
                     results.append("✅ Objetivo final atingido!")
+                    self.succeeded = True
+                    # Compila a trajetória bem-sucedida para as próximas execuções
+                    trajectory.append({"screen_hash": current_hash, "action": GOAL_REACHED})
+                    if source == "plan" and plan_pos == len(plan):
+                        await asyncio.to_thread(self.plans.mark_replayed, app_package, goal)
+                    elif not await asyncio.to_thread(self.plans.save, app_package, goal, trajectory):
+                        results.append("📘 Plano não compilado: um valor digitado não está no objetivo.")
+                    self._report_timing(i + 1, results)
                     break
                 if first_line.upper().startswith("ERRO:"):
                     results.append(f"❌ Abortado: {first_line}")
+                    self._report_timing(i + 1, results)
                     break
 
-                # 3. Atuar
-                if not await self._execute_step(first_line, results):
-                    results.append(f"⚠️ Falha técnica ao executar '{first_line}'.")
-                
-                time.sleep(2)
+                # 3. Atuar: o lote vai em ordem, conferindo a tela antes de cada ação seguinte
+                if not actions:
+                    results.append(f"⚠️ Resposta sem ação reconhecível: '{first_line}'.")
+                    self.chat_outcomes.append("resposta sem ação reconhecível")
+                if len(actions) > 1:
+                    results.append(f"📦 Lote de {len(actions)} ações numa só decisão.")
+                diverged = False
+                acted_on = None  # tela em que a última ação bem-sucedida rodou
+                for n, action in enumerate(actions):
+                    if n:
+                        prev_hash = current_hash
+                        screen, current_hash, layout_hash = await self._settle(FIXED_STEP_WAIT, before=prev_hash)
+                        pending = await self._confirm(pending, current_hash, app_package, goal)
+                        reason = self._divergence(action, prev_hash, current_hash)
+                        if reason:
+                            # O resto do lote foi planejado para outra tela: a IA decide de novo
+                            results.append(f"🔀 Lote interrompido antes de '{action.to_text()}': {reason}. Voltando à IA.")
+                            self._emit("batch_diverged", step=i + 1, action=action.as_dict(), reason=reason)
+                            self.chat_outcomes.append(f"lote interrompido: {reason}")
+                            diverged = True
+                            break
+                        self.batched_actions += 1
+                    text = action.to_text()
+                    started = time.perf_counter()
+                    ok = await self._execute_action(action, results)
+                    self._record("act", time.perf_counter() - started, action=text, ok=ok)
+                    self._emit("action", step=i + 1, action=text, ok=ok, elapsed_ms=round((time.perf_counter() - started) * 1000))
+                    if not ok or source != "llm":
+                        # A conversa já sabe o que pediu: só falhas e ações vindas do plano/cache
+                        self.chat_outcomes.append(f"{text} → {'ok' if ok else 'falhou'}")
+                    if not ok:
+                        results.append(f"⚠️ Falha técnica ao executar '{text}'.")
+                        await asyncio.to_thread(self.cache.invalidate, app_package, goal, current_hash)
+                        if source == "plan":
+                            await asyncio.to_thread(self.plans.invalidate, app_package, goal)
+                            plan = None
+                        break
+                    pending = (current_hash, text)
+                    acted_on = current_hash
+                    trajectory.append({"screen_hash": current_hash, "action": text})
+                if plan and plan_pos >= len(plan):
+                    plan = None
+
+                if not diverged:
+                    on_observe = None
+                    # A conversa é sequencial: sem consulta antecipada no modo conversa
+                    if self.prefetch and self.chat is None:
+                        # A tela de antes da ação e a próxima tela do plano não precisam da IA
+                        skip = {current_hash}
+                        if plan:
+                            skip.add(plan[plan_pos]["screen_hash"])
+                        on_observe = lambda obs: self._speculate(obs, app_package, goal, llm_fn, skip)
+                    screen, current_hash, layout_hash = await self._settle(FIXED_STEP_WAIT, on_observe, before=acted_on)
+                self._report_timing(i + 1, results)
             else:
                 results.append("❌ Limite de passos atingido.")
 
+            results.append(self._cache_report())
+            results.append(self._timing_report())
+            results.append(self._settle_report())
+            results.append(self._screenshot_report())
             return "\n".join(results)
         except Exception as e:
+            self.session_failed = True
             return f"Erro na orquestração Sprint 5: {str(e)}"
         finally:
-            self._quit()
+            await self._finish("reactive")
+
+    async def _confirm(self, pending, current_hash: str, app_package: str, goal: str):
+        """Valida a ação anterior: se a tela mudou ela vai para o cache persistente, senão sai."""
+        if pending:
+            prev_hash, prev_decision = pending
+            if current_hash != prev_hash:
+                await asyncio.to_thread(self.cache.put, app_package, goal, prev_hash, prev_decision)
+            else:
+                await asyncio.to_thread(self.cache.invalidate, app_package, goal, prev_hash)
+        return None
+
+    def _divergence(self, action: Action, prev_hash: str, current_hash: str) -> str | None:
+        """Motivo para não seguir com o lote na tela atual (None = pode seguir)."""
+        if current_hash == prev_hash:
+            return "a ação anterior não mudou a tela"
+        if action.kind == "click" and self._locate(action.target) is None:
+            return f"'{action.target}' não está na tela"
+        return None
+
+    def _instructions(self, goal: str) -> str:
+        """Regras + objetivo: o começo fixo de todo prompt da execução (o modelo reaproveita o que já avaliou)."""
+        return (
+            "VOCÊ É UM ROBÔ DE AUTOMAÇÃO ANDROID.\n"
+            f"OBJETIVO: '{goal}'\n\n"
+            "REGRAS:\n"
+            "1. Responda APENAS com JSON: "
+            '{"actions": [{"action": "click", "target": "X"}, {"action": "type", "target": "campo", "value": "Y"}, '
+            '{"action": "scroll", "direction": "down"}, {"action": "wait", "seconds": N}]}.\n'
+            f"2. Em formulários, mande de uma vez todas as ações desta tela (até {MAX_BATCH}), na ordem.\n"
+            '3. Se o objetivo foi alcançado: {"done": true}.\n'
+            f"Legenda da tela: {PROMPT_LEGEND}\n"
+        )
+
+    async def _decide(
+        self, goal: str, screen: UIScreen, current_hash: str, is_stuck: bool, llm_fn, log_list: list
+    ) -> str:
+        """Monta o prompt (com a tela compactada) e devolve a ação (ou lote) da resposta da IA."""
+        if screen.elements:
+            screen_json, stats = prompt_compactor.compact(screen.elements, goal)
+            log_list.append(
+                f"🧮 Tela: {stats['tokens_before']} → {stats['tokens_after']} tokens "
+                f"({stats['elements_before']} → {stats['elements_after']} elementos)"
+            )
+        else:
+            screen_json = screen.json
+
+        hint = ""
+        if is_stuck:
+            prev_decision = self.decision_cache.get(current_hash, "Nenhuma")
+            hint = f"\n⚠️ ATENÇÃO: Você está preso nesta tela. A última ação foi '{prev_decision}'. TENTE ALGO DIFERENTE."
+
+        if self.chat is not None:
+            decision = (await self.chat.send(self._chat_message(screen, screen_json) + hint)).strip()
+            self._report_prompt_eval(log_list)
+        else:
+            # A tela vai no fim: tudo antes dela é igual em todos os passos
+            prompt = f"{self._instructions(goal)}\nESTRUTURA DA TELA (JSON):\n{screen_json}\n{hint}"
+            decision = (await llm_fn(prompt)).strip()
+        actions = parse_actions(decision)
+        if actions:
+            return format_actions(actions)
+        # Sem ação reconhecível (ex.: "Erro: ..."): devolve a primeira linha como veio
+        return decision.strip("\"'").split('\n')[0].strip()
+
+    def _chat_message(self, screen: UIScreen, screen_json: str) -> str:
+        """
+        Mensagem do passo no modo conversa: a tela inteira na primeira vez (ou quando
+        a conversa recomeça); depois, o resultado das ações e só o que mudou na tela.
+        """
+        if self.chat.expired:
+            self.chat.reset()
+        elements = json.loads(screen_json) if screen.elements else None
+        outcome = "; ".join(self.chat_outcomes) or "ok"
+        previous, self.chat_screen, self.chat_outcomes = self.chat_screen, elements, []
+        if not self.chat.messages or previous is None or elements is None:
+            return f"TELA ATUAL (JSON):\n{screen_json}"
+        update = format_diff(diff_screens(previous, elements))
+        if estimate_tokens(update) >= estimate_tokens(screen_json):
+            # Tela nova quase inteira: a diferença sairia maior que a própria tela
+            update = f"TELA NOVA (JSON):\n{screen_json}"
+        return f"RESULTADO: {outcome}\n{update}"
+
+    def _report_prompt_eval(self, log_list: list):
+        usage = self.chat.usage
+        if "prompt" not in usage:
+            return
+        self.prompt_tokens += usage["prompt"]
+        self.prompt_eval_tokens += usage["prompt_eval"]
+        estimated = usage.get("prompt_estimated", False)
+        self.prompt_tokens_estimated |= estimated
+        if estimated:
+            # Contagem real (avaliados) x estimativa por caracteres: a razão entre elas não é confiável
+            log_list.append(
+                f"🧠 Prompt: {usage['prompt_eval']} tokens avaliados pelo modelo "
+                f"(prompt inteiro com ~{usage['prompt']} tokens estimados)"
+            )
+        else:
+            reused = 100 * (1 - usage["prompt_eval"] / usage["prompt"]) if usage["prompt"] else 0.0
+            log_list.append(
+                f"🧠 Prompt: {usage['prompt_eval']} de {usage['prompt']} tokens avaliados "
+                f"({max(0.0, reused):.0f}% reaproveitado do contexto da conversa)"
+            )
+        self._emit(
+            "prompt_eval", prompt_tokens=usage["prompt"], prompt_eval=usage["prompt_eval"], prompt_estimated=estimated
+        )
+
+    async def _llm_decision(
+        self, goal: str, screen: UIScreen, current_hash: str, is_stuck: bool, llm_fn, log_list: list, spec=None
+    ) -> str:
+        """Decisão da IA; aproveita a consulta antecipada quando ela foi feita para esta mesma tela."""
+        started = time.perf_counter()
+        decision = None
+        prefetched = False
+        if spec is not None:
+            try:
+                decision, llm_time = await spec["task"]
+            except Exception:
+                decision = None
+            if decision is not None:
+                waited = time.perf_counter() - started
+                prefetched = True
+                self.prefetch_used += 1
+                self.prefetch_saved += max(0.0, llm_time - waited)
+                log_list.extend(spec["log"])
+                log_list.append(f"⚡ Consulta antecipada: {max(0.0, llm_time - waited):.1f}s de IA sobrepostos à espera")
+        if decision is None:
+            decision = await self._decide(goal, screen, current_hash, is_stuck, llm_fn, log_list)
+        self.llm_calls += 1
+        self._record("llm", time.perf_counter() - started, prefetched=prefetched)
+        return decision
+
+    # ── Consulta Antecipada ───────────────────────────────────────────
+
+    def _speculate(self, observation, app_package: str, goal: str, llm_fn, skip: set):
+        """Começa a consultar a IA sobre a tela recém-lida; se a tela mudar de novo, recomeça."""
+        screen, current_hash, _ = observation
+        if self.speculation and self.speculation["hash"] == current_hash:
+            return
+        self._cancel_speculation()
+        if current_hash in skip or not screen.elements:
+            return
+        log = []
+        task = asyncio.create_task(self._timed_decide(app_package, goal, screen, current_hash, llm_fn, log))
+        self.speculation = {"hash": current_hash, "task": task, "log": log}
+
+    async def _timed_decide(self, app_package: str, goal: str, screen: UIScreen, current_hash: str, llm_fn, log_list: list):
+        # Tela já coberta pelo cache: a decisão sairá dele, sem IA
+        if await asyncio.to_thread(self.cache.contains, app_package, goal, current_hash):
+            return None, 0.0
+        started = time.perf_counter()
+        decision = await self._decide(goal, screen, current_hash, False, llm_fn, log_list)
+        return decision, time.perf_counter() - started
+
+    def _take_speculation(self, current_hash: str):
+        """Entrega a consulta antecipada se ela for desta tela; caso contrário, descarta."""
+        spec = self.speculation
+        if spec is None or spec["hash"] != current_hash:
+            self._cancel_speculation()
+            return None
+        self.speculation = None
+        return spec
+
+    def _cancel_speculation(self):
+        if self.speculation is not None:
+            task = self.speculation["task"]
+            if task.done() and not task.cancelled():
+                task.exception()  # consulta que falhou e ninguém vai ler: evita o aviso do asyncio
+            task.cancel()
+            self.prefetch_cancelled += 1
+            self.speculation = None
+
+    # ── Relatórios ────────────────────────────────────────────────────
+
+    def _report_timing(self, step: int, log_list: list, mode: str = "reactive"):
+        """Fecha a medição do passo: log, evento, histograma e acumulado da execução."""
+        timing = self.timing
+        now = time.perf_counter()
+        STEP_SECONDS.observe(now - self.step_started, mode=mode)
+        self.step_started = now
+        log_list.append("⏱️ Etapas: " + " | ".join(f"{key} {timing[key] * 1000:.0f}ms" for key in TIMING_KEYS))
+        self._emit("timing", step=step, **{f"{key}_ms": round(timing[key] * 1000) for key in TIMING_KEYS})
+        for key in TIMING_KEYS:
+            self.timing_totals[key] += timing[key]
+        self.timing = dict.fromkeys(TIMING_KEYS, 0.0)
+
+    def _timing_report(self) -> str:
+        totals = self.timing_totals
+        report = "⏱️ Tempo por etapa: " + " | ".join(f"{key} {totals[key]:.1f}s" for key in TIMING_KEYS)
+        if self.prefetch:
+            report += (
+                f"\n⚡ Consulta antecipada: {self.prefetch_used} aproveitadas, {self.prefetch_cancelled} descartadas, "
+                f"{self.prefetch_saved:.1f}s de IA sobrepostos à espera da tela"
+            )
+        return report
+
+    def _cache_report(self) -> str:
+        decisions = self.plan_hits + self.cache_hits + self.llm_calls
+        reused = self.plan_hits + self.cache_hits
+        rate = (100 * reused / decisions) if decisions else 0.0
+        return (
+            f"\n📊 Cache de decisões: {reused}/{decisions} passos sem IA ({rate:.0f}%: "
+            f"{self.plan_hits} do plano compilado, {self.cache_hits} do cache), {self.llm_calls} chamadas à LLM."
+            + (f"\n📦 Ações em lote: {self.batched_actions} executadas sem consulta própria à LLM." if self.batched_actions else "")
+            + (
+                (
+                    f"\n🧠 Conversa: {self.prompt_eval_tokens} tokens de prompt avaliados pelo modelo "
+                    f"(~{self.prompt_tokens} tokens de prompt estimados)."
+                    if self.prompt_tokens_estimated else
+                    f"\n🧠 Conversa: {self.prompt_eval_tokens} de {self.prompt_tokens} tokens de prompt avaliados pelo modelo."
+                )
+                if self.prompt_tokens else ""
+            )
+        )
 
     async def run_fixed_script(
         self,
@@ -242,35 +804,45 @@ class AutomationService:
         """
         results = []
         try:
-            options = self._build_options(device_name, app_package)
-            self.driver = webdriver.Remote(command_executor=APPIUM_SERVER, options=options)
-            self.driver.implicitly_wait(5)
-            self.driver.activate_app(app_package)
-            time.sleep(3)
+            await self._open(device_name, app_package)
+            _, current_hash, _ = await self._settle(FIXED_LAUNCH_WAIT)
 
             for i, step in enumerate(steps):
                 results.append(f"\n--- PASSO {i+1} (FIXO) ---")
                 results.append(f"📜 Comando: {step}")
+                self._emit("step", step=i + 1)
                 
                 # Captura antes de cada passo fixo
                 try:
-                    self.driver.save_screenshot('app/static/screenshot.png')
-                except:
+                    await self._capture(i + 1)
+                except Exception:
                     pass
                 
-                if not await self._execute_step(step, results):
+                started = time.perf_counter()
+                ok = await self._execute_step(step, results)
+                self._record("act", time.perf_counter() - started, action=step, ok=ok)
+                self._emit("action", step=i + 1, action=step, ok=ok, elapsed_ms=round((time.perf_counter() - started) * 1000))
+                if not ok:
                     results.append(f"❌ Falha crítica no passo fixo: '{step}'. Interrompendo.")
+                    self._report_timing(i + 1, results, mode="fixed")
                     break
                 
-                time.sleep(2)
+                _, current_hash, _ = await self._settle(FIXED_STEP_WAIT, before=current_hash)
+                self._report_timing(i + 1, results, mode="fixed")
             else:
                 results.append("\n✅ Script fixo concluído com sucesso!")
+                self.succeeded = True
+
+            results.append(self._timing_report())
+            results.append(self._settle_report())
+            results.append(self._screenshot_report())
 
             return "\n".join(results)
         except Exception as e:
+            self.session_failed = True
             return f"Erro na execução fixa: {str(e)}"
         finally:
-            self._quit()
+            await self._finish("fixed")
 
     async def run_itau_login(self, device_name: str, agencia: str, conta: str, senha: str, llm_fn) -> str:
         """Cenário híbrido customizado (pode usar o loop reativo se quiser, mas mantemos o fluxo fixo inteligente)."""
@@ -280,4 +852,5 @@ class AutomationService:
 
 
 # Singleton removido para evitar colisões em execuções paralelas.
-# O AutomationService deve ser instanciado por requisição no routes.py.
+# O AutomationService deve ser instanciado por requisição no routes.py;
+# as sessões Appium em si vivem no session_pool e são reaproveitadas.
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import deque
+
+from app.services.automation_service import AutomationService
+
+
+async def run_scenario_on_device(device_name: str, scenario: dict, llm_fn, pool=None, default_mode: str = "dynamic") -> dict:
+    """Executa um cenário num dispositivo e devolve o resultado resumido (usado pelo BatchRunner)."""
+    service = AutomationService(pool=pool)
+    mode = scenario.get("mode", default_mode)
+    if mode == "fixed" and scenario.get("steps"):
+        log = await service.run_fixed_script(device_name, scenario["package"], scenario["steps"])
+    else:
+        log = await service.run_reactive_loop(device_name, scenario["package"], scenario["goal"], llm_fn)
+    return {
+        "passed": service.succeeded,
+        "llm_calls": service.llm_calls,
+        # Passos vindos do plano compilado também dispensaram a LLM
+        "cache_hits": service.cache_hits + service.plan_hits,
+        "log": log,
+    }
+
+
+class BatchRunner:
+    """
+    Distribui cenários entre dispositivos: um worker por device (concorrência 1),
+    filas locais com roubo de trabalho e novas tentativas para cenários que falharam.
+    """
+
+    def __init__(self, devices: list[str], run_fn, max_retries: int = 1, on_event=None):
+        if not devices:
+            raise ValueError("Informe ao menos um dispositivo.")
+        self.devices = list(dict.fromkeys(devices))
+        # run_fn(device, scenario) -> {"passed", "llm_calls", "cache_hits", "log"}
+        self.run_fn = run_fn
+        self.max_retries = max_retries
+        self.on_event = on_event
+        # Itens (cenário, tentativa, dispositivos onde já falhou)
+        self._queues: dict[str, deque] = {device: deque() for device in self.devices}
+        self._alive: set[str] = set()
+        self._busy: set[str] = set()
+        self._changed = None
+
+    def _emit(self, event_type: str, **data):
+        if self.on_event:
+            self.on_event(event_type, **data)
+
+    async def run(self, scenarios: list[dict]) -> dict:
+        # Distribuição inicial round-robin; o roubo de trabalho equilibra o resto
+        for i, scenario in enumerate(scenarios):
+            self._queues[self.devices[i % len(self.devices)]].append((scenario, 1, frozenset()))
+
+        results: list[dict] = []
+        self._alive, self._busy = set(self.devices), set()
+        self._changed = asyncio.Event()
+        started = time.perf_counter()
+        await asyncio.gather(*[self._worker(device, results) for device in self.devices])
+        return self._report(results, time.perf_counter() - started)
+
+    def _notify(self):
+        """Acorda os workers ociosos: entrou uma nova tentativa na fila ou um worker saiu."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _eligible(self, device: str, failed_on: frozenset) -> bool:
+        # Onde já falhou só roda de novo se nenhum outro worker vivo puder pegar
+        return device not in failed_on or self._alive <= failed_on
+
+    def _next(self, device: str):
+        queue = self._queues[device]
+        for i, item in enumerate(queue):
+            if self._eligible(device, item[2]):
+                del queue[i]
+                return item
+        # Fila local sem nada para este device: rouba do fim da fila mais longa que tenha
+        for victim in sorted(self._queues.values(), key=len, reverse=True):
+            for i in range(len(victim) - 1, -1, -1):
+                if self._eligible(device, victim[i][2]):
+                    item = victim[i]
+                    del victim[i]
+                    self._emit("steal", device=device)
+                    return item
+        return None
+
+    async def _worker(self, device: str, results: list[dict]):
+        try:
+            while True:
+                item = self._next(device)
+                if item is None:
+                    if not self._busy:
+                        return
+                    # Outro device ainda roda e pode devolver uma nova tentativa para este
+                    await self._changed.wait()
+                    continue
+                self._busy.add(device)
+                try:
+                    await self._run_item(device, item, results)
+                finally:
+                    self._busy.discard(device)
+                    self._notify()
+        finally:
+            self._alive.discard(device)
+            self._notify()
+
+    async def _run_item(self, device: str, item: tuple, results: list[dict]):
+        scenario, attempt, failed_on = item
+        name = scenario.get("name") or scenario.get("id") or scenario.get("goal")
+        self._emit("scenario_started", device=device, scenario=name, attempt=attempt)
+
+        started = time.perf_counter()
+        try:
+            outcome = await self.run_fn(device, scenario)
+        except Exception as e:
+            outcome = {"passed": False, "llm_calls": 0, "cache_hits": 0, "log": f"Erro: {str(e)}"}
+        duration = time.perf_counter() - started
+
+        if not outcome["passed"] and attempt <= self.max_retries:
+            # Nova tentativa em outro dispositivo (o atual pode estar com problema); os
+            # dispositivos onde falhou não a pegam enquanto houver outro worker vivo
+            failed_on = failed_on | {device}
+            target = min(
+                (d for d in self.devices if d not in failed_on and d in self._alive),
+                key=lambda d: len(self._queues[d]), default=device,
+            )
+            self._queues[target].append((scenario, attempt + 1, failed_on))
+            self._emit("scenario_retry", device=device, scenario=name, attempt=attempt, retry_on=target)
+            return
+
+        result = {
+            "id": scenario.get("id"),
+            "name": name,
+            "device": device,
+            "passed": outcome["passed"],
+            "attempts": attempt,
+            "duration_s": round(duration, 2),
+            "llm_calls": outcome["llm_calls"],
+            "cache_hits": outcome["cache_hits"],
+            "log": outcome["log"],
+        }
+        results.append(result)
+        self._emit(
+            "scenario_finished", device=device, scenario=name, passed=result["passed"],
+            duration_s=result["duration_s"], attempts=attempt,
+        )
+
+    def _report(self, results: list[dict], wall_time: float) -> dict:
+        passed = sum(1 for r in results if r["passed"])
+        llm_calls = sum(r["llm_calls"] for r in results)
+        cache_hits = sum(r["cache_hits"] for r in results)
+        per_device = {
+            device: sum(1 for r in results if r["device"] == device) for device in self.devices
+        }
+        return {
+            "total": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "wall_time_s": round(wall_time, 2),
+            "run_time_s": round(sum(r["duration_s"] for r in results), 2),
+            "llm_calls": llm_calls,
+            "cache_hits": cache_hits,
+            "cache_hit_rate": round(cache_hits / (cache_hits + llm_calls), 3) if cache_hits + llm_calls else 0.0,
+            "per_device": per_device,
+            "scenarios": results,
+        }
@@ -0,0 +1,130 @@
+import asyncio
+import time
+import uuid
+
+# Estados possíveis de um job
+QUEUED    = "queued"
+RUNNING   = "running"
+SUCCEEDED = "succeeded"
+FAILED    = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class Job:
+    """Execução em segundo plano com fila de eventos para acompanhamento em tempo real."""
+
+    def __init__(self, kind: str, device_name: str, params: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.device_name = device_name
+        self.params = params
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events: list[dict] = []
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def emit(self, event_type: str, **data):
+        """Registra um evento e acorda quem está acompanhando o job (SSE)."""
+        self.events.append({"seq": len(self.events), "type": event_type, "ts": round(time.time(), 3), **data})
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def stream(self, start: int = 0):
+        """Gera os eventos a partir de `start`, esperando pelos novos até o job terminar."""
+        index = start
+        while True:
+            waiter = self._wakeup
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                return
+            await waiter.wait()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "device": self.device_name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": len(self.events),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Executa jobs em segundo plano, um por vez em cada dispositivo (fila FIFO por device)."""
+
+    def __init__(self, max_finished_jobs: int = 200):
+        self.jobs: dict[str, Job] = {}
+        self.max_finished_jobs = max_finished_jobs
+        self._device_locks: dict[str, asyncio.Lock] = {}
+
+    def submit(self, kind: str, device_name: str, params: dict, runner) -> Job:
+        """
+        Enfileira `runner(job)` (corrotina que devolve o resultado final) e retorna o job
+        imediatamente; o resultado fica em `job.result` e os passos chegam por `job.emit`.
+        """
+        job = Job(kind, device_name, params)
+        self.jobs[job.id] = job
+        self._prune()
+        job._task = asyncio.create_task(self._run(job, runner))
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job._task.cancel()
+        return True
+
+    async def shutdown(self):
+        tasks = [job._task for job in self.jobs.values() if not job.done and job._task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job, runner):
+        lock = self._device_locks.setdefault(job.device_name, asyncio.Lock())
+        try:
+            job.emit("queued")
+            async with lock:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.emit("started")
+                job.result = await runner(job)
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.emit("finished", status=job.status, error=job.error)
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in sorted(finished, key=lambda j: j.finished_at)[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job.id]
+
+
+# Instância global
+job_manager = JobManager()
@@ -0,0 +1,257 @@
+import asyncio
+import random
+import time
+
+from app.core.metrics import LLM_ATTEMPTS, LLM_HEDGES, LLM_QUEUE_SECONDS, LLM_SECONDS
+from app.core.resilience import CircuitBreaker, LatencyWindow, TokenBucket
+
+
+# ── Erros ─────────────────────────────────────────────────────────────
+
+class LLMError(Exception):
+    """Falha ao obter resposta da LLM (no lugar das antigas respostas 'Erro: ...')."""
+
+    def __init__(self, message: str, provider: str | None = None, backend: str | None = None):
+        super().__init__(message)
+        self.provider = provider
+        self.backend = backend
+
+
+class LLMTimeoutError(LLMError):
+    """O backend não respondeu dentro do tempo limite."""
+
+
+class LLMRateLimitedError(LLMError):
+    """O limite de requisições do backend não liberou vaga a tempo."""
+
+
+class LLMUnavailableError(LLMError):
+    """Nenhum backend conseguiu responder (todos falharam ou estão com o disjuntor aberto)."""
+
+    def __init__(self, message: str, provider: str | None = None, errors: list[LLMError] | None = None):
+        super().__init__(message, provider)
+        self.errors = errors or []
+
+
+# ── Backends ──────────────────────────────────────────────────────────
+
+class LLMBackend:
+    """Um endpoint/modelo de LLM com seu próprio limite de concorrência, taxa e disjuntor."""
+
+    def __init__(
+        self,
+        name: str,
+        provider: str,
+        call,
+        chat=None,
+        weight: float = 1.0,
+        concurrency: int = 2,
+        rate: float = 0.0,
+        burst: float | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.name = name
+        self.provider = provider
+        # call(prompt, **opções) -> resposta; falhas levantam LLMError (ou qualquer exceção)
+        self.call = call
+        # chat(mensagens, **opções) -> resposta, mantendo o contexto do modelo entre as mensagens (opcional)
+        self.chat = chat
+        self.weight = weight
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+        self.inflight = 0
+
+    @property
+    def load(self) -> float:
+        """Peso efetivo: o configurado, dividido pelas requisições já em andamento."""
+        return self.weight / (1 + self.inflight)
+
+
+# ── Roteador ──────────────────────────────────────────────────────────
+
+class LLMRouter:
+    """
+    Distribui as chamadas entre os backends do provedor pedido: sorteio ponderado
+    pela carga, disjuntor por backend, limite de taxa e, se a resposta passar do
+    p95 do backend, uma cópia da requisição (hedge) em outro backend. Com
+    `fallback`, quando os backends do provedor se esgotam, cai para os demais.
+    """
+
+    def __init__(
+        self,
+        backends: list[LLMBackend],
+        timeout: float = 60.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min: float = 0.25,
+        hedge_after: float | None = None,
+        fallback: bool = True,
+        rng: random.Random | None = None,
+    ):
+        self.backends = backends
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        # Nunca duplica antes de `hedge_min`; sem histórico suficiente usa `hedge_after` (None = não duplica)
+        self.hedge_min = hedge_min
+        self.hedge_after = hedge_after
+        self.fallback = fallback
+        self._rng = rng or random.Random()
+
+    def backend(self, name: str) -> LLMBackend | None:
+        return next((b for b in self.backends if b.name == name), None)
+
+    async def complete(self, prompt: str, provider: str = "ollama", **options) -> str:
+        """Resposta do primeiro backend que conseguir; `options` vão para o `call` do backend."""
+        reply, _ = await self.route(prompt, provider, **options)
+        return reply
+
+    async def route(
+        self, prompt, provider: str = "ollama", prefer: str | None = None, method: str = "call", **options
+    ) -> tuple[str, LLMBackend]:
+        """
+        Como `complete`, mas devolve também o backend que respondeu. `prefer` fixa a
+        primeira tentativa num backend (onde o contexto da conversa já está carregado)
+        e `method` escolhe o ponto de entrada do backend (`call` ou `chat`).
+        """
+        tried: list[LLMBackend] = []
+        errors: list[LLMError] = []
+        running: dict[asyncio.Task, LLMBackend] = {}
+        hedged = False
+        try:
+            while True:
+                if not running:
+                    backend = self._pick(provider, tried, method, prefer)
+                    if backend is None:
+                        raise self._exhausted(provider, errors)
+                    self._start(backend, prompt, method, options, tried, running)
+
+                delay = None
+                if not hedged and len(running) == 1:
+                    delay = self._hedge_delay(next(iter(running.values())))
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Passou do p95: dispara uma cópia em outro backend (no máximo uma por chamada)
+                    hedged = True
+                    backend = self._pick(provider, tried, method)
+                    if backend is not None:
+                        LLM_HEDGES.inc(provider=provider)
+                        self._start(backend, prompt, method, options, tried, running)
+                    continue
+
+                for task in done:
+                    backend = running.pop(task)
+                    if task.exception() is None:
+                        return task.result(), backend
+                    errors.append(task.exception())
+        finally:
+            # Quem perdeu a corrida (ou a chamada foi cancelada) não segura vaga no backend
+            for task in running:
+                task.cancel()
+
+    def _start(self, backend: LLMBackend, prompt, method: str, options: dict, tried: list, running: dict):
+        LLM_ATTEMPTS.inc(backend=backend.name, kind="hedge" if running else "retry" if tried else "first")
+        tried.append(backend)
+        running[asyncio.create_task(self._attempt(backend, prompt, options, method))] = backend
+
+    def _pick(
+        self, provider: str, tried: list[LLMBackend], method: str = "call", prefer: str | None = None
+    ) -> LLMBackend | None:
+        """Sorteio ponderado entre os backends disponíveis, primeiro os do provedor pedido."""
+        own = [b for b in self.backends if b.provider == provider]
+        groups = [own]
+        if self.fallback or not own:
+            groups.append([b for b in self.backends if b.provider != provider])
+        if prefer and not tried:
+            # Backend da conversa: vale se estiver livre; senão o sorteio segue normal
+            backend = self.backend(prefer)
+            if (
+                backend is not None and any(backend in group for group in groups) and getattr(backend, method)
+                and backend.breaker.allow() and backend.bucket.wait_time() == 0
+            ):
+                return backend
+        for group in groups:
+            ready = [b for b in group if b not in tried and getattr(b, method) and b.breaker.allow()]
+            if not ready:
+                continue
+            free = [b for b in ready if b.bucket.wait_time() == 0]
+            if not free:
+                # Todos no limite de taxa: fica com o que libera primeiro
+                return min(ready, key=lambda b: b.bucket.wait_time())
+            return self._rng.choices(free, weights=[b.load for b in free])[0]
+        return None
+
+    def _hedge_delay(self, backend: LLMBackend) -> float | None:
+        if not self.hedge or len(self.backends) < 2:
+            return None
+        threshold = backend.latency.percentile(self.hedge_quantile)
+        if threshold is None:
+            threshold = self.hedge_after
+        return None if threshold is None else max(self.hedge_min, threshold)
+
+    async def _attempt(self, backend: LLMBackend, prompt, options: dict, method: str = "call") -> str:
+        started = time.perf_counter()
+        status = "cancelled"
+        backend.inflight += 1
+        backend.breaker.begin()
+        try:
+            if not await backend.bucket.acquire(self.timeout):
+                status = "rate_limited"
+                backend.breaker.release()
+                raise LLMRateLimitedError("Limite de requisições atingido", backend.provider, backend.name)
+            async with backend.semaphore:
+                LLM_QUEUE_SECONDS.observe(time.perf_counter() - started, provider=backend.provider)
+                call_started = time.perf_counter()
+                call = getattr(backend, method)
+                reply = await asyncio.wait_for(call(prompt, **options), timeout=self.timeout)
+            backend.latency.add(time.perf_counter() - call_started)
+            backend.breaker.success()
+            status = "ok"
+            return reply
+        except LLMRateLimitedError:
+            raise
+        except asyncio.CancelledError:
+            backend.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            status = "timeout"
+            backend.breaker.failure()
+            raise LLMTimeoutError(
+                f"Tempo limite de {self.timeout:g}s esgotado", backend.provider, backend.name
+            ) from None
+        except LLMError as e:
+            status = "timeout" if isinstance(e, LLMTimeoutError) else "error"
+            backend.breaker.failure()
+            e.backend = e.backend or backend.name
+            raise
+        except Exception as e:
+            status = "error"
+            backend.breaker.failure()
+            raise LLMError(str(e) or type(e).__name__, backend.provider, backend.name) from e
+        finally:
+            backend.inflight -= 1
+            LLM_SECONDS.observe(
+                time.perf_counter() - started, provider=backend.provider, backend=backend.name, status=status
+            )
+
+    def _exhausted(self, provider: str, errors: list[LLMError]) -> LLMUnavailableError:
+        if not errors:
+            return LLMUnavailableError(f"Nenhum backend disponível para '{provider}' (disjuntores abertos)", provider)
+        details = "; ".join(f"{e.backend}: {e}" for e in errors)
+        return LLMUnavailableError(f"Todos os backends falharam ({details})", provider, errors)
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": b.name,
+                "provider": b.provider,
+                "weight": b.weight,
+                "inflight": b.inflight,
+                "breaker": b.breaker.state,
+                "p95_s": b.latency.percentile(self.hedge_quantile),
+            }
+            for b in self.backends
+        ]
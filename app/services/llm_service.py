@@ -1,12 +1,27 @@
+import asyncio
+import functools
+import importlib.util
 import httpx
 import json
 import os
 from dotenv import load_dotenv
-from google import genai
+
+from app.core.actions import first_action
+from app.core.compactor import estimate_tokens
+from app.core.metrics import LLM_EARLY_STOPS, LLM_TOKENS, LLM_TOKENS_TOTAL, metrics
+from app.core.registry import registry
+from app.core.resilience import CircuitBreaker
+from app.services.llm_router import LLMBackend, LLMError, LLMRouter, LLMTimeoutError
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
+SYSTEM_PROMPT = (
+    "Você é um especialista em automação mobile com Appium. "
+    "Ajude o usuário a planejar, analisar e executar testes de automação. "
+    "Responda sempre em português brasileiro de forma clara e objetiva."
+)
+
 class LLMService:
     """Serviço de comunicação com múltiplos provedores de LLM (Ollama e Google Gemini)."""
 
@@ -14,61 +29,438 @@ class LLMService:
         self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434/v1/chat/completions")
         self.ollama_model = os.getenv("OLLAMA_MODEL", "qwen2:7b")
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        # Inicializa o cliente oficial do Google Gemini
-        self.gemini_client = genai.Client(api_key=self.gemini_api_key)
+        # O SDK do Gemini só é importado (e o cliente criado) na primeira chamada ao Google
+        registry.register("gemini", self._create_gemini_client)
         self.gemini_model = "gemini-3-flash-preview"
 
-    async def get_completion(self, prompt: str, provider: str = "ollama") -> str:
-        if provider.lower() == "google":
-            return await self._get_gemini_completion(prompt)
-        return await self._get_ollama_completion(prompt)
+        # Pool de conexões HTTP: um cliente de vida longa por provedor
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "10")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "5")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30")),
+        )
+        # HTTP/2 só é negociado quando o pacote 'h2' está instalado
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+        # Limita requisições simultâneas por backend (execuções paralelas não derrubam o Ollama)
+        self.concurrency = {
+            "ollama": int(os.getenv("OLLAMA_CONCURRENCY", "2")),
+            "google": int(os.getenv("GEMINI_CONCURRENCY", "8")),
+        }
+        # Decisões do modo reativo em streaming, cortadas na primeira linha de ação
+        self.stream_decisions = os.getenv("LLM_STREAM", "1") == "1"
+        self.decision_max_tokens = int(os.getenv("LLM_DECISION_MAX_TOKENS", "160"))
+        # A explicação que o modelo às vezes escreve depois da ação vem após uma linha em branco:
+        # o backend para ali mesmo sem streaming (LLM_STREAM=0)
+        self.decision_stop = ["\n\n"]
+        # Modo conversa: uma conversa por execução, só com as mudanças da tela a cada passo
+        self.conversation_mode = os.getenv("LLM_CONVERSATION", "0") == "1"
+        self.conversation_turns = int(os.getenv("LLM_CONVERSATION_TURNS", "12"))
+        # Quanto tempo o Ollama mantém o modelo (e o contexto avaliado) na memória entre os passos
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+        hedge_after = os.getenv("LLM_HEDGE_AFTER")
+        self.router = LLMRouter(
+            [self._build_backend(spec) for spec in self._backend_specs()],
+            timeout=self.timeout,
+            hedge=os.getenv("LLM_HEDGE", "1") == "1",
+            hedge_after=float(hedge_after) if hedge_after else None,
+            # Cair do Ollama para o Gemini manda a tela para fora da máquina: só se pedido
+            fallback=os.getenv("LLM_FALLBACK", "0") == "1",
+        )
+
+    def _backend_specs(self) -> list[dict]:
+        """Backends de `LLM_BACKENDS` (lista JSON) ou, na falta dela, um Ollama e o Gemini."""
+        raw = os.getenv("LLM_BACKENDS")
+        if raw:
+            return json.loads(raw)
+        return [
+            {"name": "ollama", "provider": "ollama", "url": self.ollama_url, "model": self.ollama_model},
+            {"name": "google", "provider": "google", "model": self.gemini_model},
+        ]
+
+    def _build_backend(self, spec: dict) -> LLMBackend:
+        provider = "google" if spec.get("provider") == "google" else "ollama"
+        if provider == "google":
+            model = spec.get("model", self.gemini_model)
+            call = functools.partial(self._get_gemini_completion, model=model)
+            chat = functools.partial(self._chat_gemini, model=model)
+        else:
+            model = spec.get("model", self.ollama_model)
+            url = spec.get("url", self.ollama_url)
+            call = functools.partial(self._get_ollama_completion, url=url, model=model)
+            chat = functools.partial(self._chat_ollama, url=url, model=model)
+        return LLMBackend(
+            name=spec.get("name") or f"{provider}:{model}",
+            provider=provider,
+            call=call,
+            chat=chat,
+            weight=float(spec.get("weight", 1.0)),
+            concurrency=int(spec.get("concurrency", self.concurrency[provider])),
+            rate=float(spec.get("rate", 0.0)),
+            burst=spec.get("burst"),
+            breaker=CircuitBreaker(
+                threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "3")),
+                cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+            ),
+        )
+
+    def _create_gemini_client(self):
+        from google import genai
+
+        return genai.Client(api_key=self.gemini_api_key)
+
+    @property
+    def gemini_client(self):
+        """Cliente do Gemini, criado no primeiro uso; sem SDK ou sem chave, falha como erro do backend."""
+        try:
+            return registry.get("gemini")
+        except Exception as e:
+            raise LLMError(f"Google Gemini indisponível: {e}", "google") from e
+
+    @gemini_client.setter
+    def gemini_client(self, client):
+        registry.set("gemini", client)
+
+    # ── Ciclo de Vida ──────────────────────────────────────────────────
+
+    async def startup(self):
+        """Cria os clientes HTTP compartilhados (chamado no lifespan da aplicação)."""
+        self._get_client("ollama")
 
-    async def _get_ollama_completion(self, prompt: str) -> str:
+    async def shutdown(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def _get_client(self, provider: str) -> httpx.AsyncClient:
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+            self._clients[provider] = client
+        return client
+
+    async def get_completion(
+        self, prompt: str, provider: str = "ollama", until=None, max_tokens: int | None = None, stop=None
+    ) -> str:
+        """
+        Resposta da LLM escolhida pelo roteador; falhas levantam LLMError. Com `until`,
+        a resposta vem em streaming e a geração é cortada assim que `until(texto)`
+        devolver algo (esse valor passa a ser a resposta).
+        """
+        provider = "google" if provider.lower() == "google" else "ollama"
+        options = {"until": until, "max_tokens": max_tokens, "stop": stop}
+        return await self.router.complete(prompt, provider, **{k: v for k, v in options.items() if v is not None})
+
+    async def get_decision(self, prompt: str, provider: str = "ollama") -> str:
+        """Decisão do modo reativo: a geração para na primeira linha de ação reconhecida."""
+        if not self.stream_decisions:
+            return await self.get_completion(prompt, provider, stop=self.decision_stop)
+        return await self.get_completion(
+            prompt, provider, until=first_action, max_tokens=self.decision_max_tokens, stop=self.decision_stop
+        )
+
+    def decider(self, provider: str = "ollama") -> "LLMDecider":
+        """`llm_fn` do modo reativo para o provedor (decisões avulsas e, se ligado, conversas)."""
+        return LLMDecider(self, "google" if provider.lower() == "google" else "ollama")
+
+    def conversation(self, system: str, provider: str = "ollama") -> "LLMConversation":
+        return LLMConversation(self, system, provider, max_turns=self.conversation_turns)
+
+    def _record_usage(
+        self, provider: str, prompt: str, reply: str, usage: tuple = (None, None), prompt_eval: int | None = None
+    ):
+        """
+        Tokens de prompt e resposta informados pelo provedor (ou estimados, se ele não
+        informar) e, quando se sabe, quantos tokens do prompt não vieram do cache do modelo.
+        """
+        for kind, count, text in (("prompt", usage[0], prompt), ("completion", usage[1], reply)):
+            if count is None:
+                count = estimate_tokens(text)
+            LLM_TOKENS.observe(count, provider=provider, kind=kind)
+            LLM_TOKENS_TOTAL.inc(count, provider=provider, kind=kind)
+        if prompt_eval is not None:
+            LLM_TOKENS.observe(prompt_eval, provider=provider, kind="prompt_eval")
+            LLM_TOKENS_TOTAL.inc(prompt_eval, provider=provider, kind="prompt_eval")
+
+    async def _read_until(self, provider: str, prompt: str, chunks, until) -> str:
+        """Consome o streaming até `until` reconhecer a resposta; o resto da geração é descartado."""
+        text = ""
+        try:
+            async for chunk in chunks:
+                text += chunk
+                answer = until(text)
+                if answer is not None:
+                    LLM_EARLY_STOPS.inc(provider=provider)
+                    self._record_usage(provider, prompt, text)
+                    return answer
+        finally:
+            # Fecha a conexão: o servidor para de gerar tokens que ninguém vai ler
+            await chunks.aclose()
+        self._record_usage(provider, prompt, text)
+        answer = until(text, final=True)
+        return text if answer is None else answer
+
+    # ── Ollama ─────────────────────────────────────────────────────────
+
+    def _ollama_payload(self, prompt: str, model: str, stream: bool, max_tokens: int | None, stop) -> dict:
         payload = {
-            "model": self.ollama_model,
+            "model": model,
             "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "Você é um especialista em automação mobile com Appium. "
-                        "Ajude o usuário a planejar, analisar e executar testes de automação. "
-                        "Responda sempre em português brasileiro de forma clara e objetiva."
-                    ),
-                },
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
-            "stream": False,
+            "stream": stream,
         }
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    async def _get_ollama_completion(
+        self, prompt: str, url: str, model: str, until=None, max_tokens: int | None = None, stop=None
+    ) -> str:
+        if until is not None:
+            return await self._read_until(
+                "ollama", prompt, self._stream_ollama(prompt, url, model, max_tokens, stop), until
+            )
+
+        client = self._get_client("ollama")
+        try:
+            response = await client.post(url, json=self._ollama_payload(prompt, model, False, max_tokens, stop))
+            response.raise_for_status()
+            data = response.json()
+            reply = data["choices"][0]["message"]["content"]
+        except httpx.TimeoutException:
+            raise LLMTimeoutError("Tempo limite de conexão com o Ollama esgotado", "ollama") from None
+        except Exception as e:
+            raise LLMError(f"Erro ao conectar com o Ollama: {str(e)}", "ollama") from e
+        usage = data.get("usage") or {}
+        self._record_usage("ollama", prompt, reply, (usage.get("prompt_tokens"), usage.get("completion_tokens")))
+        return reply
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                response = await client.post(self.ollama_url, json=payload)
+    async def _stream_ollama(self, prompt: str, url: str, model: str, max_tokens: int | None = None, stop=None):
+        """Streaming SSE do endpoint compatível com OpenAI: um pedaço de texto por evento."""
+        client = self._get_client("ollama")
+        payload = self._ollama_payload(prompt, model, True, max_tokens, stop)
+        try:
+            async with client.stream("POST", url, json=payload) as response:
                 response.raise_for_status()
-                return response.json()["choices"][0]["message"]["content"]
-            except httpx.TimeoutException:
-                return "Erro: Tempo limite de conexão com o Ollama esgotado."
-            except Exception as e:
-                return f"Erro ao conectar com o Ollama: {str(e)}"
-
-    async def _get_gemini_completion(self, prompt: str) -> str:
-        """Usa o SDK oficial google-genai para obter a resposta do Gemini."""
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+        except httpx.TimeoutException:
+            raise LLMTimeoutError("Tempo limite de conexão com o Ollama esgotado", "ollama") from None
+        except Exception as e:
+            raise LLMError(f"Erro ao conectar com o Ollama: {str(e)}", "ollama") from e
+
+    async def _chat_ollama(
+        self, messages: list[dict], url: str, model: str, max_tokens: int | None = None, usage: dict | None = None
+    ) -> str:
+        """
+        Conversa pela API nativa (/api/chat): aceita `keep_alive` e informa em
+        `prompt_eval_count` quantos tokens do prompt foram de fato avaliados (o
+        restante veio do contexto que o Ollama já tinha). `format: json` encerra a
+        geração junto com o objeto de ações, então não é preciso streaming para cortar.
+        """
+        payload = {"model": model, "messages": messages, "stream": False, "format": "json", "keep_alive": self.keep_alive}
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+        client = self._get_client("ollama")
         try:
-            # O processamento é delegado ao SDK oficial.
-            # Nota: O SDK 'google-genai' versão 1.x pode ter chamadas síncronas ou assíncronas.
-            # Usaremos a forma sugerida pelo usuário para consistência.
-            response = self.gemini_client.models.generate_content(
-                model=self.gemini_model,
-                contents=(
-                    "Você é um especialista em automação mobile com Appium. "
-                    "Ajude o usuário a planejar, analisar e executar testes de automação. "
-                    "Responda sempre em português brasileiro de forma clara e objetiva.\n\n"
-                    f"Solicitação: {prompt}"
-                )
+            response = await client.post(_native_chat_url(url), json=payload)
+            response.raise_for_status()
+            data = response.json()
+            reply = data["message"]["content"]
+        except httpx.TimeoutException:
+            raise LLMTimeoutError("Tempo limite de conexão com o Ollama esgotado", "ollama") from None
+        except Exception as e:
+            raise LLMError(f"Erro ao conectar com o Ollama: {str(e)}", "ollama") from e
+        prompt = "\n".join(m["content"] for m in messages)
+        # O Ollama não informa o tamanho do prompt inteiro quando parte veio do contexto: estimativa
+        prompt_tokens = estimate_tokens(prompt)
+        # Sem o campo, o prompt inteiro estava no cache
+        prompt_eval = data.get("prompt_eval_count", 0)
+        self._record_usage("ollama", prompt, reply, (prompt_tokens, data.get("eval_count")), prompt_eval)
+        if usage is not None:
+            usage.update(prompt=prompt_tokens, prompt_eval=prompt_eval, prompt_estimated=True)
+        return reply
+
+    # ── Google Gemini ──────────────────────────────────────────────────
+
+    def _gemini_request(self, prompt: str, model: str, max_tokens: int | None, stop) -> dict:
+        request = {"model": model, "contents": f"{SYSTEM_PROMPT}\n\nSolicitação: {prompt}"}
+        config = {}
+        if max_tokens:
+            config["max_output_tokens"] = max_tokens
+        if stop:
+            config["stop_sequences"] = stop
+        if config:
+            request["config"] = config
+        return request
+
+    async def _get_gemini_completion(
+        self, prompt: str, model: str, until=None, max_tokens: int | None = None, stop=None
+    ) -> str:
+        """Usa o SDK oficial google-genai (superfície assíncrona) para obter a resposta do Gemini."""
+        request = self._gemini_request(prompt, model, max_tokens, stop)
+        aio = getattr(self.gemini_client, "aio", None)
+        if until is not None and aio is not None and hasattr(aio.models, "generate_content_stream"):
+            return await self._read_until(
+                "google", request["contents"], self._stream_gemini(prompt, model, max_tokens, stop), until
             )
-            return response.text
+        if aio is not None:
+            # Cancelar esta corrotina cancela também a requisição HTTP em andamento
+            call = aio.models.generate_content(**request)
+        else:
+            # SDKs sem 'aio': a chamada síncrona vai para uma thread e não trava o event loop
+            call = asyncio.to_thread(self.gemini_client.models.generate_content, **request)
+        # O tempo limite fica com o roteador, que cancela esta corrotina
+        try:
+            response = await call
         except Exception as e:
-            return f"Erro ao conectar com o Google Gemini (SDK): {str(e)}"
+            raise LLMError(f"Erro ao conectar com o Google Gemini (SDK): {str(e)}", "google") from e
+        usage = getattr(response, "usage_metadata", None)
+        reply = response.text or ""
+        self._record_usage("google", request["contents"], reply, (
+            getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+        ))
+        if until is not None:
+            # SDK sem streaming: a resposta chega inteira, mas o corte é o mesmo
+            answer = until(reply, final=True)
+            return reply if answer is None else answer
+        return reply
+
+    async def _chat_gemini(
+        self, messages: list[dict], model: str, max_tokens: int | None = None, usage: dict | None = None
+    ) -> str:
+        """Conversa no Gemini: o prefixo repetido entra no cache implícito (`cached_content_token_count`)."""
+        config = {"response_mime_type": "application/json"}
+        contents = []
+        for m in messages:
+            if m["role"] == "system":
+                config["system_instruction"] = m["content"]
+            else:
+                role = "model" if m["role"] == "assistant" else "user"
+                contents.append({"role": role, "parts": [{"text": m["content"]}]})
+        if max_tokens:
+            config["max_output_tokens"] = max_tokens
+        request = {"model": model, "contents": contents, "config": config}
+        aio = getattr(self.gemini_client, "aio", None)
+        try:
+            if aio is not None:
+                response = await aio.models.generate_content(**request)
+            else:
+                response = await asyncio.to_thread(self.gemini_client.models.generate_content, **request)
+        except Exception as e:
+            raise LLMError(f"Erro ao conectar com o Google Gemini (SDK): {str(e)}", "google") from e
+        reply = response.text or ""
+        metadata = getattr(response, "usage_metadata", None)
+        prompt = "\n".join(m["content"] for m in messages)
+        counted = getattr(metadata, "prompt_token_count", None)
+        prompt_tokens = counted or estimate_tokens(prompt)
+        prompt_eval = prompt_tokens - (getattr(metadata, "cached_content_token_count", None) or 0)
+        self._record_usage(
+            "google", prompt, reply, (prompt_tokens, getattr(metadata, "candidates_token_count", None)), prompt_eval
+        )
+        if usage is not None:
+            usage.update(prompt=prompt_tokens, prompt_eval=prompt_eval, prompt_estimated=not counted)
+        return reply
+
+    async def _stream_gemini(self, prompt: str, model: str, max_tokens: int | None = None, stop=None):
+        request = self._gemini_request(prompt, model, max_tokens, stop)
+        stream = None
+        try:
+            stream = await self.gemini_client.aio.models.generate_content_stream(**request)
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            raise LLMError(f"Erro ao conectar com o Google Gemini (SDK): {str(e)}", "google") from e
+        finally:
+            if stream is not None and hasattr(stream, "aclose"):
+                await stream.aclose()
+
+
+def _native_chat_url(url: str) -> str:
+    """Endpoint nativo de conversa a partir da URL compatível com OpenAI (.../v1/chat/completions)."""
+    base = url.split("/v1/", 1)[0] if "/v1/" in url else url.split("/api/", 1)[0]
+    return base.rstrip("/") + "/api/chat"
+
+
+# ── Conversas ─────────────────────────────────────────────────────────
+
+class LLMConversation:
+    """
+    Conversa de decisões de uma execução. O prefixo (instruções + objetivo) nunca
+    muda e cada passo só acrescenta mensagens, então o modelo reaproveita o
+    contexto já avaliado em vez de reprocessar o prompt inteiro. A conversa fica
+    presa ao backend que respondeu a primeira mensagem (é lá que o contexto está).
+    """
+
+    def __init__(self, service: LLMService, system: str, provider: str = "ollama", max_turns: int = 12):
+        self.service = service
+        self.system = system
+        self.provider = provider
+        self.max_turns = max_turns
+        self.messages: list[dict] = []  # pares user/assistant depois das instruções
+        self.backend = None
+        self.usage: dict = {}  # {"prompt", "prompt_eval", "prompt_estimated"} da última resposta
+
+    @property
+    def expired(self) -> bool:
+        """Conversa longa demais: recomeçar (com a tela inteira) custa menos que carregar o histórico."""
+        return len(self.messages) >= 2 * self.max_turns
+
+    def reset(self):
+        self.messages = []
+
+    async def send(self, content: str) -> str:
+        messages = [{"role": "system", "content": self.system}, *self.messages, {"role": "user", "content": content}]
+        usage = {}
+        reply, backend = await self.service.router.route(
+            messages, self.provider, prefer=self.backend, method="chat",
+            usage=usage, max_tokens=self.service.decision_max_tokens,
+        )
+        self.backend = backend.name
+        # A resposta vai para o histórico exatamente como foi gerada: é ela que está no contexto do modelo
+        self.messages += [{"role": "user", "content": content}, {"role": "assistant", "content": reply}]
+        self.usage = usage
+        return reply
+
+
+class LLMDecider:
+    """`llm_fn` do modo reativo: decisão avulsa por prompt e, com LLM_CONVERSATION=1, uma conversa por execução."""
+
+    def __init__(self, service: LLMService, provider: str = "ollama"):
+        self.service = service
+        self.provider = provider
+
+    async def __call__(self, prompt: str) -> str:
+        return await self.service.get_decision(prompt, self.provider)
+
+    def conversation(self, system: str) -> LLMConversation | None:
+        if not self.service.conversation_mode:
+            return None
+        return self.service.conversation(system, self.provider)
 
 
 # Instância singleton
 llm_service = LLMService()
+
+# Estado do disjuntor de cada backend, lido no momento da coleta
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+metrics.gauge(
+    "llm_breaker_state", "Disjuntor por backend (0 fechado, 1 meio-aberto, 2 aberto)", ("backend",),
+    collect=lambda: {(b.name,): BREAKER_STATES[b.breaker.state] for b in llm_service.router.backends},
+)
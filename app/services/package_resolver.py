@@ -0,0 +1,275 @@
+import asyncio
+import os
+import re
+import shlex
+import time
+
+from app.core.locator import clean_label, match_score
+from app.core.metrics import PACKAGE_RESOLUTIONS
+from app.core.package_index import package_index as shared_package_index
+
+# Segmentos de package name que não identificam o app (ficam fora do rótulo derivado)
+GENERIC_SEGMENTS = {"com", "br", "org", "net", "io", "app", "apps", "android", "google", "mobile", "client"}
+# Nomes comuns de apps de sistema em português → pacotes possíveis (vale o que estiver instalado)
+SYSTEM_ALIASES = {
+    "configuracoes": ("com.android.settings",),
+    "ajustes": ("com.android.settings",),
+    "contatos": ("com.google.android.contacts", "com.android.contacts"),
+    "telefone": ("com.google.android.dialer", "com.android.dialer"),
+    "mensagens": ("com.google.android.apps.messaging", "com.android.mms"),
+    "camera": ("com.android.camera2", "com.google.android.GoogleCamera"),
+    "fotos": ("com.google.android.apps.photos",),
+    "galeria": ("com.google.android.apps.photos", "com.android.gallery3d"),
+    "play store": ("com.android.vending",),
+    "agenda": ("com.google.android.calendar", "com.android.calendar"),
+    "relogio": ("com.google.android.deskclock", "com.android.deskclock"),
+    "calculadora": ("com.google.android.calculator", "com.android.calculator2"),
+    "arquivos": ("com.google.android.documentsui", "com.android.documentsui"),
+}
+PACKAGE_PATTERN = re.compile(r"[A-Za-z][\w]*(?:\.[\w]+)+")
+# Pacotes por chamada ao dumpsys (uma ida ao adb para o lote inteiro)
+LABEL_BATCH = 40
+
+
+class AdbError(Exception):
+    """Falha ao falar com o dispositivo pelo adb (sem adb no host, dispositivo offline...)."""
+
+
+# ── Acesso ao dispositivo ─────────────────────────────────────────────
+
+class AdbShell:
+    """
+    Consultas ao dispositivo por `adb -s <device> shell`. O resolvedor só usa
+    `list_packages`, `launchable` e `labels`: qualquer objeto com esses métodos
+    (como o adb falso dos benchmarks) serve no lugar.
+    """
+
+    def __init__(self, adb_path: str = "adb", timeout: float = 20.0):
+        self.adb_path = adb_path
+        self.timeout = timeout
+
+    async def shell(self, device: str, command: str) -> str:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                self.adb_path, "-s", device, "shell", command,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            raise AdbError(f"adb indisponível: {e}") from e
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            raise AdbError(f"adb sem resposta em {self.timeout:g}s") from None
+        if proc.returncode != 0:
+            raise AdbError(err.decode(errors="replace").strip() or f"adb saiu com código {proc.returncode}")
+        return out.decode(errors="replace")
+
+    async def list_packages(self, device: str) -> dict[str, str]:
+        """{pacote: versionCode} de todos os pacotes instalados."""
+        output = await self.shell(device, "pm list packages --show-versioncode")
+        packages = {}
+        for line in output.splitlines():
+            match = re.match(r"package:(\S+)(?:\s+versionCode:(\d+))?", line.strip())
+            if match:
+                packages[match.group(1)] = match.group(2) or ""
+        return packages
+
+    async def launchable(self, device: str) -> set[str]:
+        """Pacotes com atividade de launcher (os que o usuário chama pelo nome)."""
+        output = await self.shell(
+            device,
+            "cmd package query-activities --brief -a android.intent.action.MAIN -c android.intent.category.LAUNCHER",
+        )
+        return {line.strip().split("/", 1)[0] for line in output.splitlines() if "/" in line}
+
+    async def labels(self, device: str, packages: list[str]) -> dict[str, str]:
+        """Rótulo de cada pacote quando o `dumpsys package` do build expõe um (senão fica de fora)."""
+        labels = {}
+        for start in range(0, len(packages), LABEL_BATCH):
+            batch = " ".join(shlex.quote(p) for p in packages[start:start + LABEL_BATCH])
+            output = await self.shell(
+                device,
+                f"for p in {batch}; do echo \"@@ $p\"; "
+                "dumpsys package \"$p\" | grep -E 'nonLocalizedLabel=|^ *label='; done",
+            )
+            current = None
+            for line in output.splitlines():
+                line = line.strip()
+                if line.startswith("@@ "):
+                    current = line[3:]
+                    continue
+                match = re.search(r"(?:nonLocalizedLabel|label)=(.+)", line)
+                if current and match and current not in labels:
+                    label = match.group(1).split(" labelRes=")[0].strip()
+                    if label and label != "null":
+                        labels[current] = label
+        return labels
+
+
+# ── Resolvedor ────────────────────────────────────────────────────────
+
+class PackageMatch:
+    """Pacote escolhido para o nome pedido e de onde veio (index, alias, llm ou input)."""
+
+    __slots__ = ("package", "label", "score", "source")
+
+    def __init__(self, package: str, label: str | None, score: float, source: str):
+        self.package = package
+        self.label = label
+        self.score = score
+        self.source = source
+
+    def as_dict(self) -> dict:
+        return {"package": self.package, "label": self.label, "score": round(self.score, 2), "source": self.source}
+
+
+class PackageResolver:
+    """
+    Resolve o nome de um app ("YouTube", "Itaú") para o package name sem chamar a
+    LLM: índice local dos pacotes instalados no dispositivo (atualizado de forma
+    incremental) e casamento aproximado com rótulo, nome derivado do pacote e
+    apelidos. A LLM só entra quando nenhum candidato é confiável, e o que ela
+    responder (se estiver instalado) vira apelido para as próximas vezes.
+    """
+
+    def __init__(self, index=None, adb=None, ttl: float = 600.0, min_score: float = 0.85, margin: float = 0.05):
+        self.index = index or shared_package_index
+        self.adb = adb or AdbShell()
+        # Índice mais novo que `ttl` segundos não é relido do dispositivo
+        self.ttl = ttl
+        self.min_score = min_score
+        # Distância mínima para o segundo colocado (de outro pacote)
+        self.margin = margin
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def refresh(self, device: str, force: bool = False) -> dict | None:
+        """
+        Relê a lista de pacotes: só os novos ou atualizados (versionCode) têm o
+        rótulo buscado de novo, e os desinstalados saem. None se o índice ainda
+        estava válido ou o adb falhou (fica o que já havia).
+        """
+        lock = self._locks.setdefault(device, asyncio.Lock())
+        async with lock:
+            refreshed_at = self.index.refreshed_at(device)
+            if not force and refreshed_at is not None and time.time() - refreshed_at < self.ttl:
+                return None
+            try:
+                versions = await self.adb.list_packages(device)
+                launchable = await self.adb.launchable(device)
+            except AdbError:
+                return None
+            known = self.index.packages(device)
+            changed = [
+                p for p, version in versions.items()
+                if p not in known or known[p]["version"] != version or known[p]["launchable"] != (p in launchable)
+            ]
+            removed = [p for p in known if p not in versions]
+            # Só apps de launcher são chamados pelo nome: os demais ficam com o nome derivado
+            to_label = [p for p in changed if p in launchable]
+            try:
+                labels = await self.adb.labels(device, to_label) if to_label else {}
+            except AdbError:
+                labels = {}
+            upserts = [
+                (p, versions[p], labels.get(p) or (known.get(p) or {}).get("label"), p in launchable)
+                for p in changed
+            ]
+            self.index.apply(device, upserts, removed)
+            return {
+                "total": len(versions),
+                "added": sum(1 for p in changed if p not in known),
+                "updated": sum(1 for p in changed if p in known),
+                "removed": len(removed),
+                "labels_fetched": len(labels),
+            }
+
+    def candidates(self, device: str, name: str, limit: int = 10) -> list[PackageMatch]:
+        """Pacotes instalados mais parecidos com o nome, do melhor para o pior."""
+        wanted = clean_label(name)
+        if not wanted:
+            return []
+        ranked = []
+        for package, info in self.index.packages(device).items():
+            best, best_label = 0.0, None
+            for label, weight in self._labels(package, info):
+                score = weight * match_score(wanted, clean_label(label))
+                if score > best:
+                    best, best_label = score, label
+            if best > 0:
+                ranked.append((best, info["launchable"], package, best_label))
+        # Empate: prefere o app de launcher
+        ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [PackageMatch(package, label, score, "index") for score, _, package, label in ranked[:limit]]
+
+    async def resolve(self, device: str, name: str, llm_fn=None) -> PackageMatch:
+        """
+        Pacote para o nome pedido. `llm_fn(prompt)` só é chamada sem candidato
+        confiável; sem ela, fica o melhor candidato (ou o próprio nome).
+        """
+        name = name.strip()
+        if PACKAGE_PATTERN.fullmatch(name):
+            return self._done(PackageMatch(name, None, 1.0, "input"))
+
+        await self.refresh(device)
+        installed = self.index.packages(device)
+        wanted = clean_label(name)
+        learned = self.index.alias(wanted)
+        if learned and (learned in installed or not installed):
+            return self._done(PackageMatch(learned, name, 1.0, "alias"))
+
+        ranked = self.candidates(device, name)
+        if ranked and self._confident(ranked):
+            return self._done(ranked[0])
+        if llm_fn is None:
+            return self._done(ranked[0] if ranked else PackageMatch(name, None, 0.0, "input"))
+
+        package = await self._ask_llm(name, ranked, llm_fn)
+        if package in installed:
+            self.index.learn(wanted, package)
+        return self._done(PackageMatch(package, name, 0.0, "llm"))
+
+    def _confident(self, ranked: list[PackageMatch]) -> bool:
+        best = ranked[0]
+        if best.score < self.min_score:
+            return False
+        return len(ranked) == 1 or best.score - ranked[1].score >= self.margin
+
+    async def _ask_llm(self, name: str, ranked: list[PackageMatch], llm_fn) -> str:
+        prompt = f"Qual é o ID do pacote Android (package name) mais provável para o aplicativo chamado '{name}'?\n"
+        if ranked:
+            options = "\n".join(f"- {m.package}" + (f" ({m.label})" if m.label else "") for m in ranked)
+            prompt += f"Pacotes instalados no dispositivo mais parecidos com o nome:\n{options}\n"
+        prompt += "Responda APENAS o ID do pacote, sem aspas e sem explicações."
+        reply = (await llm_fn(prompt)).strip().strip("\"'`")
+        match = PACKAGE_PATTERN.search(reply)
+        return match.group() if match else reply
+
+    def _labels(self, package: str, info: dict):
+        """
+        (nome, peso) pelos quais o app pode ser chamado: rótulo, nome derivado do
+        pacote, cada palavra dele e apelidos de sistema. Uma palavra solta vale menos
+        ("itau" é com.itau antes de com.itau.investimentos).
+        """
+        if info.get("label"):
+            yield info["label"], 1.0
+        words = [s for s in package.lower().split(".") if s not in GENERIC_SEGMENTS]
+        if words:
+            yield " ".join(words), 1.0
+        if len(words) > 1:
+            for word in words:
+                yield word, 0.9
+        for alias, packages in SYSTEM_ALIASES.items():
+            if package in packages:
+                yield alias, 1.0
+
+    def _done(self, match: PackageMatch) -> PackageMatch:
+        PACKAGE_RESOLUTIONS.inc(source=match.source)
+        return match
+
+
+# Instância global
+package_resolver = PackageResolver(
+    adb=AdbShell(adb_path=os.getenv("ADB_PATH", "adb")),
+    ttl=float(os.getenv("PACKAGE_INDEX_TTL", "600")),
+)
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+SCENARIOS_DIR = os.path.join(os.getcwd(), "app", "scenarios")
+
+
+def _validate(scenario: dict):
+    """Campos usados como chave dos índices: formato errado vira erro do arquivo, não da listagem."""
+    name = scenario.get("name") or scenario.get("id") or "?"
+    package = scenario.get("package")
+    if package is not None and not isinstance(package, str):
+        raise ValueError(f"cenário '{name}': 'package' deve ser texto, veio {type(package).__name__}")
+    tags = scenario.get("tags")
+    if tags is not None and not (isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)):
+        raise ValueError(f"cenário '{name}': 'tags' deve ser uma lista de textos")
+
+
+class ScenarioRepository:
+    """
+    Catálogo de cenários em memória: cada arquivo .json é lido uma vez e só é
+    relido quando muda (mtime/tamanho), com índices por id, pacote e tag. As
+    consultas só leem o índice; quem chama `refresh` (fora do event loop) decide
+    quando ir ao disco.
+    """
+
+    def __init__(self, scenarios_dir: str = SCENARIOS_DIR, check_interval: float = 2.0):
+        self.scenarios_dir = scenarios_dir
+        # Intervalo mínimo entre varreduras do diretório (só stat, sem ler os arquivos)
+        self.check_interval = check_interval
+        self._files: dict[str, dict] = {}  # {caminho: {"stamp", "scenarios", "error"}}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._scenarios: list[dict] = []
+        self._by_id: dict[str, dict] = {}
+        self._by_package: dict[str, list[dict]] = {}
+        self._by_tag: dict[str, list[dict]] = {}
+        self._errors: list[dict] = []
+
+    def refresh(self, force: bool = False) -> bool:
+        """Relê os arquivos novos ou alterados; devolve True se o catálogo mudou."""
+        # Dentro do intervalo nem disputa o lock com uma varredura em andamento
+        if not force and time.monotonic() - self._last_check < self.check_interval:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+
+            current = {}
+            if os.path.isdir(self.scenarios_dir):
+                with os.scandir(self.scenarios_dir) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.endswith(".json"):
+                            stat = entry.stat()
+                            current[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+            changed = set(self._files) != set(current)
+            for path in set(self._files) - set(current):
+                del self._files[path]
+            for path, stamp in current.items():
+                cached = self._files.get(path)
+                if cached is None or cached["stamp"] != stamp:
+                    self._files[path] = self._load_file(path, stamp)
+                    changed = True
+
+            if changed:
+                self._rebuild_index()
+            return changed
+
+    def _load_file(self, path: str, stamp: tuple) -> dict:
+        # Erro em um arquivo não derruba a listagem: fica registrado e os demais seguem
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            scenarios = data if isinstance(data, list) else [data]
+            scenarios = [s for s in scenarios if isinstance(s, dict)]
+            for scenario in scenarios:
+                _validate(scenario)
+                scenario.setdefault("id", scenario.get("name"))
+            return {"stamp": stamp, "scenarios": scenarios, "error": None}
+        except Exception as e:
+            return {"stamp": stamp, "scenarios": [], "error": str(e)}
+
+    def _rebuild_index(self):
+        scenarios, by_id, by_package, by_tag = [], {}, {}, {}
+        for path in sorted(self._files):
+            for scenario in self._files[path]["scenarios"]:
+                scenarios.append(scenario)
+                if scenario.get("id") is not None:
+                    by_id[str(scenario["id"])] = scenario
+                by_package.setdefault(scenario.get("package"), []).append(scenario)
+                for tag in scenario.get("tags") or []:
+                    by_tag.setdefault(tag, []).append(scenario)
+        errors = [
+            {"file": os.path.basename(path), "error": info["error"]}
+            for path, info in sorted(self._files.items()) if info["error"]
+        ]
+        # Troca atômica: leitores nunca veem um índice pela metade
+        self._scenarios, self._by_id, self._by_package, self._by_tag = scenarios, by_id, by_package, by_tag
+        self._errors = errors
+
+    # ── Consultas ─────────────────────────────────────────────────────
+
+    def all(self) -> list[dict]:
+        return list(self._scenarios)
+
+    def get(self, scenario_id: str) -> dict | None:
+        return self._by_id.get(str(scenario_id))
+
+    def query(
+        self,
+        package: str | None = None,
+        tag: str | None = None,
+        search: str | None = None,
+        ids: list[str] | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict], int]:
+        """Filtra pelos índices e pagina; devolve (página, total filtrado)."""
+        if ids is not None:
+            items = [self._by_id[i] for i in ids if i in self._by_id]
+        elif package is not None:
+            items = self._by_package.get(package, [])
+        elif tag is not None:
+            items = self._by_tag.get(tag, [])
+        else:
+            items = self._scenarios
+
+        if package is not None:
+            items = [s for s in items if s.get("package") == package]
+        if tag is not None:
+            items = [s for s in items if tag in (s.get("tags") or [])]
+        if search:
+            needle = search.lower()
+            items = [s for s in items if needle in str(s.get("name", "")).lower() or needle in str(s.get("goal", "")).lower()]
+
+        total = len(items)
+        end = None if limit is None else offset + limit
+        return items[offset:end], total
+
+    def errors(self) -> list[dict]:
+        return list(self._errors)
+
+
+# Instância global
+scenario_repository = ScenarioRepository()
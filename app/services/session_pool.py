@@ -0,0 +1,266 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from types import SimpleNamespace
+
+from app.core.device_executor import device_executor
+from app.core.metrics import metrics
+from app.core.registry import registry
+
+APPIUM_SERVER = "http://localhost:4723"
+
+
+def load_appium() -> SimpleNamespace:
+    """Cliente Appium (e o Selenium por baixo), importado só quando a primeira sessão é aberta."""
+    from appium import webdriver
+    from appium.options.android import UiAutomator2Options
+    from appium.webdriver.common.appiumby import AppiumBy
+
+    return SimpleNamespace(Remote=webdriver.Remote, Options=UiAutomator2Options, By=AppiumBy)
+
+
+registry.register("appium", load_appium)
+
+
+def build_options(device_name: str, app_package: str):
+    options = registry.get("appium").Options()
+    options.platform_name = "Android"
+    options.automation_name = "UiAutomator2"
+    options.device_name = device_name
+    options.app_package = app_package
+    options.no_reset = True
+    options.adb_exec_timeout = 60000   # 60s
+    options.new_command_timeout = 120  # 2 min
+    return options
+
+
+def create_driver(device_name: str, app_package: str):
+    """Factory padrão: abre uma sessão UiAutomator2 no servidor Appium local."""
+    driver = registry.get("appium").Remote(command_executor=APPIUM_SERVER, options=build_options(device_name, app_package))
+    # Sem espera implícita: os cliques são resolvidos pelo índice local da tela, e um
+    # seletor que não existe deve falhar na hora em vez de segurar o passo por 5s
+    driver.implicitly_wait(0)
+    return driver
+
+
+class PooledSession:
+    """Sessão Appium viva, associada a um par (dispositivo, pacote)."""
+
+    def __init__(self, device_name: str, app_package: str, driver):
+        self.device_name = device_name
+        self.app_package = app_package
+        self.driver = driver
+        self.in_use = False
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.runs = 0
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return (self.device_name, self.app_package)
+
+
+class DeviceSessionPool:
+    """Pool de sessões Appium por (dispositivo, pacote), reaproveitadas entre execuções."""
+
+    def __init__(
+        self,
+        executor=None,
+        driver_factory=None,
+        max_sessions_per_device: int = 1,
+        idle_timeout: float = 90.0,
+    ):
+        self.executor = executor or device_executor
+        self.driver_factory = driver_factory or create_driver
+        self.max_sessions_per_device = max(1, max_sessions_per_device)
+        # Deve ficar abaixo do new_command_timeout (120s), senão o Appium derruba a sessão antes
+        self.idle_timeout = idle_timeout
+        self._sessions: list[PooledSession] = []
+        self._cond = asyncio.Condition()
+        self._reaper: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.creation_times: list[float] = []
+
+    # ── Ciclo de Vida ──────────────────────────────────────────────────
+
+    def start(self):
+        """Inicia a tarefa que encerra sessões ociosas (chamado no lifespan da aplicação)."""
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_forever())
+
+    async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        async with self._cond:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            await self._quit(session)
+
+    async def _reap_forever(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 3))
+            await self.evict_idle()
+
+    async def evict_idle(self):
+        now = time.monotonic()
+        async with self._cond:
+            expired = [s for s in self._sessions if not s.in_use and now - s.last_used > self.idle_timeout]
+            for session in expired:
+                self._sessions.remove(session)
+            self.evictions += len(expired)
+            if expired:
+                self._cond.notify_all()
+        for session in expired:
+            await self._quit(session)
+
+    # ── Aquisição / Devolução ─────────────────────────────────────────
+
+    async def acquire(self, device_name: str, app_package: str) -> PooledSession:
+        """Devolve uma sessão pronta com o app em primeiro plano, criando-a só quando necessário."""
+        while True:
+            async with self._cond:
+                session = self._find_idle(device_name, app_package)
+                if session is None:
+                    victim = None
+                    if self._device_count(device_name) >= self.max_sessions_per_device:
+                        # Dispositivo cheio: libera uma sessão ociosa de outro pacote ou espera
+                        victim = next(
+                            (s for s in self._sessions if s.device_name == device_name and not s.in_use),
+                            None,
+                        )
+                        if victim is None:
+                            await self._cond.wait()
+                            continue
+                        self._sessions.remove(victim)
+                        self.evictions += 1
+                    # Reserva a vaga antes de sair da seção crítica
+                    session = PooledSession(device_name, app_package, None)
+                    session.in_use = True
+                    self._sessions.append(session)
+                else:
+                    session.in_use = True
+
+            if session.driver is not None:
+                if await self._reset(session):
+                    self.hits += 1
+                    return session
+                await self._discard(session)
+                continue
+
+            if victim is not None:
+                await self._quit(victim)
+            return await self._create(session)
+
+    async def release(self, session: PooledSession, healthy: bool = True):
+        """Devolve a sessão ao pool; sessões com falha são encerradas."""
+        if not healthy:
+            await self._discard(session)
+            return
+        async with self._cond:
+            session.in_use = False
+            session.last_used = time.monotonic()
+            session.runs += 1
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def session(self, device_name: str, app_package: str):
+        session = await self.acquire(device_name, app_package)
+        healthy = True
+        try:
+            yield session
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            await self.release(session, healthy=healthy)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "sessions_created": len(self.creation_times),
+            "avg_creation_time_s": (
+                round(sum(self.creation_times) / len(self.creation_times), 3) if self.creation_times else 0.0
+            ),
+            "active": sum(1 for s in self._sessions if s.in_use),
+            "idle": sum(1 for s in self._sessions if not s.in_use),
+        }
+
+    # ── Internos ──────────────────────────────────────────────────────
+
+    def _find_idle(self, device_name: str, app_package: str) -> PooledSession | None:
+        for session in self._sessions:
+            if session.key == (device_name, app_package) and not session.in_use and session.driver is not None:
+                return session
+        return None
+
+    def _device_count(self, device_name: str) -> int:
+        return sum(1 for s in self._sessions if s.device_name == device_name)
+
+    async def _create(self, session: PooledSession) -> PooledSession:
+        self.misses += 1
+        start = time.perf_counter()
+        try:
+            session.driver = await self.executor.run(
+                session.device_name, self.driver_factory, session.device_name, session.app_package
+            )
+            await self.executor.run(session.device_name, session.driver.activate_app, session.app_package)
+        except Exception:
+            await self._discard(session)
+            raise
+        self.creation_times.append(time.perf_counter() - start)
+        return session
+
+    async def _reset(self, session: PooledSession) -> bool:
+        """Health check + reset do app: terminate/activate em vez de derrubar a sessão."""
+        def reset():
+            session.driver.current_package  # Falha rápido se a sessão morreu no servidor
+            session.driver.terminate_app(session.app_package)
+            session.driver.activate_app(session.app_package)
+
+        try:
+            await self.executor.run(session.device_name, reset)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, session: PooledSession):
+        async with self._cond:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            self._cond.notify_all()
+        await self._quit(session)
+
+    async def _quit(self, session: PooledSession):
+        if session.driver is None:
+            return
+        try:
+            await self.executor.run(session.device_name, session.driver.quit)
+        except Exception:
+            pass
+        session.driver = None
+
+
+# Instância global compartilhada pelas rotas
+session_pool = DeviceSessionPool(
+    max_sessions_per_device=int(os.getenv("SESSION_MAX_PER_DEVICE", "1")),
+    idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT", "90")),
+)
+
+# Exportadas em /api/metrics, lidas do pool no momento da coleta
+metrics.gauge(
+    "sessions", "Sessões Appium abertas por estado", ("state",),
+    collect=lambda: {(state,): session_pool.metrics()[state] for state in ("active", "idle")},
+)
+metrics.counter(
+    "session_pool_lookups_total", "Pedidos ao pool: sessão reaproveitada (hit) ou criada (miss)", ("result",),
+    collect=lambda: {("hit",): session_pool.hits, ("miss",): session_pool.misses},
+)
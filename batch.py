@@ -0,0 +1,59 @@
+"""Executa uma suíte de cenários distribuída entre vários emuladores.
+
+Exemplo:
+    python batch.py --devices emulator-5554 emulator-5556 --scenarios login busca --retries 1
+"""
+import argparse
+import asyncio
+import json
+
+from app.services.batch_runner import BatchRunner, run_scenario_on_device
+from app.services.llm_service import llm_service
+from app.services.scenario_service import scenario_repository
+from app.services.session_pool import session_pool
+
+
+async def main(args):
+    scenario_repository.refresh(force=True)
+    scenarios, _ = scenario_repository.query(ids=args.scenarios or None)
+    for error in scenario_repository.errors():
+        print(f"⚠️ Cenário ignorado ({error['file']}): {error['error']}")
+    if not scenarios:
+        raise SystemExit("Nenhum cenário encontrado.")
+
+    llm_fn = llm_service.decider(args.provider)
+    runner = BatchRunner(
+        devices=args.devices,
+        run_fn=lambda device, scenario: run_scenario_on_device(device, scenario, llm_fn, default_mode=args.mode),
+        max_retries=args.retries,
+        on_event=lambda event, **data: print(f"[{event}] {data}"),
+    )
+
+    await llm_service.startup()
+    try:
+        report = await runner.run(scenarios)
+    finally:
+        await session_pool.close()
+        await llm_service.shutdown()
+
+    if not args.verbose:
+        for scenario in report["scenarios"]:
+            scenario.pop("log")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report["failed"] == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runner de cenários em lote (multi-dispositivo).")
+    parser.add_argument("--devices", nargs="+", required=True, help="Emuladores/dispositivos disponíveis")
+    parser.add_argument("--scenarios", nargs="*", help="IDs dos cenários (padrão: todos)")
+    parser.add_argument("--mode", default="dynamic", choices=["dynamic", "fixed"])
+    parser.add_argument("--provider", default="ollama", choices=["ollama", "google"])
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--output", help="Grava o relatório JSON neste arquivo")
+    parser.add_argument("--verbose", action="store_true", help="Inclui o log completo de cada cenário")
+    ok = asyncio.run(main(parser.parse_args()))
+    raise SystemExit(0 if ok else 1)
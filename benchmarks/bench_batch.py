@@ -0,0 +1,99 @@
+"""Escalabilidade do BatchRunner com 1, 2 e 4 dispositivos fake, com verificação do escalonador.
+
+Um dos cenários falha sempre no primeiro dispositivo: com mais de um device a
+nova tentativa tem de rodar em outro. Confere também que nenhum dispositivo roda
+dois cenários ao mesmo tempo e que os totais do relatório batem. Sai com código 1
+se alguma verificação falhar.
+
+Uso: python -m benchmarks.bench_batch [N_SCENARIOS]
+"""
+import asyncio
+import sys
+
+from app.core.decision_cache import DecisionCache
+from app.services.automation_service import AutomationService
+from app.services.batch_runner import BatchRunner
+from app.services.session_pool import DeviceSessionPool
+from benchmarks.fakes import FakeDriver
+
+# Cenário que falha no primeiro dispositivo da lista (device "com problema")
+FLAKY = "s0"
+
+
+def check(report: dict, devices: list[str], n_scenarios: int, max_active: dict, retries: list[dict]) -> list[str]:
+    """Problemas encontrados no relatório e no que o escalonador fez (vazio = tudo certo)."""
+    problems = []
+    if report["total"] != n_scenarios:
+        problems.append(f"total {report['total']} != {n_scenarios} cenários")
+    if report["passed"] + report["failed"] != report["total"]:
+        problems.append("passed + failed != total")
+    if sum(report["per_device"].values()) != report["total"]:
+        problems.append(f"per_device {report['per_device']} não soma o total")
+    if report["llm_calls"] != sum(r["llm_calls"] for r in report["scenarios"]):
+        problems.append("llm_calls não bate com a soma dos cenários")
+    busy = {device: count for device, count in max_active.items() if count > 1}
+    if busy:
+        problems.append(f"mais de um cenário ao mesmo tempo no mesmo device: {busy}")
+
+    flaky = next(r for r in report["scenarios"] if r["id"] == FLAKY)
+    if len(devices) == 1:
+        # Sem outro dispositivo a nova tentativa volta para o mesmo e falha de novo
+        if flaky["passed"] or flaky["attempts"] != 2:
+            problems.append(f"{FLAKY}: esperado falhar em 2 tentativas, veio {flaky['attempts']} ({flaky['passed']})")
+    else:
+        if not flaky["passed"] or flaky["device"] == devices[0] or flaky["attempts"] != 2:
+            problems.append(
+                f"{FLAKY}: nova tentativa devia passar fora de {devices[0]}, "
+                f"rodou em {flaky['device']} (tentativa {flaky['attempts']}, passou={flaky['passed']})"
+            )
+        if any(r["retry_on"] == r["device"] for r in retries):
+            problems.append(f"nova tentativa agendada no device que falhou: {retries}")
+    return problems
+
+
+async def main(n_scenarios: int) -> int:
+    scenarios = [
+        {"id": f"s{i}", "name": f"Cenário {i}", "package": "com.android.settings",
+         "mode": "fixed", "steps": ["Clique em Bateria", "Role para baixo"]}
+        for i in range(n_scenarios)
+    ]
+    failures = 0
+    for n_devices in (1, 2, 4):
+        pool = DeviceSessionPool(driver_factory=lambda device, package: FakeDriver(latency=0.05))
+        cache = DecisionCache(":memory:")
+        devices = [f"emulator-{5554 + 2 * i}" for i in range(n_devices)]
+        active = dict.fromkeys(devices, 0)
+        max_active = dict.fromkeys(devices, 0)
+        retries = []
+
+        async def run_fn(device, scenario):
+            active[device] += 1
+            max_active[device] = max(max_active[device], active[device])
+            try:
+                service = AutomationService(pool=pool, cache=cache, screenshot_every=0)
+                log = await service.run_fixed_script(device, scenario["package"], scenario["steps"])
+                passed = service.succeeded and not (scenario["id"] == FLAKY and device == devices[0])
+                return {"passed": passed, "llm_calls": service.llm_calls, "cache_hits": service.cache_hits, "log": log}
+            finally:
+                active[device] -= 1
+
+        def on_event(event_type, **data):
+            if event_type == "scenario_retry":
+                retries.append(data)
+
+        report = await BatchRunner(devices, run_fn, on_event=on_event).run(scenarios)
+        problems = check(report, devices, n_scenarios, max_active, retries)
+        print(
+            f"{n_devices} device(s): {report['wall_time_s']:6.2f}s  "
+            f"passou={report['passed']}/{report['total']}  por device={report['per_device']}  "
+            f"{'✅' if not problems else '❌'}"
+        )
+        for problem in problems:
+            print(f"  - {problem}")
+        failures += len(problems)
+        await pool.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)))
@@ -0,0 +1,82 @@
+"""Elementos em dict (anterior) x registros com __slots__ e JSON sob demanda.
+
+Mede tempo por parse, memória retida pela lista de elementos e número de blocos
+alocados, além do caminho completo de uma observação (parse + hash + JSON).
+Uso: python -m benchmarks.bench_elements [N_NODES]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from app.core.hasher import ui_hasher
+from app.core.parser import UIParser
+from benchmarks.bench_parser import LegacyUIParser, synthetic_hierarchy
+
+
+class DictUIParser(UIParser):
+    """Mesmo parser incremental, mas gerando um dict por elemento como antes."""
+
+    _element = LegacyUIParser._element_data
+
+    def observe(self, xml: str) -> str:
+        elements = self.parse_elements(xml)
+        ui_hasher.fingerprints(elements)
+        # O JSON era sempre gerado, mesmo quando a decisão vinha do cache
+        json.dumps(elements, ensure_ascii=False, separators=(',', ':'))
+        return elements
+
+
+class SlotsUIParser(UIParser):
+    def observe(self, xml: str):
+        # Como o motor: os dois hashes lidos direto dos slots, sem dict nem JSON
+        screen = self.parse(xml)
+        ui_hasher.fingerprints(screen.elements)
+        return screen
+
+
+def retained(parse, xml: str) -> tuple[float, int]:
+    """(KiB retidos pelo resultado, blocos alocados) de um parse."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = parse(xml)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(s.size_diff for s in stats)
+    blocks = sum(s.count_diff for s in stats)
+    del result
+    return size / 1024, blocks
+
+
+def timed(fn, xml: str, rounds: int) -> float:
+    """Melhor tempo (ms) entre as rodadas: a média oscila demais com o ruído da máquina."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(xml)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(n_nodes: int):
+    xml = synthetic_hierarchy(n_nodes, depth=4)
+    parsers = {"dict por elemento": DictUIParser(use_lxml=False), "slots + JSON sob demanda": SlotsUIParser(use_lxml=False)}
+    rounds = 20
+    print(f"{n_nodes} nós, {len(parsers['dict por elemento'].parse_elements(xml))} elementos, {rounds} rodadas")
+    for label, parser in parsers.items():
+        kib, blocks = retained(parser.parse_elements, xml)
+        parse_ms = timed(parser.parse_elements, xml, rounds)
+        observe_ms = timed(parser.observe, xml, rounds)
+        print(
+            f"  {label:<26} parse {parse_ms:7.2f}ms  observação {observe_ms:7.2f}ms  "
+            f"retido {kib:8.1f}KiB  blocos {blocks:7d}"
+        )
+
+    # A visão em JSON continua idêntica à anterior
+    same = LegacyUIParser().parse_to_json(xml) == UIParser(use_lxml=False).parse_to_json(xml)
+    print(f"  JSON do prompt: {'idêntico' if same else 'DIFERENTE'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
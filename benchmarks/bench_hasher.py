@@ -0,0 +1,31 @@
+"""Hash de tela: JSON -> json.loads -> json.dumps(sort_keys) -> SHA-256 (anterior) x fingerprint direto.
+
+Uso: python -m benchmarks.bench_hasher [N_ROWS]
+"""
+import sys
+import timeit
+
+from app.core.hasher import ui_hasher, xxhash
+from app.core.parser import ui_parser
+from benchmarks.bench_parser import synthetic_hierarchy
+
+
+def main(n_nodes: int):
+    xml = synthetic_hierarchy(n_nodes, depth=4)
+    elements, minified_ui = ui_parser.parse_screen(xml)
+    rounds = 200
+    print(f"{len(elements)} elementos, {rounds} rodadas, algoritmo={'xxh3_64' if xxhash else 'blake2b-64'}")
+
+    cases = {
+        "calculate_hash (JSON + SHA-256)": lambda: ui_hasher.calculate_hash(minified_ui),
+        "fingerprint": lambda: ui_hasher.fingerprint(elements),
+        "fingerprint estrutural": lambda: ui_hasher.fingerprint(elements, structural=True),
+        "fingerprints (exato + estrutural)": lambda: ui_hasher.fingerprints(elements),
+    }
+    for label, fn in cases.items():
+        per_call = timeit.timeit(fn, number=rounds) / rounds * 1000
+        print(f"  {label:<34} {per_call:8.3f}ms/chamada")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
@@ -0,0 +1,106 @@
+"""Tempo de import da aplicação (partida a frio de um worker) medido com `python -X importtime`.
+
+Cada execução é um processo novo que só importa `app.main`; a saída do importtime
+dá o tempo acumulado de cada módulo. Mostra a mediana, os pacotes mais caros e o
+custo que ficou para o primeiro uso de cada componente do registro. Sai com
+código 1 se a mediana passar de --max-ms ou se algum SDK que deveria carregar sob
+demanda (Gemini, Appium/Selenium) for importado na partida.
+
+Uso:
+    python -m benchmarks.bench_import_time [--runs 5] [--max-ms 1000]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Só podem ser importados no primeiro uso (via app.core.registry)
+LAZY_MODULES = ("google.genai", "appium", "selenium")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str = "app.main") -> dict[str, tuple[int, int, int]]:
+    """{módulo: (µs próprios, µs acumulados, profundidade)} de um processo novo importando `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    profile = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            profile[name] = (int(own), int(cumulative), len(indent) // 2)
+    return profile
+
+
+def first_use_costs() -> dict:
+    """Tempo de carga de cada componente do registro, medido depois do import da aplicação."""
+    script = (
+        "import json, app.main\n"
+        "from app.core.registry import registry\n"
+        "names = list(registry.status())\n"
+        "registry.preload(names)\n"
+        "print(json.dumps(registry.status()))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(args) -> int:
+    profiles = [import_profile() for _ in range(args.runs)]
+    totals = [p["app.main"][1] / 1000 for p in profiles]
+    median = statistics.median(totals)
+    print(f"import app.main: mediana {median:.0f}ms (min {min(totals):.0f}ms, max {max(totals):.0f}ms, {args.runs} execuções)")
+
+    # Pacotes de primeiro nível por tempo acumulado, do último perfil
+    profile = profiles[-1]
+    packages = {}
+    for name, (_, cumulative, depth) in profile.items():
+        top = name.split(".")[0]
+        if name == top or depth == 0:
+            packages[top] = max(packages.get(top, 0), cumulative)
+    print("\nPacotes mais caros:")
+    for top, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {top:<28} {cumulative / 1000:7.1f}ms")
+
+    costs = first_use_costs()
+    if costs:
+        print("\nCarga no primeiro uso (fora da partida):")
+        for name, status in sorted(costs.items()):
+            result = f"{status['load_ms']:7.1f}ms" if status["loaded"] else f"falhou: {status['error']}"
+            print(f"  {name:<28} {result}")
+
+    problems = []
+    eager = sorted({m for p in profiles for m in p if any(m == lazy or m.startswith(lazy + ".") for lazy in LAZY_MODULES)})
+    if eager:
+        problems.append(f"módulos que deveriam carregar sob demanda importados na partida: {', '.join(eager[:5])}")
+    if median > args.max_ms:
+        problems.append(f"mediana {median:.0f}ms acima do limite de {args.max_ms:.0f}ms")
+    if problems:
+        print("\n❌ Regressões na partida:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print(f"\n✅ Partida dentro do limite ({args.max_ms:.0f}ms) e sem SDKs carregados antes do uso")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="processos medidos (usa a mediana)")
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="limite para a mediana do import")
+    parser.add_argument("--top", type=int, default=8, help="pacotes mais caros a listar")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
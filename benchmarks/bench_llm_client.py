@@ -0,0 +1,50 @@
+"""Latência por chamada ao Ollama: cliente HTTP novo a cada prompt x cliente compartilhado.
+
+Uso: python -m benchmarks.bench_llm_client [N_CALLS]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+from app.services.llm_service import llm_service
+from benchmarks.fakes import StubOllamaServer
+
+
+async def _per_call_client(url: str, payload: dict) -> str:
+    # Comportamento anterior: um AsyncClient (e uma conexão TCP) por prompt
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        response = await client.post(url, json=payload)
+        return response.json()["choices"][0]["message"]["content"]
+
+
+async def _measure(fn, n_calls: int) -> list[float]:
+    latencies = []
+    for _ in range(n_calls):
+        start = time.perf_counter()
+        await fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _summary(label: str, latencies: list[float]):
+    print(f"{label:<24} p50={statistics.median(latencies):6.2f}ms mean={statistics.mean(latencies):6.2f}ms")
+
+
+async def main(n_calls: int):
+    with StubOllamaServer() as stub:
+        llm_service.router.backends = [
+            llm_service._build_backend({"name": "ollama", "provider": "ollama", "url": stub.url, "model": "stub"})
+        ]
+        payload = {"model": "stub", "messages": [{"role": "user", "content": "oi"}], "stream": False}
+
+        _summary("cliente por chamada", await _measure(lambda: _per_call_client(stub.url, payload), n_calls))
+        await llm_service.startup()
+        _summary("cliente compartilhado", await _measure(lambda: llm_service.get_completion("oi"), n_calls))
+        await llm_service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
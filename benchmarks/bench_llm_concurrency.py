@@ -0,0 +1,39 @@
+"""Mostra que chamadas concorrentes ao Gemini se sobrepõem em vez de serializar.
+
+Uso: python -m benchmarks.bench_llm_concurrency [N_CALLS]
+"""
+import asyncio
+import sys
+import time
+
+from app.services.llm_router import LLMError
+from app.services.llm_service import llm_service
+from benchmarks.fakes import FakeGeminiClient
+
+
+async def _concurrent(n_calls: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*[llm_service.get_completion("oi", provider="google") for _ in range(n_calls)])
+    return time.perf_counter() - start
+
+
+async def main(n_calls: int):
+    latency = 1.0
+    print(f"{n_calls} chamadas de {latency:.1f}s cada (serial seria {n_calls * latency:.1f}s)")
+
+    llm_service.gemini_client = FakeGeminiClient(latency=latency)
+    print(f"SDK assíncrono (aio):      {await _concurrent(n_calls):.2f}s")
+
+    llm_service.gemini_client = FakeGeminiClient(latency=latency, async_api=False)
+    print(f"SDK síncrono em thread:    {await _concurrent(n_calls):.2f}s")
+
+    llm_service.router.timeout = latency / 2
+    llm_service.gemini_client = FakeGeminiClient(latency=latency)
+    try:
+        await llm_service.get_completion("oi", provider="google")
+    except LLMError as e:
+        print(f"timeout de {llm_service.router.timeout:.1f}s:           {type(e).__name__}: {e}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4))
@@ -0,0 +1,79 @@
+"""Modo reativo: prompt completo a cada passo x conversa com só as mudanças da tela.
+
+As sessões gravadas rodam contra o stub do Ollama, que imita a avaliação do prompt
+a `PROMPT_RATE` tokens/s com o cache de contexto de um slot (só o que vem depois do
+prefixo em comum com a chamada anterior é avaliado) e gera 30 tokens/s. Três modos:
+
+- tela antes das regras: o prefixo em comum entre os passos acaba no começo da tela;
+- prefixo fixo: regras e objetivo primeiro, a tela no fim (o prompt atual sem conversa);
+- conversa (LLM_CONVERSATION=1): histórico no contexto e só as mudanças da tela.
+
+Uso: python -m benchmarks.bench_llm_conversation [PROMPT_RATE]
+"""
+import asyncio
+import sys
+import time
+
+from app.core.decision_cache import DecisionCache
+from app.core.plan_store import PlanStore
+from app.services.automation_service import AutomationService
+from app.services.llm_service import llm_service
+from app.services.session_pool import DeviceSessionPool
+from benchmarks.fakes import RecordedDriver, StubOllamaServer, load_sessions
+from benchmarks.harness import DEVICE, SESSIONS_DIR
+
+
+def screen_first(decider):
+    """Reordena o prompt para a tela vir antes das regras."""
+    async def llm_fn(prompt: str) -> str:
+        head, screen = prompt.split("\nESTRUTURA DA TELA (JSON):\n", 1)
+        intro, rules = head.split("REGRAS:\n", 1)
+        return await decider(f"{intro}ESTRUTURA DA TELA (JSON):\n{screen}\nREGRAS:\n{rules}")
+    return llm_fn
+
+
+async def run(session, stub: StubOllamaServer, mode: str) -> dict:
+    llm_service.conversation_mode = mode == "conversa"
+    llm_fn = llm_service.decider("ollama")
+    if mode == "tela antes das regras":
+        llm_fn = screen_first(llm_fn)
+    # A LLM responde pela tela da última mensagem (na conversa, as anteriores ficam no histórico)
+    stub.reply = lambda messages: session.reply_for(messages[-1]["content"])
+    stub.evaluated = []
+    stub._context = []
+    pool = DeviceSessionPool(driver_factory=lambda device, package: RecordedDriver(session, latency=0.02, transition=0.2))
+    service = AutomationService(pool=pool, cache=DecisionCache(":memory:"), plans=PlanStore(":memory:"), screenshot_every=0)
+    started = time.perf_counter()
+    await service.run_reactive_loop(DEVICE, session.package, session.goal, llm_fn)
+    elapsed = time.perf_counter() - started
+    await pool.close()
+    return {
+        "passed": service.succeeded,
+        "wall_s": elapsed,
+        "llm_s": service.timing_totals["llm"],
+        "evaluated": list(stub.evaluated),
+    }
+
+
+async def main(prompt_rate: float):
+    sessions = load_sessions(SESSIONS_DIR)
+    with StubOllamaServer(token_delay=1 / 30, prompt_rate=prompt_rate) as stub:
+        llm_service.router.backends = [
+            llm_service._build_backend({"name": "ollama", "provider": "ollama", "url": stub.url, "model": "stub"})
+        ]
+        await llm_service.startup()
+        print(f"Avaliação do prompt a {prompt_rate:.0f} tokens/s:")
+        for session in sessions:
+            for mode in ("tela antes das regras", "prefixo fixo", "conversa"):
+                result = await run(session, stub, mode)
+                steps = ", ".join(str(n) for n in result["evaluated"])
+                print(
+                    f"  {session.name:<24} {mode:<22} {'✅' if result['passed'] else '❌'}  "
+                    f"tempo {result['wall_s']:5.2f}s  llm {result['llm_s']:5.2f}s  "
+                    f"tokens avaliados {sum(result['evaluated']):5d} (por passo: {steps})"
+                )
+        await llm_service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 150.0))
@@ -0,0 +1,88 @@
+"""Roteador de LLM: três backends Ollama, um deles lento (ou fora do ar), com e sem hedge.
+
+Uso: python -m benchmarks.bench_llm_router [N_REQUESTS] [CONCURRENCY]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from app.core.resilience import CircuitBreaker
+from app.services.llm_router import LLMBackend, LLMError, LLMRouter
+
+
+def fake_box(rng: random.Random, base: float, tail: float = 0.0, tail_rate: float = 0.0, down: bool = False):
+    """Backend falso: latência `base` (±20%) e, em `tail_rate` das chamadas, `tail` segundos."""
+    async def call(prompt: str) -> str:
+        if down:
+            await asyncio.sleep(0.05)
+            raise ConnectionError("Connection refused")
+        latency = base * rng.uniform(0.8, 1.2)
+        if rng.random() < tail_rate:
+            latency = tail
+        await asyncio.sleep(latency)
+        return "Clique em Bateria"
+    return call
+
+
+def build_router(scenario: str, hedge: bool, seed: int = 7) -> LLMRouter:
+    rng = random.Random(seed)
+    third = (
+        fake_box(rng, 0.3, down=True) if scenario == "fora do ar"
+        else fake_box(rng, 0.6, tail=3.0, tail_rate=0.3)
+    )
+    backends = [
+        LLMBackend("box-1", "ollama", fake_box(rng, 0.2, tail=1.0, tail_rate=0.05), concurrency=4),
+        LLMBackend("box-2", "ollama", fake_box(rng, 0.2, tail=1.0, tail_rate=0.05), concurrency=4),
+        LLMBackend("box-3", "ollama", third, concurrency=4, breaker=CircuitBreaker(threshold=3, cooldown=30)),
+    ]
+    return LLMRouter(backends, timeout=10.0, hedge=hedge, hedge_after=0.5, rng=random.Random(seed))
+
+
+async def run(router: LLMRouter, n_requests: int, concurrency: int) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    failures = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with limit:
+            started = time.perf_counter()
+            try:
+                await router.complete("prompt", "ollama")
+            except LLMError:
+                failures += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[one() for _ in range(n_requests)])
+    return latencies, failures
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def main(n_requests: int, concurrency: int):
+    for scenario in ("lenta", "fora do ar"):
+        print(f"box-3 {scenario}:")
+        for label, hedge in (("sem hedge", False), ("com hedge", True)):
+            router = build_router(scenario, hedge)
+            started = time.perf_counter()
+            latencies, failures = await run(router, n_requests, concurrency)
+            elapsed = time.perf_counter() - started
+            box3 = router.backend("box-3")
+            print(
+                f"  {label:<10} p50 {statistics.median(latencies):5.2f}s  p95 {percentile(latencies, 0.95):5.2f}s  "
+                f"p99 {percentile(latencies, 0.99):5.2f}s  total {elapsed:5.1f}s  falhas {failures}  "
+                f"disjuntor box-3: {box3.breaker.state}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    ))
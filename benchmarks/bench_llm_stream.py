@@ -0,0 +1,81 @@
+"""Decisão da IA: resposta inteira x sequência de parada x streaming cortado na primeira linha de ação.
+
+O stub gera `TOKENS_PER_S` tokens por segundo (um modelo 7B local em CPU) e a
+resposta traz a ação seguida de um parágrafo de explicação, como costuma acontecer.
+
+Uso: python -m benchmarks.bench_llm_stream [N_CALLS] [TOKENS_PER_S]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from app.core.actions import first_action
+from app.services.llm_service import llm_service
+from benchmarks.fakes import FakeGeminiClient, StubOllamaServer
+
+REPLY = (
+    "Clique em Bateria\n\n"
+    "Explicação: a tela atual é a página inicial das Configurações e o objetivo é ativar a "
+    "Economia de bateria. O item 'Bateria' leva às opções de energia, onde fica o controle "
+    "da Economia de bateria. Depois de abrir essa tela, o próximo passo será tocar no item "
+    "'Economia de bateria' e então ativar a chave 'Usar a Economia de bateria'. Outras opções "
+    "como 'Tela' ou 'Apps' não levam ao objetivo e por isso foram descartadas nesta etapa."
+)
+
+
+async def _measure(fn, n_calls: int) -> tuple[list[float], str]:
+    latencies, reply = [], ""
+    for _ in range(n_calls):
+        started = time.perf_counter()
+        reply = await fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies, reply
+
+
+def _summary(label: str, latencies: list[float], reply: str, generated: int, n_calls: int):
+    first_line = reply.strip().split("\n")[0]
+    print(
+        f"  {label:<28} p50 {statistics.median(latencies):5.2f}s  "
+        f"tokens gerados/chamada {generated / n_calls:5.1f}  decisão: {first_line!r}"
+    )
+
+
+async def main(n_calls: int, tokens_per_s: float):
+    with StubOllamaServer(reply=REPLY, token_delay=1 / tokens_per_s) as stub:
+        llm_service.router.backends = [
+            llm_service._build_backend({"name": "ollama", "provider": "ollama", "url": stub.url, "model": "stub"})
+        ]
+        await llm_service.startup()
+        print(f"Ollama ({tokens_per_s:.0f} tokens/s):")
+        for label, fn in (
+            ("resposta inteira", lambda: llm_service.get_completion("prompt")),
+            ("max_tokens=64", lambda: llm_service.get_completion("prompt", max_tokens=64)),
+            ("stop (LLM_STREAM=0)", lambda: llm_service.get_completion("prompt", stop=llm_service.decision_stop)),
+            ("streaming + corte", lambda: llm_service.get_decision("prompt")),
+        ):
+            stub.generated = 0
+            latencies, reply = await _measure(fn, n_calls)
+            await asyncio.sleep(0.2)  # o stub percebe a desconexão no próximo token
+            _summary(label, latencies, reply, stub.generated, n_calls)
+        await llm_service.shutdown()
+
+    # Gemini: latência total de 2s distribuída pelos pedaços do streaming
+    gemini = FakeGeminiClient(latency=2.0, reply=REPLY)
+    llm_service.gemini_client = gemini
+    llm_service.router.backends = [llm_service._build_backend({"name": "google", "provider": "google"})]
+    print("Gemini (2s por resposta completa):")
+    for label, fn in (
+        ("resposta inteira", lambda: llm_service.get_completion("prompt", provider="google")),
+        ("streaming + corte", lambda: llm_service.get_completion("prompt", provider="google", until=first_action)),
+    ):
+        gemini.generated = 0
+        latencies, reply = await _measure(fn, n_calls)
+        _summary(label, latencies, reply, gemini.generated or len(REPLY.split()) * n_calls, n_calls)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 30.0,
+    ))
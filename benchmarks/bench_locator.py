@@ -0,0 +1,92 @@
+"""Clique por sondagem de seletores (espera implícita de 5s) x índice local da tela.
+
+Uso: python -m benchmarks.bench_locator [N_ROWS]
+"""
+import sys
+import time
+
+from app.core.locator import ElementIndex
+from app.core.parser import ui_parser
+
+
+class ProbeDriver:
+    """Só encontra o elemento pelo seletor que contém `hit`; os demais esperam a espera implícita."""
+
+    def __init__(self, hit: str, implicit_wait: float, latency: float = 0.02):
+        self.hit = hit
+        self.implicit_wait = implicit_wait
+        self.latency = latency
+        self.calls = 0
+
+    def find_element(self, by, value):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.hit not in value:
+            time.sleep(self.implicit_wait)
+            raise LookupError(value)
+        return self
+
+    def click(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def tap(self, positions, duration=None):
+        self.calls += 1
+        time.sleep(self.latency)
+
+
+def settings_list(n_rows: int) -> str:
+    rows = "".join(
+        f'<node class="android.widget.LinearLayout" clickable="true" bounds="[0,{i * 160}][1080,{i * 160 + 160}]">'
+        f'<node class="android.widget.TextView" text="Opção {i}" resource-id="android:id/title" '
+        f'bounds="[48,{i * 160 + 20}][900,{i * 160 + 80}]" />'
+        f'<node class="android.widget.TextView" text="Resumo da opção {i}" resource-id="android:id/summary" '
+        f'bounds="[48,{i * 160 + 80}][900,{i * 160 + 140}]" />'
+        f'</node>'
+        for i in range(n_rows)
+    )
+    return f'<hierarchy><node class="android.widget.FrameLayout">{rows}</node></hierarchy>'
+
+
+def legacy_click(driver, target: str) -> bool:
+    for selector in [
+        f'new UiSelector().textContains("{target}")',
+        f'new UiSelector().descriptionContains("{target}")',
+        f'new UiSelector().textMatches("(?i).*{target}.*")',
+    ]:
+        try:
+            driver.find_element("-android uiautomator", selector).click()
+            return True
+        except Exception:
+            pass
+    return False
+
+
+def main(n_rows: int):
+    xml = settings_list(n_rows)
+    target = f"opção {n_rows - 1}"  # só o textMatches (3º seletor) acha: caixa diferente
+
+    driver = ProbeDriver(hit="textMatches", implicit_wait=5.0)
+    started = time.perf_counter()
+    legacy_click(driver, target)
+    print(f"sondagem (implicitly_wait=5): {time.perf_counter() - started:6.2f}s, {driver.calls} chamadas ao driver")
+
+    driver = ProbeDriver(hit="textMatches", implicit_wait=0.0)
+    started = time.perf_counter()
+    legacy_click(driver, target)
+    print(f"sondagem (implicitly_wait=0): {time.perf_counter() - started:6.2f}s, {driver.calls} chamadas ao driver")
+
+    screen = ui_parser.parse(xml)
+    driver = ProbeDriver(hit="", implicit_wait=0.0)
+    started = time.perf_counter()
+    match = ElementIndex(screen).resolve(target)
+    resolve_ms = (time.perf_counter() - started) * 1000
+    driver.tap([match.center])
+    print(
+        f"índice local ({len(screen)} elementos):   {time.perf_counter() - started:6.2f}s, "
+        f"{driver.calls} chamada ao driver (resolução {resolve_ms:.1f}ms, '{match.label}' em {match.center})"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
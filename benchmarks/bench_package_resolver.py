@@ -0,0 +1,174 @@
+"""Descoberta do pacote: uma chamada à LLM por execução x índice local do dispositivo.
+
+O dispositivo fake tem ~200 pacotes de sistema e ~30 apps de launcher; só parte
+deles expõe o rótulo no dumpsys (como em builds reais). A LLM fake acerta sempre,
+mas leva `LLM_LATENCY` segundos. Mede o primeiro uso (refresh completo do índice),
+os seguintes (índice válido) e o refresh incremental depois de instalar/atualizar apps.
+
+Uso: python -m benchmarks.bench_package_resolver [LLM_LATENCY]
+"""
+import asyncio
+import sys
+import time
+
+from app.core.package_index import PackageIndex
+from app.services.package_resolver import PACKAGE_PATTERN, PackageResolver
+from benchmarks.fakes import FakeAdb
+
+DEVICE = "emulator-5554"
+
+# (pacote, rótulo no dumpsys ou None)
+APPS = [
+    ("com.android.settings", "Configurações"),
+    ("com.android.chrome", "Chrome"),
+    ("com.android.vending", None),
+    ("com.google.android.youtube", "YouTube"),
+    ("com.google.android.apps.youtube.music", "YouTube Music"),
+    ("com.google.android.gm", "Gmail"),
+    ("com.google.android.apps.maps", None),
+    ("com.google.android.calculator", None),
+    ("com.google.android.deskclock", None),
+    ("com.whatsapp", None),
+    ("com.itau", "Itaú"),
+    ("com.itau.investimentos", None),
+    ("com.nu.production", "Nubank"),
+    ("com.mercadolibre", None),
+    ("br.com.brainweb.ifood", "iFood"),
+    ("com.spotify.music", None),
+    ("com.instagram.android", None),
+    ("com.ubercab", "Uber"),
+    ("com.netflix.mediaclient", None),
+    ("org.telegram.messenger", None),
+    ("com.waze", None),
+    ("br.com.bb.android", "BB"),
+    ("com.bradesco", None),
+    ("com.picpay", None),
+    ("com.shopee.br", None),
+    ("com.luizalabs.mlapp", "Magalu"),
+    ("com.linkedin.android", None),
+    ("com.twitter.android", "X"),
+    ("com.santander.app", None),
+    ("com.grability.rappi", None),
+]
+# Nome pedido → pacote certo
+QUERIES = [
+    ("YouTube", "com.google.android.youtube"),
+    ("whatsapp", "com.whatsapp"),
+    ("Itaú", "com.itau"),
+    ("Itaú Investimentos", "com.itau.investimentos"),
+    ("Nubank", "com.nu.production"),
+    ("Mercado Livre", "com.mercadolibre"),
+    ("Configurações", "com.android.settings"),
+    ("Spotify", "com.spotify.music"),
+    ("Instagram", "com.instagram.android"),
+    ("Calculadora", "com.google.android.calculator"),
+    ("Netflix", "com.netflix.mediaclient"),
+    ("Telegram", "org.telegram.messenger"),
+    ("Play Store", "com.android.vending"),
+    ("Uber", "com.ubercab"),
+    ("Magalu", "com.luizalabs.mlapp"),
+    ("Waze", "com.waze"),
+]
+
+
+def device_packages() -> dict:
+    packages = {package: ("100", label, True) for package, label in APPS}
+    for i in range(200):
+        packages[f"com.android.providers.service{i}"] = ("34", None, False)
+    return packages
+
+
+class FakeLLM:
+    """Acerta sempre (devolve o pacote certo do nome no prompt), com latência fixa."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.answers = dict(QUERIES)
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        name = prompt.split("chamado '", 1)[1].split("'", 1)[0]
+        return self.answers.get(name, "com.example.desconhecido")
+
+
+async def llm_only(llm: FakeLLM) -> tuple[float, int]:
+    """Caminho antigo: toda execução pergunta o pacote à LLM."""
+    started = time.perf_counter()
+    correct = 0
+    for name, expected in QUERIES:
+        reply = await llm(f"Qual é o ID do pacote Android para o aplicativo chamado '{name}'?")
+        correct += PACKAGE_PATTERN.search(reply).group() == expected
+    return time.perf_counter() - started, correct
+
+
+async def resolve_all(resolver: PackageResolver, llm: FakeLLM) -> tuple[float, int, dict]:
+    started = time.perf_counter()
+    correct, sources = 0, {}
+    for name, expected in QUERIES:
+        match = await resolver.resolve(DEVICE, name, llm_fn=llm)
+        correct += match.package == expected
+        sources[match.source] = sources.get(match.source, 0) + 1
+    return time.perf_counter() - started, correct, sources
+
+
+def report(label: str, elapsed: float, correct: int, llm: FakeLLM, adb: FakeAdb | None = None, extra: str = ""):
+    line = (
+        f"  {label:<30} {elapsed:6.2f}s  ({elapsed / len(QUERIES) * 1000:7.1f} ms/nome)  "
+        f"acertos {correct}/{len(QUERIES)}  chamadas à LLM {llm.calls:2d}"
+    )
+    if adb is not None:
+        line += f"  idas ao adb {adb.calls}  rótulos lidos {adb.label_lookups}"
+    print(line + extra)
+
+
+async def main(llm_latency: float):
+    print(f"{len(QUERIES)} nomes de app, LLM com {llm_latency:.1f}s por chamada:")
+    llm = FakeLLM(llm_latency)
+    elapsed, correct = await llm_only(llm)
+    report("só LLM", elapsed, correct, llm)
+
+    adb = FakeAdb(device_packages())
+    resolver = PackageResolver(index=PackageIndex(":memory:"), adb=adb, ttl=600)
+    llm = FakeLLM(llm_latency)
+    elapsed, correct, sources = await resolve_all(resolver, llm)
+    report("índice: primeiro uso", elapsed, correct, llm, adb, f"  origens {sources}")
+
+    adb.calls = adb.label_lookups = 0
+    llm = FakeLLM(llm_latency)
+    elapsed, correct, sources = await resolve_all(resolver, llm)
+    report("índice: usos seguintes", elapsed, correct, llm, adb, f"  origens {sources}")
+
+    # Instala dois apps e atualiza um: o refresh só relê o rótulo desses três
+    adb.install("com.duolingo", label="Duolingo")
+    adb.install("com.discord", label=None)
+    adb.install("com.whatsapp", version="101")
+    adb.calls = adb.label_lookups = 0
+    started = time.perf_counter()
+    stats = await resolver.refresh(DEVICE, force=True)
+    elapsed = time.perf_counter() - started
+    print(
+        f"  {'refresh incremental':<30} {elapsed:6.2f}s  idas ao adb {adb.calls}  "
+        f"rótulos lidos {adb.label_lookups}  {stats}"
+    )
+    adb.calls = adb.label_lookups = 0
+    started = time.perf_counter()
+    stats = await resolver.refresh(DEVICE, force=True)
+    elapsed = time.perf_counter() - started
+    print(
+        f"  {'refresh sem mudanças':<30} {elapsed:6.2f}s  idas ao adb {adb.calls}  "
+        f"rótulos lidos {adb.label_lookups}  {stats}"
+    )
+    full = PackageResolver(index=PackageIndex(":memory:"), adb=adb)
+    adb.calls = adb.label_lookups = 0
+    started = time.perf_counter()
+    stats = await full.refresh(DEVICE)
+    print(
+        f"  {'refresh completo (índice vazio)':<30} {time.perf_counter() - started:6.2f}s  idas ao adb {adb.calls}  "
+        f"rótulos lidos {adb.label_lookups}  {stats}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.5))
@@ -0,0 +1,104 @@
+"""Parser por árvore + recursão (anterior) x parser incremental em uma passada.
+
+Gera hierarquias sintéticas de 1k, 10k e 100k nós e mede tempo e pico de memória.
+Uso: python -m benchmarks.bench_parser
+"""
+import json
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from app.core.parser import UIParser, lxml_etree
+
+
+class LegacyUIParser(UIParser):
+    """Implementação anterior: ET.fromstring + recursão com list.extend."""
+
+    def parse_to_json(self, xml_source: str) -> str:
+        try:
+            root = ET.fromstring(xml_source)
+            elements = self._extract(root)
+            return json.dumps(elements, ensure_ascii=False, separators=(',', ':'))
+        except Exception as e:
+            return json.dumps({"error": f"Failed to parse XML: {str(e)}"})
+
+    def _extract(self, node):
+        elements = []
+        el_data = self._element_data(node)
+        if el_data is not None:
+            elements.append(el_data)
+        for child in node:
+            elements.extend(self._extract(child))
+        return elements
+
+    def _element_data(self, node) -> dict | None:
+        """Extração anterior: um dict com chaves string por elemento, sem bounds."""
+        is_clickable = node.get("clickable") == "true"
+        is_long_clickable = node.get("long-clickable") == "true"
+        is_scrollable = node.get("scrollable") == "true"
+        if not (is_clickable or is_long_clickable or is_scrollable or node.get("text") or node.get("content-desc")):
+            return None
+
+        el_data = {"type": self.class_map.get(node.get("class", ""), "element")}
+        for attr in self.essential_attrs:
+            val = node.get(attr)
+            if val and val != "false":
+                if attr == "resource-id":
+                    val = val.split("/")[-1]
+                el_data[attr] = val
+        if len(el_data) <= 1 and not is_clickable:
+            return None
+        return el_data
+
+
+def synthetic_hierarchy(n_nodes: int, depth: int = 40) -> str:
+    """Lista de linhas aninhadas: cada linha desce `depth` níveis de ViewGroup até um botão."""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">']
+    rows = max(1, n_nodes // (depth + 2))
+    for row in range(rows):
+        parts.append('<node class="android.view.ViewGroup" scrollable="false">' * depth)
+        parts.append(
+            f'<node class="android.widget.TextView" text="Item {row}" resource-id="com.app:id/title" />'
+            f'<node class="android.widget.Button" clickable="true" content-desc="Abrir {row}" />'
+        )
+        parts.append('</node>' * depth)
+    parts.append('</hierarchy>')
+    return "".join(parts)
+
+
+def measure(parser: UIParser, xml: str) -> tuple[float, float, str]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = parser.parse_to_json(xml)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024, output
+
+
+def main():
+    parsers = {"árvore + recursão": LegacyUIParser(), "incremental (ElementTree)": UIParser(use_lxml=False)}
+    if lxml_etree is not None:
+        parsers["incremental (lxml)"] = UIParser(use_lxml=True)
+
+    for n_nodes in (1_000, 10_000, 100_000):
+        xml = synthetic_hierarchy(n_nodes)
+        print(f"\n{n_nodes} nós ({len(xml) / 1024:.0f} KiB)")
+        reference = None
+        for label, parser in parsers.items():
+            ms, peak_mb, output = measure(parser, xml)
+            reference = reference or output
+            same = "idêntico" if output == reference else "DIFERENTE"
+            print(f"  {label:<28} {ms:9.1f}ms  pico={peak_mb:7.1f}MiB  {same}")
+
+    # Hierarquia muito profunda (Compose/React Native): a recursão estoura o limite
+    deep = synthetic_hierarchy(sys.getrecursionlimit() * 2, depth=sys.getrecursionlimit() + 100)
+    print("\nhierarquia profunda:")
+    for label, parser in parsers.items():
+        output = parser.parse_to_json(deep)
+        print(f"  {label:<28} {'erro: ' + output[:60] if 'error' in output[:12] else 'ok'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Modo reativo serial x pipeline (consulta antecipada à IA durante a espera da tela).
+
+Uso: python -m benchmarks.bench_prefetch [N_SCREENS] [LLM_LATENCY_S]
+"""
+import asyncio
+import sys
+import time
+
+from app.core.decision_cache import DecisionCache
+from app.core.plan_store import PlanStore
+from app.services.automation_service import AutomationService
+from app.services.session_pool import DeviceSessionPool
+from benchmarks.fakes import FakeDriver
+
+LOADING_XML = '<hierarchy><node class="android.widget.ProgressBar" content-desc="Carregando" /></hierarchy>'
+
+
+def screen_xml(index: int, last: bool) -> str:
+    # Letras e não números: o hash estrutural ignora dígitos e veria sempre a mesma tela
+    title = "Concluído" if last else f"Etapa {chr(ord('A') + index)}"
+    return (
+        '<hierarchy>'
+        f'<node class="android.widget.TextView" text="{title}" bounds="[0,63][1080,210]" />'
+        '<node class="android.widget.Button" text="Avançar" clickable="true" bounds="[0,1700][1080,1850]" />'
+        '</hierarchy>'
+    )
+
+
+class TransitionDriver(FakeDriver):
+    """Cada toque leva à próxima tela, que só aparece após `transition` segundos de carregamento."""
+
+    def __init__(self, n_screens: int, transition: float, latency: float):
+        super().__init__(latency=latency)
+        self.screens = [screen_xml(i, i == n_screens - 1) for i in range(n_screens)]
+        self.transition = transition
+        self.current = 0
+        self.ready_at = 0.0
+
+    @property
+    def page_source(self) -> str:
+        self._block()
+        if time.monotonic() < self.ready_at:
+            return LOADING_XML
+        return self.screens[self.current]
+
+    def tap(self, positions, duration=None):
+        self._block()
+        self.current = min(self.current + 1, len(self.screens) - 1)
+        self.ready_at = time.monotonic() + self.transition
+
+
+def fake_llm(latency: float):
+    async def llm(prompt: str) -> str:
+        await asyncio.sleep(latency)
+        return "OBJETIVO_ALCANÇADO" if "Concluído" in prompt else "Clique em Avançar"
+    return llm
+
+
+async def main(n_screens: int, llm_latency: float):
+    for label, prefetch in (("serial", False), ("pipeline", True)):
+        pool = DeviceSessionPool(driver_factory=lambda d, p: TransitionDriver(n_screens, transition=0.3, latency=0.05))
+        service = AutomationService(
+            pool=pool, cache=DecisionCache(":memory:"), plans=PlanStore(":memory:"),
+            screenshot_every=0, prefetch=prefetch,
+        )
+        started = time.perf_counter()
+        log = await service.run_reactive_loop("emulator-5554", "com.example", "chegar ao fim", fake_llm(llm_latency))
+        elapsed = time.perf_counter() - started
+        print(f"{label:<9} {elapsed:6.2f}s  sucesso={service.succeeded}  chamadas à LLM={service.llm_calls}")
+        for line in log.splitlines():
+            if line.startswith("⏱️ Tempo por etapa") or (line.startswith("⚡") and "aproveitadas" in line):
+                print(f"  {line}")
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 1.0,
+    ))
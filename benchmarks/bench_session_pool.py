@@ -0,0 +1,26 @@
+"""Compara execuções frias (criação de sessão) e quentes (sessão reaproveitada do pool).
+
+Uso: python -m benchmarks.bench_session_pool [N_RUNS]
+"""
+import asyncio
+import sys
+import time
+
+from app.services.automation_service import AutomationService
+from app.services.session_pool import DeviceSessionPool
+from benchmarks.fakes import slow_driver_factory
+
+
+async def main(n_runs: int):
+    pool = DeviceSessionPool(driver_factory=slow_driver_factory(startup=2.0))
+    for i in range(n_runs):
+        start = time.perf_counter()
+        await AutomationService(pool=pool).run_fixed_script("emulator-5554", "com.android.settings", ["Role para baixo"])
+        label = "fria" if i == 0 else "quente"
+        print(f"execução {i + 1} ({label}): {time.perf_counter() - start:.2f}s")
+    print(pool.metrics())
+    await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
@@ -0,0 +1,62 @@
+"""Mede a latência de /api/status enquanto N execuções rodam em paralelo.
+
+Uso: python -m benchmarks.bench_status_latency [N_RUNS]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.routes import router
+from app.services.session_pool import session_pool
+from app.services.automation_service import AutomationService
+from benchmarks.fakes import FakeDriver
+
+
+async def _probe_status(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/status")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+def _summary(label: str, latencies: list[float]):
+    print(f"{label:<22} n={len(latencies):<4} p50={statistics.median(latencies):7.2f}ms max={max(latencies):7.2f}ms")
+
+
+async def main(n_runs: int):
+    session_pool.driver_factory = lambda device, package: FakeDriver(latency=0.2)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_status(client, stop))
+        await asyncio.sleep(1)
+        stop.set()
+        _summary("ocioso", await probe)
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe_status(client, stop))
+        steps = ["Clique em Bateria", "Role para baixo", "Digite teste"]
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            AutomationService().run_fixed_script(f"emulator-{5554 + 2 * i}", "com.android.settings", steps)
+            for i in range(n_runs)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        _summary(f"{n_runs} execuções ativas", await probe)
+        print(f"tempo total das execuções: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4))
@@ -0,0 +1,505 @@
+"""Dublês do driver Appium para rodar o motor sem emulador."""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from app.core.parser import ui_parser
+
+# Menor PNG válido (1x1 transparente)
+PNG_1X1 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6300010000000500010d0a2db40000"
+    "000049454e44ae426082"
+)
+
+SETTINGS_XML = (
+    '<hierarchy>'
+    '<node class="android.widget.FrameLayout">'
+    '<node class="android.widget.TextView" text="Configurações" bounds="[0,63][1080,210]" />'
+    '<node class="android.widget.Button" text="Redes e Internet" clickable="true" bounds="[0,210][1080,378]" />'
+    '<node class="android.widget.Button" text="Bateria" clickable="true" bounds="[0,378][1080,546]" />'
+    '</node>'
+    '</hierarchy>'
+)
+
+
+class FakeElement:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def click(self):
+        self._driver._block()
+
+    def send_keys(self, value):
+        self._driver._block()
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    @property
+    def active_element(self):
+        self._driver._block()
+        return FakeElement(self._driver)
+
+
+class FakeDriver:
+    """Driver que imita a latência bloqueante de um servidor Appium real."""
+
+    def __init__(self, latency: float = 0.2, page_source: str = SETTINGS_XML, **_):
+        self.latency = latency
+        self._page_source = page_source
+        self.calls = 0
+        self.switch_to = FakeSwitchTo(self)
+
+    def _block(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    @property
+    def page_source(self) -> str:
+        self._block()
+        return self._page_source
+
+    @property
+    def current_package(self) -> str:
+        self._block()
+        return "com.android.settings"
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def activate_app(self, package):
+        self._block()
+
+    def terminate_app(self, package):
+        self._block()
+
+    def find_element(self, by, value):
+        self._block()
+        return FakeElement(self)
+
+    def tap(self, positions, duration=None):
+        self._block()
+
+    def get_window_size(self):
+        return {"width": 1080, "height": 1920}
+
+    def swipe(self, *args, **kwargs):
+        self._block()
+
+    def save_screenshot(self, path):
+        self._block()
+        return True
+
+    def get_screenshot_as_png(self) -> bytes:
+        self._block()
+        return PNG_1X1
+
+    def quit(self):
+        self._block()
+
+
+def slow_driver_factory(startup: float = 2.0, latency: float = 0.05):
+    """Factory que simula o custo de criar uma sessão UiAutomator2."""
+    def factory(device_name, app_package):
+        time.sleep(startup)
+        return FakeDriver(latency=latency)
+    return factory
+
+
+class StubOllamaServer:
+    """
+    Servidor HTTP local que responde no formato /v1/chat/completions do Ollama (e
+    em /api/chat, a API nativa). Com `token_delay`, imita a geração token a token
+    (também em streaming SSE) e para de gerar quando o cliente desconecta;
+    `generated` conta os tokens gerados.
+
+    Com `prompt_rate` (tokens/s), imita também a avaliação do prompt com o cache de
+    contexto do Ollama (um slot): só o que vem depois do maior prefixo em comum com
+    a conversa anterior é avaliado. `evaluated` guarda os tokens avaliados por chamada.
+    `reply` pode ser uma função que recebe as mensagens e devolve a resposta.
+    """
+
+    def __init__(
+        self, port: int = 11499, latency: float = 0.0, reply="Clique em Bateria", token_delay: float = 0.0,
+        prompt_rate: float = 0.0,
+    ):
+        import uvicorn
+
+        self.latency = latency
+        self.reply = reply
+        self.token_delay = token_delay
+        self.prompt_rate = prompt_rate
+        self.generated = 0
+        self.evaluated: list[int] = []
+        self._context: list[str] = []
+        self.url = f"http://127.0.0.1:{port}/v1/chat/completions"
+        config = uvicorn.Config(self._app, host="127.0.0.1", port=port, log_level="warning", interface="asgi3")
+        self._server = uvicorn.Server(config)
+        self._thread = None
+
+    def _tokens(self, payload: dict) -> list[str]:
+        text = self.reply(payload["messages"]) if callable(self.reply) else self.reply
+        for stop in payload.get("stop") or []:
+            text = text.split(stop)[0]
+        tokens = re.findall(r"\s*\S+", text)
+        limit = payload.get("max_tokens") or (payload.get("options") or {}).get("num_predict")
+        return tokens[:limit] if limit else tokens
+
+    @staticmethod
+    def _render(role: str, content: str) -> list[str]:
+        # ~4 caracteres por token, como a estimativa do compactador
+        return [f"<{role}>"] + [content[i:i + 4] for i in range(0, len(content), 4)]
+
+    async def _evaluate(self, messages: list[dict], tokens: list[str]) -> int:
+        """Avalia o prompt reaproveitando o prefixo em comum com o contexto carregado."""
+        prompt = [t for m in messages for t in self._render(m["role"], m["content"])]
+        common = 0
+        for a, b in zip(prompt, self._context):
+            if a != b:
+                break
+            common += 1
+        evaluated = len(prompt) - common
+        self.evaluated.append(evaluated)
+        if self.prompt_rate:
+            await asyncio.sleep(evaluated / self.prompt_rate)
+        # O contexto passa a ser o prompt mais a resposta gerada
+        self._context = prompt + self._render("assistant", "".join(tokens))
+        return evaluated
+
+    async def _app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        payload = json.loads(body or b"{}")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        tokens = self._tokens(payload)
+        evaluated = await self._evaluate(payload.get("messages") or [], tokens)
+
+        if scope["path"] == "/api/chat":
+            await asyncio.sleep(self.token_delay * len(tokens))
+            self.generated += len(tokens)
+            body = json.dumps({
+                "message": {"role": "assistant", "content": "".join(tokens)}, "done": True,
+                "prompt_eval_count": evaluated, "eval_count": len(tokens),
+            }).encode()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if not payload.get("stream"):
+            await asyncio.sleep(self.token_delay * len(tokens))
+            self.generated += len(tokens)
+            body = json.dumps({"choices": [{"message": {"content": "".join(tokens)}}]}).encode()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")]})
+        disconnected = asyncio.ensure_future(receive())  # só chega algo aqui se o cliente desconectar
+        for token in tokens:
+            await asyncio.sleep(self.token_delay)
+            if disconnected.done():
+                return
+            self.generated += 1
+            chunk = json.dumps({"choices": [{"delta": {"content": token}}]})
+            await send({"type": "http.response.body", "body": f"data: {chunk}\n\n".encode(), "more_body": True})
+        disconnected.cancel()
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+    def __enter__(self):
+        import threading
+
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+class _FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiClient:
+    """Imita o `genai.Client`: cada chamada "dorme" `latency` segundos antes de responder.
+
+    Com `async_api=False` só existe a superfície síncrona, como em SDKs antigos.
+    """
+
+    def __init__(self, latency: float = 1.0, reply: str = "Clique em Bateria", async_api: bool = True):
+        self.latency = latency
+        self.reply = reply
+        self.generated = 0
+        self.models = self._SyncModels(self)
+        if async_api:
+            self.aio = type("Aio", (), {"models": self._AsyncModels(self)})()
+
+    class _SyncModels:
+        def __init__(self, client):
+            self._client = client
+
+        def generate_content(self, model, contents, config=None):
+            time.sleep(self._client.latency)
+            return _FakeGeminiResponse(self._client.reply)
+
+    class _AsyncModels:
+        def __init__(self, client):
+            self._client = client
+
+        async def generate_content(self, model, contents, config=None):
+            await asyncio.sleep(self._client.latency)
+            return _FakeGeminiResponse(self._client.reply)
+
+        async def generate_content_stream(self, model, contents, config=None):
+            # Latência dividida entre os pedaços, como numa geração incremental
+            words = re.findall(r"\s*\S+", self._client.reply)
+
+            async def chunks():
+                for word in words:
+                    await asyncio.sleep(self._client.latency / len(words))
+                    self._client.generated += 1
+                    yield _FakeGeminiResponse(word)
+            return chunks()
+
+
+# ── Sessões gravadas ──────────────────────────────────────────────────
+
+class RecordedSession:
+    """
+    Sessão gravada em `benchmarks/sessions/<nome>/`: `session.json` com as telas e
+    transições, um `<tela>.xml` com o page_source capturado de cada tela e,
+    opcionalmente, `<tela>.png` com o screenshot. O `marker` de cada tela precisa
+    sobreviver à compactação do prompt e não pode aparecer no objetivo.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "session.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        self.name = data.get("name", os.path.basename(directory))
+        self.package = data["package"]
+        self.goal = data["goal"]
+        self.start = data["start"]
+        self.steps = data.get("steps", [])
+        # Resposta da IA em cada tela; a tela é reconhecida pelo `marker` no prompt
+        self.replies = {screen_id: info["reply"] for screen_id, info in data["screens"].items() if "reply" in info}
+        self.markers = {screen_id: info["marker"] for screen_id, info in data["screens"].items() if "marker" in info}
+        self.transitions = data.get("transitions", [])
+        self.xml = {}
+        self.png = {}
+        for screen_id in data["screens"]:
+            with open(os.path.join(directory, f"{screen_id}.xml"), encoding="utf-8") as f:
+                self.xml[screen_id] = f.read()
+            png_path = os.path.join(directory, f"{screen_id}.png")
+            self.png[screen_id] = open(png_path, "rb").read() if os.path.exists(png_path) else PNG_1X1
+
+    def reply_for(self, prompt: str) -> str:
+        """Resposta gravada da tela cujo `marker` aparece no prompt."""
+        for screen_id, marker in self.markers.items():
+            if marker in prompt and screen_id in self.replies:
+                reply = self.replies[screen_id]
+                # Lotes de ações ficam gravados como objeto no session.json
+                return reply if isinstance(reply, str) else json.dumps(reply, ensure_ascii=False)
+        return "Role para baixo"
+
+    def next_screen(self, screen_id: str, action: str, target: str | None) -> str | None:
+        """Tela seguinte para (tela atual, ação, alvo), ou None se a ação não muda a tela."""
+        wanted = (target or "").lower()
+        for t in self.transitions:
+            if t["from"] != screen_id or t["action"] != action:
+                continue
+            expected = t.get("target", "").lower()
+            if not expected or (wanted and (expected in wanted or wanted in expected)):
+                return t["to"]
+        return None
+
+
+def load_sessions(directory: str) -> list[RecordedSession]:
+    return [
+        RecordedSession(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if os.path.isfile(os.path.join(directory, name, "session.json"))
+    ]
+
+
+class _RecordedElement:
+    def __init__(self, driver, target: str | None):
+        self._driver = driver
+        self._target = target
+
+    def click(self):
+        self._driver._block()
+        self._driver._act("tap", self._target)
+
+    def send_keys(self, value):
+        self._driver._block()
+        self._driver._act("type", value)
+
+
+class _RecordedSwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    @property
+    def active_element(self):
+        self._driver._block()
+        return _RecordedElement(self._driver, None)
+
+
+class RecordedDriver(FakeDriver):
+    """
+    Reproduz uma sessão gravada: cada ação reconhecida leva à próxima tela, que só
+    aparece depois de `transition` segundos (nesse meio tempo o page_source é o da
+    tela anterior, como num app real animando a troca).
+    """
+
+    QUOTED = re.compile(r'"([^"]*)"')
+
+    def __init__(self, session: RecordedSession, latency: float = 0.05, transition: float = 0.3):
+        super().__init__(latency=latency)
+        self.session = session
+        self.transition = transition
+        self.switch_to = _RecordedSwitchTo(self)
+        self.screen_id = session.start
+        self._next = None  # (tela, instante em que aparece)
+
+    def _current(self) -> str:
+        if self._next and time.monotonic() >= self._next[1]:
+            self.screen_id, self._next = self._next[0], None
+        return self.screen_id
+
+    def _act(self, action: str, target: str | None):
+        target_screen = self.session.next_screen(self._current(), action, target)
+        if target_screen:
+            self._next = (target_screen, time.monotonic() + self.transition)
+
+    @property
+    def page_source(self) -> str:
+        self._block()
+        return self.session.xml[self._current()]
+
+    @property
+    def current_package(self) -> str:
+        self._block()
+        return self.session.package
+
+    def activate_app(self, package):
+        self._block()
+
+    def terminate_app(self, package):
+        # Reabrir o app volta para a tela inicial da gravação
+        self._block()
+        self.screen_id, self._next = self.session.start, None
+
+    def find_element(self, by, value):
+        self._block()
+        match = self.QUOTED.search(value)
+        target = match.group(1) if match else value
+        # Texto/descrição buscados precisam existir na tela atual, como no dispositivo
+        if target.lower() not in self.session.xml[self._current()].lower():
+            raise LookupError(f"Elemento não encontrado: {value}")
+        return _RecordedElement(self, target)
+
+    def tap(self, positions, duration=None):
+        self._block()
+        x, y = positions[0]
+        self._act("tap", self._label_at(x, y))
+
+    def swipe(self, *args, **kwargs):
+        self._block()
+        self._act("scroll", None)
+
+    def get_screenshot_as_png(self) -> bytes:
+        self._block()
+        return self.session.png[self._current()]
+
+    def _label_at(self, x: int, y: int) -> str | None:
+        # Menor elemento com rótulo que contém o ponto tocado
+        best = None
+        for el in ui_parser.parse_elements(self.session.xml[self._current()]):
+            label = el.text or el.content_desc or el.short_id
+            if not (label and el.bounds):
+                continue
+            x1, y1, x2, y2 = el.bounds
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                area = (x2 - x1) * (y2 - y1)
+                if best is None or area < best[0]:
+                    best = (area, label)
+        return best[1] if best else None
+
+
+class ScriptedLLM:
+    """
+    LLM determinística: reconhece a tela pelo `marker` no prompt e devolve a resposta
+    gravada, com latência fixa + variação pseudoaleatória reproduzível (seed).
+    """
+
+    def __init__(self, session: RecordedSession, latency: float = 0.5, jitter: float = 0.0, seed: int = 42):
+        self.session = session
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        return self.session.reply_for(prompt)
+
+
+# ── Dispositivo (adb) ─────────────────────────────────────────────────
+
+class FakeAdb:
+    """
+    Imita o `AdbShell` do resolvedor de pacotes: `packages` é {pacote: (versão,
+    rótulo ou None, launcher)}; rótulo None imita builds cujo dumpsys não expõe o
+    nome do app. Cada ida ao dispositivo dorme `latency` e cada pacote do dumpsys
+    mais `label_latency`; `calls` e `label_lookups` contam o trabalho feito.
+    """
+
+    def __init__(self, packages: dict, latency: float = 0.3, label_latency: float = 0.05):
+        self.packages = dict(packages)
+        self.latency = latency
+        self.label_latency = label_latency
+        self.calls = 0
+        self.label_lookups = 0
+
+    def install(self, package: str, version: str = "1", label: str | None = None, launchable: bool = True):
+        """Instala (ou atualiza, com outra versão) um pacote."""
+        self.packages[package] = (version, label, launchable)
+
+    async def list_packages(self, device: str) -> dict[str, str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {package: info[0] for package, info in self.packages.items()}
+
+    async def launchable(self, device: str) -> set[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {package for package, info in self.packages.items() if info[2]}
+
+    async def labels(self, device: str, packages: list[str]) -> dict[str, str]:
+        self.calls += 1
+        self.label_lookups += len(packages)
+        await asyncio.sleep(self.latency + self.label_latency * len(packages))
+        return {p: self.packages[p][1] for p in packages if p in self.packages and self.packages[p][1]}
@@ -0,0 +1,188 @@
+"""Benchmark de ponta a ponta sem emulador: sessões gravadas, driver e LLM falsos.
+
+Roda `run_reactive_loop` e `run_fixed_script` em cada sessão de `benchmarks/sessions/`
+e mede tempo total, tempo por etapa, chamadas à LLM e ao driver e pico de memória.
+Com --baseline, compara com uma execução anterior e sai com código 1 se piorou.
+
+Uso:
+    python -m benchmarks.harness [--runs 3] [--llm-latency 0.5] [--driver-latency 0.05]
+    python -m benchmarks.harness --save-baseline benchmarks/baseline.json
+    python -m benchmarks.harness --baseline benchmarks/baseline.json [--tolerance 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.core.decision_cache import DecisionCache
+from app.core.plan_store import PlanStore
+from app.services.automation_service import TIMING_KEYS, AutomationService
+from app.services.session_pool import DeviceSessionPool
+from benchmarks.fakes import RecordedDriver, ScriptedLLM, load_sessions
+
+SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
+DEVICE = "emulator-5554"
+MODES = ("reactive", "fixed")
+# Métricas comparadas com o baseline: (chave, tolerância absoluta mínima)
+TIMED_KEYS = (("wall_s", 0.1), ("peak_kb", 256))
+
+
+async def run_once(session, mode: str, args) -> dict:
+    """Uma execução completa, com cache e planos novos (sem aproveitar a rodada anterior)."""
+    drivers = []
+
+    def factory(device_name, app_package):
+        driver = RecordedDriver(session, latency=args.driver_latency, transition=args.transition)
+        drivers.append(driver)
+        return driver
+
+    pool = DeviceSessionPool(driver_factory=factory)
+    llm = ScriptedLLM(session, latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed)
+    service = AutomationService(
+        pool=pool, cache=DecisionCache(":memory:"), plans=PlanStore(":memory:"),
+        screenshot_every=args.screenshot_every, prefetch=args.prefetch,
+    )
+    started = time.perf_counter()
+    if mode == "fixed":
+        await service.run_fixed_script(DEVICE, session.package, session.steps)
+    else:
+        await service.run_reactive_loop(DEVICE, session.package, session.goal, llm)
+    elapsed = time.perf_counter() - started
+    await pool.close()
+    return {
+        "wall_s": elapsed,
+        "passed": service.succeeded,
+        "llm_calls": llm.calls,
+        "driver_calls": sum(d.calls for d in drivers),
+        "phases": dict(service.timing_totals),
+    }
+
+
+async def measure(session, mode: str, args) -> dict:
+    runs = [await run_once(session, mode, args) for _ in range(args.runs)]
+    # Memória numa rodada à parte: o tracemalloc deixa a execução bem mais lenta
+    tracemalloc.start()
+    await run_once(session, mode, args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "wall_s": round(statistics.median(r["wall_s"] for r in runs), 3),
+        "passed": all(r["passed"] for r in runs),
+        "llm_calls": max(r["llm_calls"] for r in runs),
+        "driver_calls": max(r["driver_calls"] for r in runs),
+        "phases": {key: round(statistics.median(r["phases"][key] for r in runs), 3) for key in TIMING_KEYS},
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressões em relação ao baseline (vazio = tudo certo)."""
+    problems = []
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        if old["passed"] and not result["passed"]:
+            problems.append(f"{name}: passou no baseline e agora falhou")
+        # Chamadas são determinísticas: qualquer aumento é regressão
+        for key in ("llm_calls", "driver_calls"):
+            if result[key] > old[key]:
+                problems.append(f"{name}: {key} {old[key]} → {result[key]}")
+        for key, slack in TIMED_KEYS:
+            limit = max(old[key] * (1 + tolerance), old[key] + slack)
+            if result[key] > limit:
+                problems.append(f"{name}: {key} {old[key]} → {result[key]} (limite {limit:.2f})")
+    return problems
+
+
+def print_table(results: dict, baseline: dict | None):
+    old_results = (baseline or {}).get("results", {})
+    header = f"{'sessão/modo':<32} {'ok':<3} {'tempo':>8} {'Δ':>7} {'llm':>4} {'driver':>6} {'pico':>8}  etapas (s)"
+    print(header)
+    print("─" * len(header))
+    for name, r in results.items():
+        old = old_results.get(name)
+        delta = f"{(r['wall_s'] / old['wall_s'] - 1) * 100:+.0f}%" if old and old["wall_s"] else ""
+        phases = " ".join(f"{key} {value:.2f}" for key, value in r["phases"].items() if value)
+        print(
+            f"{name:<32} {'✅' if r['passed'] else '❌':<3} {r['wall_s']:>7.2f}s {delta:>7} "
+            f"{r['llm_calls']:>4} {r['driver_calls']:>6} {r['peak_kb']:>6}KB  {phases}"
+        )
+
+
+async def main(args) -> int:
+    sessions = load_sessions(args.sessions)
+    if args.only:
+        sessions = [s for s in sessions if s.name in args.only]
+    if not sessions:
+        print(f"Nenhuma sessão em {args.sessions}")
+        return 1
+
+    results = {}
+    for session in sessions:
+        for mode in MODES:
+            if mode == "fixed" and not session.steps:
+                continue
+            results[f"{session.name}/{mode}"] = await measure(session, mode, args)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    report = {
+        "config": {
+            "runs": args.runs, "llm_latency": args.llm_latency, "llm_jitter": args.llm_jitter,
+            "driver_latency": args.driver_latency, "transition": args.transition,
+            "screenshot_every": args.screenshot_every, "prefetch": args.prefetch,
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            print(f"\n💾 Resultado salvo em {path}")
+
+    if baseline is None:
+        return 0
+    # Número de execuções só muda a mediana; o resto da configuração precisa bater
+    if {**baseline.get("config", {}), "runs": args.runs} != report["config"]:
+        print("\n⚠️ Configuração diferente da do baseline; a comparação pode não valer.")
+    problems = compare(results, baseline, args.tolerance)
+    if problems:
+        print("\n❌ Regressões em relação ao baseline:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print(f"\n✅ Sem regressões em relação ao baseline (tolerância {args.tolerance:.0%})")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default=SESSIONS_DIR, help="pasta com as sessões gravadas")
+    parser.add_argument("--only", nargs="*", help="nomes das sessões a rodar (padrão: todas)")
+    parser.add_argument("--runs", type=int, default=3, help="execuções por sessão e modo (usa a mediana)")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--driver-latency", type=float, default=0.05)
+    parser.add_argument("--transition", type=float, default=0.3, help="tempo até a próxima tela aparecer")
+    parser.add_argument("--screenshot-every", type=int, default=1)
+    parser.add_argument("--prefetch", action="store_true", help="consulta antecipada à IA no modo reativo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora relativa aceita em tempo e memória")
+    parser.add_argument("--save-baseline", help="grava o resultado como novo baseline")
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
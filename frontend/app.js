@@ -15,16 +15,46 @@ const goalTextarea = document.getElementById('dynamic-goal');
 const deviceImg = document.getElementById('device-screen');
 
 let scenarios = [];
-let screenshotInterval = null;
 
 // -- Refresh Screenshot --
-function refreshScreenshot() {
+function refreshScreenshot(url) {
     if (deviceImg) {
-        // Adiciona timestamp para evitar cache do navegador
-        deviceImg.src = `/screenshots/screenshot.png?t=${new Date().getTime()}`;
+        // Cada frame tem URL própria (/api/runs/{id}/frames/{n}), sem risco de cache
+        deviceImg.src = url;
     }
 }
 
+// Origem de cada decisão do modo reativo (evento 'decision')
+const DECISION_SOURCES = { plan: '📋 Plano', cache: '♻️ Cache', llm: '🤖 IA Decidiu' };
+
+// -- Acompanha um job via Server-Sent Events até ele terminar --
+function followJob(jobId) {
+    return new Promise((resolve) => {
+        const source = new EventSource(`/api/jobs/${jobId}/events`);
+        source.onmessage = (msg) => {
+            const event = JSON.parse(msg.data);
+            switch (event.type) {
+                case 'step':
+                    log(`\n--- PASSO ${event.step} ---`);
+                    break;
+                case 'decision':
+                    log(`${DECISION_SOURCES[event.source] || DECISION_SOURCES.llm}: ${event.decision} (${event.elapsed_ms}ms)`, 'ai');
+                    break;
+                case 'action':
+                    log(`${event.ok ? '✅' : '⚠️'} ${event.action} (${event.elapsed_ms}ms)`, event.ok ? 'success' : 'error');
+                    break;
+                case 'screenshot':
+                    refreshScreenshot(event.url);
+                    break;
+                case 'finished':
+                    source.close();
+                    resolve(event);
+                    break;
+            }
+        };
+    });
+}
+
 // -- Handle Package Selection --
 appPkgSelect.onchange = () => {
     if (appPkgSelect.value === 'custom') {
@@ -52,7 +82,9 @@ async function checkStatus() {
 async function loadScenarios() {
     try {
         const res = await fetch('/api/scenarios');
-        scenarios = await res.json();
+        const data = await res.json();
+        scenarios = data.items;
+        data.errors.forEach(e => console.warn(`Cenário inválido (${e.file}): ${e.error}`));
 
         scenarios.forEach(s => {
             const opt = document.createElement('option');
@@ -159,9 +191,6 @@ btnExecute.onclick = async () => {
     log(`📱 Dispositivo: ${device}`);
     log(`🎯 App: ${app || 'Auto'}`);
 
-    // Inicia atualização de screenshot
-    screenshotInterval = setInterval(refreshScreenshot, 2000);
-
     try {
         const payload = {
             device,
@@ -172,14 +201,23 @@ btnExecute.onclick = async () => {
             steps: (mode === 'fixed' && scenario) ? scenario.steps : []
         };
 
-        const res = await fetch('/api/run-scenario', {
+        const res = await fetch('/api/jobs', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(payload)
         });
+        const { job_id } = await res.json();
+        log(`🧾 Job: ${job_id}`);
 
-        const data = await res.json();
+        const finished = await followJob(job_id);
+        const job = await (await fetch(`/api/jobs/${job_id}`)).json();
 
+        if (finished.status !== 'succeeded') {
+            log(`\n❌ Job ${finished.status}: ${finished.error || ''}`, 'error');
+            return;
+        }
+
+        const data = job.result;
         log(`\n--- LOG DE EXECUÇÃO (${data.plan}) ---`);
         log(colorizeLog(data.log));
 
@@ -190,11 +228,6 @@ btnExecute.onclick = async () => {
         log(`\n❌ Erro crítico: ${e.message}`, 'error');
     } finally {
         btnExecute.disabled = false;
-        // Para atualização de screenshot
-        if (screenshotInterval) {
-            clearInterval(screenshotInterval);
-            screenshotInterval = null;
-        }
     }
 };
 